@@ -1,18 +1,20 @@
+import time
+_import_started = time.perf_counter()   # for the startup timing report
+
 import ast
 from ntpath import splitdrive
 import os
+import hmac
 import json
 import random
 import datetime
-import time
 import threading
 import zoneinfo
 import httpx
 import asyncio
 import sqlitecloud as sq
-import csv
-import io
 import sys
+from collections import Counter
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from functools import wraps
@@ -20,20 +22,34 @@ from typing import Optional, Dict, Any
 
 from fastapi import FastAPI, Request, Form, Depends, Response, BackgroundTasks, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from starlette.middleware.sessions import SessionMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.concurrency import run_in_threadpool
 import socketio
 from dotenv import load_dotenv
-from googletrans import Translator
-from google import genai
+from jinja2 import FileSystemBytecodeCache
 
 # Import modules
-from modules import sendlog, sendmail, sendmailthread, del_event, detailsformat
+from modules import sendlog, sendmail, del_event, detailsformat, log_outbox, mail_spool
 from modules import add_event as add_event_mod
 from modules import delete_event as delete_event_mod
 from modules import email_send_message
+from modules import ai_description
+from modules import get_translator, translate_one, get_translation_store
+from modules import DraftStore, DRAFT_FIELDS
+from modules import AssetStaticFiles, build_assets
+from modules import CompressionMiddleware, compress_route
+from modules import reference_data
+from modules import metrics, MetricsMiddleware, DB_POOL_WAIT, instrument_socketio
+from modules import query_log, TimedCursor, call_site
+from modules import ProfilingMiddleware, StackSampler
+from modules import connect_local, init_local_db
+from modules import event_search, SEARCH_PAGE_SIZE
+from modules import autocomplete, AUTOCOMPLETE_LIMIT
+from modules import export_table, iter_user_export, encode_csv, EXPORT_TABLES, EXPORT_FORMATS
+from modules import make_etag, etag_matches, not_modified, apply_cache_headers, PRIVATE_REVALIDATE
+from modules import ServerSessionMiddleware, MemorySessionBackend, SQLiteSessionBackend, SESSION_MAX_AGE
+from modules import RateLimiter, RatePolicy, RateLimitExceeded, MemoryRateLimitBackend, SQLiteRateLimitBackend
 
 load_dotenv()
 
@@ -46,15 +62,26 @@ app_running_host = "0.0.0.0"
 #
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
 
-client = genai.Client(api_key=GOOGLE_API_KEY)
+# Gemini client (and the google.genai import) is built in a background thread after startup
+if os.environ.get("AI_BACKEND") == "fake":
+    ai_backend = ai_description.FakeDescriptionBackend()
+else:
+    ai_backend = ai_description.GeminiDescriptionBackend(ai_description.lazy_gemini_client(GOOGLE_API_KEY))
+ai_service = ai_description.DescriptionService(
+    ai_backend,
+    maxsize=int(os.environ.get("AI_CACHE_SIZE", "256")),
+    ttl=int(os.environ.get("AI_CACHE_TTL", "900")),
+)
 
-all_translations = {}
-non_file_translations = {}
+# Shared across every worker on the host (SQLite WAL) — see modules/translation_store.py
+translation_store = get_translation_store()
 
 # --- In-Memory Stores ---
-rate_limit_store: dict[str, float] = {}  # {ip: timestamp}
 _translation_executor = ThreadPoolExecutor(max_workers=10)
 
+# --- Add-event drafts (server-side, one versioned document per user) ---
+draft_store = DraftStore(os.environ.get("DRAFT_DB", "drafts.db"))
+
 # --- Campaigns Cache ---
 _campaigns_cache: dict = {"data": None, "ts": 0}
 CAMPAIGNS_CACHE_TTL = 30  # seconds
@@ -63,28 +90,34 @@ CAMPAIGNS_CACHE_TTL = 30  # seconds
 _leaderboard_cache: dict = {"data": None, "ts": 0}
 LEADERBOARD_CACHE_TTL = 60  # seconds
 
+# --- HTTP Caching (ETag / conditional GET) ---
+SESSION_COOKIE = "sid"
+SHARED_PAGE_CACHE = "public, max-age=30, stale-while-revalidate=60"
+SHARED_API_CACHE = f"public, max-age={LEADERBOARD_CACHE_TTL}"
+SHARED_ICS_CACHE = "public, max-age=300"
+SHARED_REFERENCE_CACHE = "public, max-age=300"
+
 # --- Helper Functions ---
 
+TRANSLATIONS_FILE = os.environ.get("TRANSLATIONS_FILE", "translations.json")
+TRANSLATIONS_BACKUP = os.environ.get("TRANSLATIONS_BACKUP", "translations_backup.json")
+
 def load_translations():
-    global all_translations
+    """Seed the shared translation store from translations.json (idempotent across workers)."""
     try:
-        if os.path.exists("translations.json"):
-            with open("translations.json", "r", encoding="utf-8") as f:
-                all_translations = json.load(f)
-                print("Translations loaded successfully.")
+        if os.path.exists(TRANSLATIONS_FILE):
+            count = translation_store.import_json(TRANSLATIONS_FILE)
+            print(f"Translations loaded successfully ({count} entries).")
     except Exception as e:
         print(f"Translation file error: {e}")
         sendlog(f"Translation file error: {e}")
 
 def save_translations():
-    global all_translations
+    """Export the full shared store — never a single worker's partial view."""
     try:
-        tmp = "translations.json.tmp"
-        with open(tmp, "w", encoding="utf-8") as f:
-            json.dump(all_translations, f, indent=4, ensure_ascii=False)
-        os.replace(tmp, "translations.json")
-        import shutil
-        shutil.copy2("translations.json", "translations_backup.json")
+        if translation_store.export_json(TRANSLATIONS_FILE):
+            import shutil
+            shutil.copy2(TRANSLATIONS_FILE, TRANSLATIONS_BACKUP)
     except Exception as e:
         print(f"Error saving translation file: {e}")
         sendlog(f"Error saving translation file: {e}")
@@ -95,27 +128,30 @@ def translation_file_thread():
         time.sleep(60)
         with translations_lock:
             save_translations()
+        try:
+            purged = translation_store.purge_ephemeral()
+            if purged:
+                print(f"Purged {purged} expired event-content translations")
+        except Exception as e:
+            print(f"Translation purge failed: {e}")
 
 
-def translate_thread(text, lang, save_file):
-    global all_translations
-    global non_file_translations
-    try:
-        async def _translate():
-            async with Translator() as t:
-                return await t.translate(text, dest=lang)
-        result = asyncio.run(_translate())
-        translated = result.text
-        print(f"Translated '{text}' to '{translated}' in language '{lang}'")
-    except Exception as e:
-        print(f"Translation error: {e}")
-        translated = text
+def draft_purge_thread():
+    """Anonymous drafts outlive nothing: drop them once their session could have expired."""
+    while True:
+        time.sleep(3600)
+        try:
+            purged = draft_store.purge_anonymous(SESSION_MAX_AGE)
+            if purged:
+                print(f"Purged {purged} abandoned anonymous drafts")
+        except Exception as e:
+            print(f"Draft purge failed: {e}")
 
-    with translations_lock:
-        translate_dict = non_file_translations if not save_file else all_translations
-        existing = translate_dict.get(text, {})
-        existing[lang] = translated
-        translate_dict[text] = existing
+
+def translate_thread(text, lang, save_file):
+    translated = translate_one(text, lang)
+    print(f"Translated '{text}' to '{translated}' in language '{lang}'")
+    translation_store.put(text, lang, translated, persist=save_file)
 
 
 async def checkevent():
@@ -129,49 +165,115 @@ async def checkevent():
             await asyncio.sleep(60)
 
 # --- Rate Limiter Helper ---
+# One token bucket per (route policy, identity) — an OTP request no longer
+# blocks AI generation for the same client. See modules/rate_limiter.py.
+RATE_POLICIES = [
+    RatePolicy("forgetotp", limit=1, window=60, message="Please wait {wait} seconds before requesting another OTP."),
+    RatePolicy("signupotp", limit=1, window=60, message="Please wait {wait} seconds before requesting another OTP."),
+    # Same budget as before (1 per minute); keyed by user so people behind a shared NAT don't block each other
+    RatePolicy("ai_description", limit=1, window=60, identity="user", json=True),
+    # Autosave is debounced client-side; this only stops scripted PUTs minting sessions and drafts
+    RatePolicy("draft_save", limit=30, window=60, identity="user", json=True),
+    # Bursts of 20 for search-as-you-type, 2/s sustained — each miss holds an executor thread
+    RatePolicy("search", limit=20, window=10, identity="user", json=True),
+]
+# Shared by every worker and kept across restarts unless RATE_LIMIT_BACKEND=memory
+if os.environ.get("RATE_LIMIT_BACKEND", "sqlite") == "memory":
+    _rate_limit_backend = MemoryRateLimitBackend()
+else:
+    _rate_limit_backend = SQLiteRateLimitBackend(os.environ.get("RATE_LIMIT_DB", "ratelimits.db"))
+rate_limiter = RateLimiter(RATE_POLICIES, backend=_rate_limit_backend)
+
+async def enforce_rate_limit(request: Request, policy_name: str):
+    """Record one hit for the request's identity; raises RateLimitExceeded (→ 429 + Retry-After)."""
+    policy = rate_limiter.policies[policy_name]
+    identity = request.client.host if request.client else "unknown"
+    if policy.identity == "user":
+        identity = request.session.get("username") or identity
+    if isinstance(rate_limiter.backend, MemoryRateLimitBackend):
+        rate_limiter.enforce(policy_name, identity)
+    else:
+        # SQLite may wait on another worker's write lock (busy_timeout) — never on the event loop
+        await run_in_threadpool(rate_limiter.enforce, policy_name, identity)
+
+def rate_limit(policy_name: str):
+    """FastAPI dependency form of enforce_rate_limit()."""
+    async def _dependency(request: Request):
+        await enforce_rate_limit(request, policy_name)
+
+    return _dependency
+
 def check_rate_limit(ip: str, window: int = 30) -> tuple[bool, int]:
     """
-    Returns (is_allowed, wait_seconds).
-    Also prunes stale entries to prevent memory leak.
+    Returns (is_allowed, wait_seconds) — one request per `window` seconds per ip.
+    Kept for ad-hoc callers; routes should use Depends(rate_limit(...)).
     """
-    now = time.time()
-    # Prune entries older than 2x the window
-    expired = [k for k, v in rate_limit_store.items() if now - v > window * 2]
-    for k in expired:
-        del rate_limit_store[k]
+    name = f"legacy_{window}"
+    if name not in rate_limiter.policies:
+        rate_limiter.policies[name] = RatePolicy(name, limit=1, window=window)
+    return rate_limiter.check(name, ip)
 
-    if ip in rate_limit_store:
-        elapsed = now - rate_limit_store[ip]
-        if elapsed < window:
-            return False, int(window - elapsed)
+# --- FastAPI Setup ---
 
-    rate_limit_store[ip] = now
-    return True, 0
+# --- Startup Timing ---
+startup_timings: dict = {}
 
-def _prune_rate_limit_store():
-    while True:
-        time.sleep(300)  # every 5 minutes
-        now = time.time()
-        expired = [k for k, v in list(rate_limit_store.items()) if now - v > 120]
-        for k in expired:
-            del rate_limit_store[k]
+async def _timed_phase(name, fn, *args):
+    """Run a blocking startup step in the executor and record how long it took."""
+    started = time.perf_counter()
+    try:
+        return await asyncio.get_event_loop().run_in_executor(None, fn, *args)
+    finally:
+        startup_timings[name] = time.perf_counter() - started
 
-# --- FastAPI Setup ---
+def precompile_templates():
+    """Compile every template now (or load it from the bytecode cache) instead of on first hit."""
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    load_translations()
     loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, _init_pool)   # fill queue with exactly _DB_POOL_MAX connections
+    started = time.perf_counter()
+    await _timed_phase("translations", load_translations)
+
+    # Independent steps — network (pool), disk (assets) and CPU (templates) overlap
+    assets, pool, compiled = await asyncio.gather(
+        _timed_phase("assets", build_assets, "static", "static_build"),
+        _timed_phase("pool_init", _init_pool),
+        _timed_phase("templates", precompile_templates),
+        return_exceptions=True,
+    )
+    if isinstance(assets, Exception):
+        print(f"Static asset build failed, serving originals: {assets}")
+    else:
+        static_files.load(assets)
+    if isinstance(pool, Exception):
+        raise pool   # no database, no app — fail startup as before
+    if isinstance(compiled, Exception):
+        print(f"Template precompile failed, compiling on demand: {compiled}")
+        compiled = 0
+    startup_timings["lifespan"] = time.perf_counter() - started
+    print("Startup: " + ", ".join(f"{k} {v * 1000:.0f}ms" for k, v in startup_timings.items())
+          + f" ({compiled} templates)")
+
     threading.Thread(target=translation_file_thread, name="TranslationFileThread", daemon=True).start()
-    threading.Thread(target=_prune_rate_limit_store, daemon=True, name="RateLimitPruner").start()
+    threading.Thread(target=draft_purge_thread, name="DraftPurge", daemon=True).start()
+    threading.Thread(target=sync_search_index, name="SearchIndexSync", daemon=True).start()
+    threading.Thread(target=autocomplete_thread, name="Autocomplete", daemon=True).start()
+    threading.Thread(target=ai_backend.warm, name="GeminiWarmup", daemon=True).start()
+    mail_spool.start()   # drain anything left in the spool by the previous run
     task = asyncio.create_task(checkevent())
     print("Starting background check also")
     yield
     # Shutdown — drain the queue and close every connection
     task.cancel()
     _translation_executor.shutdown(wait=False)
+    await loop.run_in_executor(None, mail_spool.stop)
+    await loop.run_in_executor(None, log_outbox.flush)
     while not _db_idle_queue.empty():
         try:
             db = _db_idle_queue.get_nowait()
@@ -181,14 +283,44 @@ async def lifespan(app: FastAPI):
 
 app = FastAPI(lifespan=lifespan)
 
-# Session Middleware
-app.add_middleware(SessionMiddleware, secret_key=os.environ.get("FLASK_SECRET", "supersecretkey"))
+# Admin-only per-request profiling (X-Profile header / ?_profile=) — added first so it
+# sits inside the session middleware and can see request.session
+app.add_middleware(ProfilingMiddleware)
+
+# Session Middleware — server-side store, the cookie only carries a signed session id
+if os.environ.get("SESSION_BACKEND", "sqlite") == "memory":
+    _session_backend = MemorySessionBackend()
+else:
+    _session_backend = SQLiteSessionBackend(os.environ.get("SESSION_DB", "sessions.db"))
+app.add_middleware(
+    ServerSessionMiddleware,
+    secret_key=os.environ.get("FLASK_SECRET", "supersecretkey"),
+    backend=_session_backend,
+    session_cookie=SESSION_COOKIE,
+)
+
+# Compression — br/gzip for rendered pages and API responses (static assets are pre-compressed)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get("COMPRESSION_MIN_SIZE", "1024")),
+    gzip_level=int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6")),
+    brotli_quality=int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "4")),
+)
+# Outermost, so route latency includes session load and compression
+app.add_middleware(MetricsMiddleware)
 
 # SocketIO Setup — single mount only
 sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+instrument_socketio(sio)
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+static_files = AssetStaticFiles(directory="static", build_dir="static_build")
+app.mount("/static", static_files, name="static")
 templates = Jinja2Templates(directory="templates")
+# Compiled templates persist across restarts / replicas sharing the directory
+_jinja_cache_dir = os.environ.get("JINJA_CACHE_DIR", ".jinja_cache")
+os.makedirs(_jinja_cache_dir, exist_ok=True)
+templates.env.bytecode_cache = FileSystemBytecodeCache(_jinja_cache_dir)
+templates.env.globals["asset_url"] = static_files.url
 
 # --- Database Connection Pool (Queue-based, strict max 10) ---
 # --- Database Connection Pool (Queue + auto-refill, strict max) ---
@@ -219,8 +351,15 @@ _db_idle_queue: _queue_mod.Queue = _queue_mod.Queue()   # idle connections (no m
 _db_open_count: int  = 0                                 # total open (idle + in-use)
 _db_count_lock: threading.Lock = threading.Lock()        # guards _db_open_count
 
+# LOCAL_DB=path switches every pooled connection to a local SQLite file (see modules/local_db.py)
+LOCAL_DB = os.environ.get("LOCAL_DB")
+if LOCAL_DB:
+    init_local_db(LOCAL_DB)
+
 def _open_connection():
     """Open and configure one SQLiteCloud connection, explicitly selecting the database."""
+    if LOCAL_DB:
+        return connect_local(LOCAL_DB)
     db = sq.connect(os.environ.get("SQLITECLOUD"))
     db.row_factory = sq.Row
     # Explicitly USE DATABASE so it never shows as NULL in LIST CONNECTIONS
@@ -255,9 +394,14 @@ def _try_open_and_enqueue() -> bool:
         return False
 
 def _init_pool():
-    """Open _DB_POOL_INIT connections eagerly; the rest grow on demand."""
+    """
+    Open _DB_POOL_INIT connections eagerly; the rest grow on demand.
+    Raises RuntimeError if none of them could be opened.
+    """
     for _ in range(_DB_POOL_INIT):
         _try_open_and_enqueue()
+    if _DB_POOL_INIT and _db_open_count == 0:
+        raise RuntimeError("DB pool init failed: no connection could be opened")
     print(f"DB pool ready: {_db_open_count}/{_DB_POOL_MAX} connections (auto-refill active)")
 
 def _pool_acquire(timeout: int = 30) -> tuple:
@@ -270,6 +414,7 @@ def _pool_acquire(timeout: int = 30) -> tuple:
     pre-open a replacement so the next caller also gets an instant hit.
     """
     global _db_open_count
+    started = time.perf_counter()
 
     # Fast path 1: grab an already-idle connection (non-blocking)
     try:
@@ -307,7 +452,9 @@ def _pool_acquire(timeout: int = 30) -> tuple:
     # for the next caller — this is the "auto-refill" step.
     threading.Thread(target=_try_open_and_enqueue, daemon=True, name="DBPoolRefill").start()
 
-    return db, db.cursor()
+    DB_POOL_WAIT.observe(time.perf_counter() - started)
+    # Every DB path gets its cursor here, so this is the one query-timing hook
+    return db, TimedCursor(db.cursor())
 
 def _pool_release(db):
     """Return a connection to the idle queue (always — the count never changes on release)."""
@@ -343,11 +490,12 @@ def sqldb(function):
 async def run_query(query: str, params: tuple = (), fetchmode: str = "all"):
     """Run a single query asynchronously from the pool."""
     loop = asyncio.get_event_loop()
+    site = call_site()
 
     def _execute():
         db, c = _pool_acquire()
         try:
-            c.execute(query, params)
+            c.execute(query, params, site=site)
             if fetchmode == "all":
                 result = c.fetchall()
             elif fetchmode == "one":
@@ -386,8 +534,10 @@ class AsyncDB:
         return self._loop.run_in_executor(None, fn)
 
     async def execute(self, query, params=()):
+        site = call_site()   # the route, not this executor thread
+
         def _do():
-            self._c.execute(query, params)
+            self._c.execute(query, params, site=site)
             return self._c
         await self._run(_do)
         return self
@@ -433,40 +583,56 @@ def datetimeformat(value):
 templates.env.filters["datetimeformat"] = datetimeformat
 
 def translate_text(text, lang=None, save_file=True):
-    global all_translations
-    global non_file_translations
     text = text.replace("\n", "")
     text = " ".join(text.split())
     if not lang or lang == "en":
         return text
-    combined_translations = {**all_translations, **non_file_translations}
-    if not combined_translations.get(text) or not combined_translations.get(text).get(lang):
-        # Use thread pool instead of spawning raw threads
-        _translation_executor.submit(translate_thread, text, lang, save_file)
-    translationss = all_translations if save_file else non_file_translations
-    return translationss.get(text, {}).get(lang, text)
+    translated = translation_store.get(text, lang, persist=save_file)
+    if translated is None:
+        # Only the worker that wins the claim translates; others show the source text meanwhile
+        if translation_store.claim(text, lang, persist=save_file):
+            _translation_executor.submit(translate_thread, text, lang, save_file)
+        return text
+    return translated
+
+def page_cache_control(request: Request) -> str:
+    """
+    Visitors without a session cookie all get the same English page, so a
+    shared cache / CDN may keep it briefly. Everyone else revalidates.
+    """
+    if SESSION_COOKIE in request.cookies:
+        return PRIVATE_REVALIDATE
+    return SHARED_PAGE_CACHE
+
+def page_etag(request: Request, *data) -> str:
+    """ETag over the page data plus everything per-viewer the templates read."""
+    session = request.session
+    lang = session.get("lang", "en")
+    viewer = [session.get(k) for k in ("username", "name", "email", "role", "events")]
+    translated = translation_store.version(lang) if lang != "en" else 0
+    return make_etag(data, lang, translated, viewer, static_files.version)
 
 @app.post("/translate_event")
 async def translate_event(request: Request):
     data = await request.json()
     lang = request.session.get("lang", "en")
-    output = {}
-    threads = []
-
-    def transl(text, lang, key):
-        async def _do():
-            async with Translator() as t:
-                return await t.translate(text, dest=lang)
-        result = asyncio.run(_do())
-        output[key] = result.text
+    eventid = data.pop("eventid", None)
+    fields = list(data.keys())
 
-    for field, value in data.items():
-        threads.append(threading.Thread(target=transl, args=(value, lang, field)))
+    # One batched call for every field instead of a thread per field
+    loop = asyncio.get_event_loop()
+    translated = await loop.run_in_executor(
+        _translation_executor,
+        lambda: get_translator().translate_batch([data[f] for f in fields], lang)
+    )
+    output = dict(zip(fields, translated))
 
-    for x in threads:
-        x.start()
-    for x in threads:
-        x.join()
+    # Make the event findable in this language from now on
+    if eventid is not None and str(eventid).isdigit():
+        try:
+            await loop.run_in_executor(None, event_search.index_translation, int(eventid), lang, data, output)
+        except Exception as e:
+            print(f"Error indexing translation of event {eventid}: {e}")
 
     return JSONResponse(content=output)
 
@@ -480,6 +646,13 @@ async def custom_http_exception_handler(request, exc):
         "detail": exc.detail
     }, status_code=exc.status_code)
 
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exception_handler(request, exc):
+    headers = {"Retry-After": str(exc.retry_after)}
+    if exc.policy.json:
+        return JSONResponse(content={"wait": exc.retry_after}, status_code=429, headers=headers)
+    return Response(content=str(exc), media_type="text/plain", status_code=429, headers=headers)
+
 @app.exception_handler(500)
 async def internal_exception_handler(request, exc):
     return templates.TemplateResponse("error.html", {
@@ -496,7 +669,6 @@ async def home(request: Request, preview: bool = False, db: AsyncDB = Depends(ge
     # if not hostsite:
     #     hostsite = request.base_url
     session = request.session
-    print(session)
     currentuser = session.get("name", "User")
     currentuname = session.get("username")
 
@@ -562,6 +734,12 @@ async def eventfromeventid(request: Request, eventid: int, db: AsyncDB = Depends
     session = request.session
     await db.execute("SELECT * FROM eventdetail WHERE eventid=(?)", (eventid, ))
     getevent = await db.fetchone()
+
+    etag = page_etag(request, dict(getevent) if getevent else None)
+    cache_control = page_cache_control(request)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control, vary="Cookie")
+
     currentuname = session.get("username")
     user_lang = session.get("lang", "en")
     isadmin = session.get("role") == "admin"
@@ -576,7 +754,7 @@ async def eventfromeventid(request: Request, eventid: int, db: AsyncDB = Depends
     def bound_translate(text, save_file=True):
         return translate_text(text.strip(), lang=user_lang, save_file=save_file)
 
-    return templates.TemplateResponse(request, "viewevent.html", {
+    response = templates.TemplateResponse(request, "viewevent.html", {
         "isadmin": bool(isadmin),
         "c_user": str(currentuname).strip(),
         "eventdetails": getevent,
@@ -584,6 +762,7 @@ async def eventfromeventid(request: Request, eventid: int, db: AsyncDB = Depends
         "user_language": user_lang,
         "userdetails": ud
     })
+    return apply_cache_headers(response, etag, cache_control, vary="Cookie")
 
 @app.post("/forgetpassword")
 async def forgetpassword(request: Request, db: AsyncDB = Depends(get_db)):
@@ -612,17 +791,8 @@ async def forgetpassword(request: Request, db: AsyncDB = Depends(get_db)):
     return Response(content="Password Change Success!", media_type="text/plain")
 
 
-@app.post("/sendforgetotp")
+@app.post("/sendforgetotp", dependencies=[Depends(rate_limit("forgetotp"))])
 async def sendforgetotp(request: Request, email: str = Form(...), db: AsyncDB = Depends(get_db)):
-    client_ip = request.client.host
-    allowed, wait = check_rate_limit(client_ip, window=60)
-    if not allowed:
-        return Response(
-            content=f"Please wait {wait} seconds before requesting another OTP.",
-            media_type="text/plain",
-            status_code=429
-        )
-
     getemail = await db.execute("SELECT email FROM userdetails WHERE email=(?) OR username=(?)", (email,email))
     getemail = await db.fetchone()
 
@@ -632,21 +802,12 @@ async def sendforgetotp(request: Request, email: str = Form(...), db: AsyncDB =
     email = getemail["email"]
     otp = random.randint(1111,9999)
     request.session["forgetotp"] = f"{otp}_{email}"
-    sendmailthread(email, "Reset Password OTP For Sahyog Sutra", f"Use this OTP to reset your password in the Sahyog Setu!\n\nOTP: {otp}")
+    sendmail(email, "Reset Password OTP For Sahyog Sutra", f"Use this OTP to reset your password in the Sahyog Setu!\n\nOTP: {otp}")
     return Response(content=f"OTP Sent to {email}! Please check spam folder if can't find it.", media_type="text/plain")
 
 
-@app.post("/sendsignupotp")
+@app.post("/sendsignupotp", dependencies=[Depends(rate_limit("signupotp"))])
 async def sendotp(request: Request, email: str = Form(...), db: AsyncDB = Depends(get_db)):
-    client_ip = request.client.host
-    allowed, wait = check_rate_limit(client_ip, window=60)
-    if not allowed:
-        return Response(
-            content=f"Please wait {wait} seconds before requesting another OTP.",
-            media_type="text/plain",
-            status_code=429
-        )
-
     await db.execute("SELECT * FROM userdetails WHERE email=?", (email,))
     checkexists = await db.fetchone()
     if checkexists:
@@ -655,7 +816,7 @@ async def sendotp(request: Request, email: str = Form(...), db: AsyncDB = Depend
     otp = random.randint(1111, 9999)
     request.session["signupotp"] = f"{otp}_{email}"
 
-    sendmailthread(email, "Signup OTP For Sahyog Sutra", email_send_message(otp), type="html")
+    sendmail(email, "Signup OTP For Sahyog Sutra", email_send_message(otp), type="html")
     return Response(content=f"OTP Sent to {email}! Please check spam folder if can't find it.", media_type="text/plain")
 
 @app.post("/setlanguage/{lang}")
@@ -712,33 +873,13 @@ async def setlanguage(request: Request, lang: str):
 #
 @app.post("/generate_ai_description")
 async def generate_ai_description(request: Request):
-    client_ip = request.client.host
-    allowed, wait = check_rate_limit(client_ip, window=60)
-    if not allowed:
-        return JSONResponse(content={"wait": wait}, status_code=429)
-
+    form_data = await request.form()
+    values = ai_description.event_values(form_data)
+    # Cached or already-running generations don't cost a rate-limit slot
+    if not ai_service.is_known(values):
+        await enforce_rate_limit(request, "ai_description")
     try:
-        form_data = await request.form()
-        field = ["eventname", "starttime", "endtime", "eventstartdate", "enddate", "location", "category"]
-        values = [[x, form_data.get(x)] for x in field if form_data.get(x)]
-
-        content = f"""Generate a description based on following details in pure english language.
-        Context:
-        Details of event: {values}
-        Generate total 4x descriptions (max 500 words each). Include hashtags. Reply strictly in JSON:
-        {{"desc1": "Formal tone", "desc2": "Informal tone", "desc3": "Promotional tone", "desc4": "Entertaining/Fun tone"}}"""
-
-        response = client.models.generate_content(
-            model="gemini-3-flash-preview", contents=content
-        )
-
-        output = response.text
-
-        # Clean up markdown code fences if present
-        if "```json" in output:
-            output = output.replace("```json", "").replace("```", "")
-
-        to_json = json.loads(output.strip())
+        to_json = await ai_service.generate(values)
         return JSONResponse(content=to_json)
 
     except Exception as e:
@@ -746,6 +887,41 @@ async def generate_ai_description(request: Request):
         return Response(content="Error generating description. Please try again later.", media_type="text/plain", status_code=500)
 
 
+@app.post("/generate_ai_description/stream")
+async def generate_ai_description_stream(request: Request):
+    """Server-Sent Events: one `tone` event per description as soon as it is ready, then `done`."""
+    form_data = await request.form()
+    values = ai_description.event_values(form_data)
+    if not ai_service.is_known(values):
+        await enforce_rate_limit(request, "ai_description")
+
+    async def _events():
+        tones = ai_service.stream(values)
+        try:
+            async for key, text in tones:
+                if await request.is_disconnected():
+                    break
+                yield f"event: tone\ndata: {json.dumps({'key': key, 'text': text})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            print(f"AI Description Generation Error: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': 'Error generating description. Please try again later.'})}\n\n"
+        finally:
+            await tones.aclose()   # cancels the generation if no one else is waiting on it
+
+    return StreamingResponse(_events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def parse_chat_history(all_msgs_str):
+    """messages2.msgs (str of a list of (username, message, time)) -> list of tuples."""
+    if all_msgs_str:
+        all_msgs = ast.literal_eval(all_msgs_str)
+    else:
+        all_msgs = []
+
+    return [(x[0], x[1], x[2]) for x in all_msgs] if all_msgs else []
+
 @app.get("/group-chat/from-event/{eventid}")
 async def group_chat_from_event(request: Request, eventid: int, db: AsyncDB = Depends(get_db)):
     currentuname = request.session.get("username", "anonymous")
@@ -757,14 +933,7 @@ async def group_chat_from_event(request: Request, eventid: int, db: AsyncDB = De
 
     await db.execute("SELECT * FROM messages2 WHERE eventid=?", (eventid,))
     all_msgs_row = await db.fetchone()
-    all_msgs_str = all_msgs_row["msgs"] if all_msgs_row else None
-
-    if all_msgs_str:
-        all_msgs = ast.literal_eval(all_msgs_str)
-    else:
-        all_msgs = []
-
-    messages = [(x[0], x[1], x[2]) for x in all_msgs] if all_msgs else []
+    messages = parse_chat_history(all_msgs_row["msgs"] if all_msgs_row else None)
 
     return templates.TemplateResponse(request, "groupchat.html", {
         "messages": messages,
@@ -788,7 +957,10 @@ async def user_profile(request: Request, username: str, db: AsyncDB = Depends(ge
     current_user = request.session.get("username")
     is_own_profile = (current_user == username)
     if is_own_profile:
-        request.session["role"] = str(userfulldetails["role"]) or "user"
+        role = str(userfulldetails["role"]) or "user"
+        if request.session.get("role") != role:
+            request.session.regenerate()
+        request.session["role"] = role
         try:
             events = userfulldetails["events"]
             events = events.split(",")
@@ -807,18 +979,28 @@ async def changetemplate(request: Request):
     request.session["template"] = "index2.html" if ct == "index.html" else "index.html"
     return Response(content="Template Changed", media_type="text/plain")
 
+def _draft_owner(request: Request, create: bool = False):
+    """Drafts follow the logged-in user; anonymous visitors get a per-session draft id."""
+    username = request.session.get("username")
+    if username:
+        return f"user:{username}"
+    draft_id = request.session.get("draft_id")
+    if not draft_id and create:
+        draft_id = request.session["draft_id"] = os.urandom(12).hex()
+    return f"anon:{draft_id}" if draft_id else None
+
 @app.get("/show_add_form")
 async def show_add_form(request: Request):
-    fi = ["eventname", "email", "starttime", "endtime", "eventstartdate", "enddate", "location", "category", "description"]
-    fv = {x: request.session.get(x, "") for x in fi}
+    owner = _draft_owner(request)
+    draft, _ = draft_store.get(owner) if owner else ({}, 0)
+    fv = {x: draft.get(x, "") for x in DRAFT_FIELDS}
+    fv["email"] = request.session.get("email", "")
 
     user_lang = request.session.get("lang", "en")
     def bound_translate(text, save_file=True):
         return translate_text(text.strip(), lang=user_lang, save_file=save_file)
 
-    categories = {}
-    with open("events.json", "r") as f:
-        categories = json.load(f)
+    categories = reference_data.categories()
 
     return templates.TemplateResponse(request, "addevent.html", {
         "fvalues": fv,
@@ -826,6 +1008,19 @@ async def show_add_form(request: Request):
         "categories": categories
     })
 
+def group_campaigns(edetailslist):
+    """(trending_events, allevents by category, distinct categories, active count) for campaigns.html."""
+    trending_events = sorted(edetailslist, key=lambda x: x['likes'], reverse=True)[:4]
+
+    alleventscat = list({x["category"] for x in edetailslist})
+    # Event types of the same category sit next to each other, in events.json order
+    allevents = {}
+    for x in sorted(edetailslist, key=lambda e: reference_data.category_sort_key(e["category"])):
+        allevents.setdefault(x["category"], []).append(x)
+
+    active_events = sum(len(v) for v in allevents.values())
+    return trending_events, allevents, alleventscat, active_events
+
 @app.get("/show_campaigns")
 async def show_campaigns(request: Request, db: AsyncDB = Depends(get_db)):
     global _campaigns_cache, active_events
@@ -840,18 +1035,13 @@ async def show_campaigns(request: Request, db: AsyncDB = Depends(get_db)):
         allevents = cached["allevents"]
         alleventscat = cached["alleventscat"]
         active_events = cached["active_events"]
+        data_etag = cached["etag"]
     else:
         await db.execute("SELECT * FROM eventdetail")
         edetailslist = [dict(row) for row in await db.fetchall()]
 
-        trending_events = sorted(edetailslist, key=lambda x: x['likes'], reverse=True)[:4]
-
-        alleventscat = list({x["category"] for x in edetailslist})
-        allevents = {}
-        for x in edetailslist:
-            allevents.setdefault(x["category"], []).append(x)
-
-        active_events = sum(len(v) for v in allevents.values())
+        trending_events, allevents, alleventscat, active_events = group_campaigns(edetailslist)
+        data_etag = make_etag(edetailslist)
 
         _campaigns_cache = {
             "data": {
@@ -860,6 +1050,7 @@ async def show_campaigns(request: Request, db: AsyncDB = Depends(get_db)):
                 "allevents": allevents,
                 "alleventscat": alleventscat,
                 "active_events": active_events,
+                "etag": data_etag,
             },
             "ts": time.time()
         }
@@ -878,7 +1069,10 @@ async def show_campaigns(request: Request, db: AsyncDB = Depends(get_db)):
     if viewuserevent == currentuname:
         await db.execute("SELECT events, role FROM userdetails WHERE username=?", (currentuname,))
         fet = await db.fetchone()
-        request.session["role"] = str(fet["role"]) or "user"
+        role = str(fet["role"]) or "user"
+        if request.session.get("role") != role:
+            request.session.regenerate()
+        request.session["role"] = role
         try:
             spl = fet["events"].split(",")
             request.session["events"] = len(spl)
@@ -887,10 +1081,15 @@ async def show_campaigns(request: Request, db: AsyncDB = Depends(get_db)):
 
     sortby = request.session.get("sortby", "eventstartdate")
 
+    etag = page_etag(request, data_etag, userdetails, sortby, viewuserevent, ve)
+    cache_control = page_cache_control(request)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control, vary="Cookie")
+
     def bound_translate(text, save_file=True):
         return translate_text(text.strip(), lang=user_lang, save_file=save_file)
 
-    return templates.TemplateResponse(request, "campaigns.html", {
+    response = templates.TemplateResponse(request, "campaigns.html", {
         "allevents": allevents,
         "userdetails": userdetails,
         "viewyourevents": ve,
@@ -902,6 +1101,7 @@ async def show_campaigns(request: Request, db: AsyncDB = Depends(get_db)):
         "trending_events": trending_events,
         "user_language": user_lang
     })
+    return apply_cache_headers(response, etag, cache_control, vary="Cookie")
 
 @app.post("/viewyourevents/{username}")
 async def viewyourevents(request: Request, username: str):
@@ -948,6 +1148,7 @@ async def signup(request: Request, db: AsyncDB = Depends(get_db)):
             "INSERT INTO userdetails(username, password, name, email) VALUES(?, ?, ?, ?)",
             (username, password, name, email)
         )
+        request.session.regenerate()
         request.session["username"] = username
         request.session["name"] = name
         request.session["email"] = email
@@ -973,6 +1174,7 @@ async def login(request: Request, db: AsyncDB = Depends(get_db)):
     elif password != fetched["password"]:
         return Response(content="Wrong Password", media_type="text/plain")
     else:
+        request.session.regenerate()
         request.session["username"] = fetched["username"]
         request.session["name"] = fetched["name"]
         request.session["email"] = fetched["email"]
@@ -1014,6 +1216,10 @@ async def addeventreq(request: Request, db: AsyncDB = Depends(get_db)):
         None,
         lambda: add_event_mod.addeventrequest(db._c, dict(form_data), request.session)
     )
+    if "Registered" in res:
+        owner = _draft_owner(request)
+        if owner:
+            draft_store.delete(owner)
     return Response(content=res, media_type="text/plain")
 
 @app.get("/show_pending_events")
@@ -1027,9 +1233,7 @@ async def pendingevents(request: Request, db: AsyncDB = Depends(get_db)):
     await db.execute("SELECT * FROM eventreq")
     pe = [dict(row) for row in await db.fetchall()]
 
-    categories = {}
-    with open("events.json", "r") as f:
-        categories = json.load(f)
+    categories = reference_data.categories()
 
     return templates.TemplateResponse(request, "pendingevents.html", {"pendingevents": pe, "categories": categories})
 
@@ -1048,6 +1252,7 @@ async def deleteevent(request: Request, eventid: int, db: AsyncDB = Depends(get_
 
 @app.get("/logout")
 async def logout(request: Request):
+    request.session.regenerate()
     u = request.session.pop('username', None)
     n = request.session.pop('name', None)
     e = request.session.pop('email', None)
@@ -1058,13 +1263,39 @@ async def logout(request: Request):
 
 @app.post("/save_draft")
 async def save_draft(request: Request):
+    """Legacy one-field save — merges into the server-side draft."""
+    await enforce_rate_limit(request, "draft_save")
     form_data = await request.form()
     field = form_data.get("field")
     value = form_data.get("value")
-    if value and value.strip():
-        request.session[field] = value.strip()
+    if field and value and value.strip():
+        draft_store.save(_draft_owner(request, create=True), {field: value}, merge=True)
     return Response(content="DRAFT", media_type="text/plain")
 
+@app.get("/api/draft")
+async def get_draft(request: Request):
+    owner = _draft_owner(request)
+    fields, version = draft_store.get(owner) if owner else ({}, 0)
+    return JSONResponse({"version": version, "fields": fields})
+
+@app.put("/api/draft")
+async def put_draft(request: Request):
+    """Save the whole add-event form at once. Unchanged payloads are not rewritten."""
+    await enforce_rate_limit(request, "draft_save")
+    data = await request.json()
+    fields = data.get("fields") if isinstance(data, dict) else None
+    if not isinstance(fields, dict):
+        return JSONResponse({"detail": "Expected {\"fields\": {...}}"}, status_code=400)
+    version, changed = draft_store.save(_draft_owner(request, create=True), fields)
+    return JSONResponse({"version": version, "changed": changed})
+
+@app.delete("/api/draft")
+async def delete_draft(request: Request):
+    owner = _draft_owner(request)
+    if owner:
+        draft_store.delete(owner)
+    return JSONResponse({"version": 0})
+
 @app.get("/decline_event/{eventid}/{reason}")
 async def decline_event(request: Request, eventid: int, reason: str, db: AsyncDB = Depends(get_db)):
     u = request.session.get("username")
@@ -1102,14 +1333,16 @@ async def clearsession(request: Request):
 
 @app.get("/dummyevent")
 async def dummyevent(request: Request):
-    request.session["eventname"] = random.choice(["Community Tree Plantation", "Neighborhood Blood Donation Camp", "Local Cleanliness Drive"])
-    request.session["description"] = "Join us for a community tree plantation drive to make our neighborhood greener and healthier!"
-    request.session["location"] = random.choice(["Central Park", "Community Center", "City Hall", "Riverside Park", "Downtown Square"])
-    request.session["category"] = random.choice(["Tree Plantation", "Blood Donation", "Cleanliness Drive"])
-    request.session["eventstartdate"] = f"{random.randint(2026, 2028)}-{random.randint(10, 12):02d}-{random.randint(10, 28):02d}"
-    request.session["enddate"] = f"{random.randint(2026, 2028)}-{random.randint(10, 12):02d}-{random.randint(10, 28):02d}"
-    request.session["starttime"] = f"{random.randint(10, 12)}:{random.randint(10, 59)}"
-    request.session["endtime"] = f"{random.randint(10, 12)}:{random.randint(10, 59)}"
+    draft_store.save(_draft_owner(request, create=True), {
+        "eventname": random.choice(["Community Tree Plantation", "Neighborhood Blood Donation Camp", "Local Cleanliness Drive"]),
+        "description": "Join us for a community tree plantation drive to make our neighborhood greener and healthier!",
+        "location": random.choice(["Central Park", "Community Center", "City Hall", "Riverside Park", "Downtown Square"]),
+        "category": random.choice(["Tree Plantation", "Blood Donation", "Cleanliness Drive"]),
+        "eventstartdate": f"{random.randint(2026, 2028)}-{random.randint(10, 12):02d}-{random.randint(10, 28):02d}",
+        "eventenddate": f"{random.randint(2026, 2028)}-{random.randint(10, 12):02d}-{random.randint(10, 28):02d}",
+        "eventstarttime": f"{random.randint(10, 12)}:{random.randint(10, 59)}",
+        "eventendtime": f"{random.randint(10, 12)}:{random.randint(10, 59)}",
+    })
     return RedirectResponse(url="/#add", status_code=303)
 
 @app.get("/admin/pool/close")
@@ -1187,6 +1420,72 @@ async def admin_pool_status(request: Request):
         "hint": "Use /admin/pool/kill/{id} to close a specific connection"
     })
 
+@app.get("/admin/queries")
+async def admin_queries(request: Request, n: int = 20, by: str = "total"):
+    """Top statements by total (or calls / max / rows) plus the recent slow-query log, for this worker."""
+    if request.session.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    if by not in ("total", "calls", "max", "rows"):
+        raise HTTPException(status_code=400, detail="by must be total, calls, max or rows")
+    return JSONResponse({
+        "slow_threshold_ms": query_log.slow_ms,
+        "top": query_log.top(n, by),
+        "slow": query_log.slowest(),
+    })
+
+@app.get("/admin/queries/reset")
+async def admin_queries_reset(request: Request):
+    if request.session.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    query_log.reset()
+    sendlog(f"Admin reset query stats — {request.session.get('username')}")
+    return JSONResponse({"status": "reset"})
+
+# --- Rolling sampler: profile the whole worker for a fixed window ---
+_rolling_sampler: Optional[StackSampler] = None
+ROLLING_SAMPLER_MAX_SECONDS = 600
+
+@app.get("/admin/profile/sampler/start")
+async def admin_sampler_start(request: Request, seconds: int = 60, interval_ms: float = 10):
+    global _rolling_sampler
+    if request.session.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    if _rolling_sampler is not None and _rolling_sampler.running:
+        return JSONResponse({"status": "already running", **_rolling_sampler.status()}, status_code=409)
+    seconds = max(1, min(seconds, ROLLING_SAMPLER_MAX_SECONDS))
+    _rolling_sampler = StackSampler(interval=max(interval_ms, 1) / 1000).start(duration=seconds)
+    sendlog(f"Admin started stack sampler for {seconds}s — {request.session.get('username')}")
+    return JSONResponse({"status": "started", "seconds": seconds, **_rolling_sampler.status()})
+
+@app.get("/admin/profile/sampler")
+async def admin_sampler_status(request: Request):
+    if request.session.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    if _rolling_sampler is None:
+        return JSONResponse({"status": "never started"})
+    return JSONResponse(_rolling_sampler.status())
+
+@app.get("/admin/profile/sampler/stop")
+async def admin_sampler_stop(request: Request):
+    if request.session.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    if _rolling_sampler is not None:
+        await asyncio.get_event_loop().run_in_executor(None, _rolling_sampler.stop)
+    return JSONResponse(_rolling_sampler.status() if _rolling_sampler else {"status": "never started"})
+
+@app.get("/admin/profile/sampler/download")
+async def admin_sampler_download(request: Request):
+    """Collapsed stacks so far (the sampler keeps running until its window ends)."""
+    if request.session.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    if _rolling_sampler is None:
+        raise HTTPException(status_code=404, detail="Sampler has not been started")
+    return Response(
+        content=_rolling_sampler.collapsed(),
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="sampler-{int(_rolling_sampler.started_at)}.collapsed.txt"'},
+    )
+
 @app.get("/admin/pool/kill/{connection_id}")
 async def admin_pool_kill(request: Request, connection_id: int):
     if request.session.get("role") != "admin":
@@ -1240,29 +1539,150 @@ async def admin_pool_killall(request: Request):
         except Exception:
             pass
     loop2 = asyncio.get_event_loop()
-    await loop2.run_in_executor(None, _init_pool)
+    try:
+        await loop2.run_in_executor(None, _init_pool)
+    except RuntimeError as e:
+        print(f"{e} — connections will be opened on demand")
     sendlog(f"Admin killall: killed={killed} failed={failed} — {request.session.get('username')}")
     return JSONResponse({"status": "done", "killed": killed, "failed": failed, "pool_cleared": True})
 
+def top_organizers(users, n=5):
+    """Users with the most events, from rows of (name, username, events csv)."""
+    organizers = []
+    for u in users:
+        event_count = len(u["events"].split(",")) if u["events"] else 0
+        if event_count > 0:
+            organizers.append({"name": u["name"], "username": u["username"], "count": event_count})
+
+    organizers.sort(key=lambda x: x["count"], reverse=True)
+    return organizers[:n]
+
 @app.get("/api/leaderboard")
-async def api_leaderboard():
+async def api_leaderboard(request: Request):
     """Returns top 5 organizers. Cached for 60s so it's near-instant."""
     global _leaderboard_cache
     now = time.time()
     if _leaderboard_cache["data"] and now - _leaderboard_cache["ts"] < LEADERBOARD_CACHE_TTL:
-        return JSONResponse(content=_leaderboard_cache["data"])
+        return _leaderboard_response(request, _leaderboard_cache)
 
     all_users = await run_query("SELECT name, username, events FROM userdetails", fetchmode="all")
-    organizers = []
-    for u in all_users:
-        event_count = len(u["events"].split(",")) if u["events"] else 0
-        if event_count > 0:
-            organizers.append({"name": u["name"], "username": u["username"], "count": event_count})
+    top5 = top_organizers(all_users)
+    _leaderboard_cache = {"data": top5, "ts": now, "etag": make_etag(top5)}
+    return _leaderboard_response(request, _leaderboard_cache)
 
-    organizers.sort(key=lambda x: x["count"], reverse=True)
-    top5 = organizers[:5]
-    _leaderboard_cache = {"data": top5, "ts": now}
-    return JSONResponse(content=top5)
+def sync_search_index():
+    """Bring the local search index in line with eventdetail, fetching only rows it lacks."""
+    started = time.perf_counter()
+    try:
+        db, c = sync_db()
+    except Exception as e:
+        print(f"Search index sync failed: {e}")
+        return
+    try:
+        ids = [r["eventid"] for r in c.execute("SELECT eventid FROM eventdetail").fetchall()]
+        missing, extra = event_search.diff(ids)
+        event_search.remove(extra)
+        missing = sorted(missing)
+        for i in range(0, len(missing), 500):
+            chunk = missing[i:i + 500]
+            marks = ", ".join(["?"] * len(chunk))
+            event_search.upsert(c.execute(f"SELECT * FROM eventdetail WHERE eventid IN ({marks})", tuple(chunk)).fetchall())
+        print(f"Search index: {len(ids)} events, +{len(missing)} -{len(extra)} "
+              f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+    except Exception as e:
+        print(f"Search index sync failed: {e}")
+    finally:
+        close_db(db)
+
+AUTOCOMPLETE_REFRESH = int(os.environ.get("AUTOCOMPLETE_REFRESH", "60"))
+
+def build_autocomplete(last=None):
+    """
+    Load location and category usage counts from active and ended events,
+    unless the tables' (row count, max id) fingerprint still equals `last`.
+    Returns the fingerprint the index now reflects.
+    """
+    started = time.perf_counter()
+    try:
+        db, c = sync_db()
+    except Exception as e:
+        print(f"Autocomplete build failed: {e}")
+        return last
+    try:
+        fingerprint = tuple(tuple(c.execute(f"SELECT COUNT(*), MAX(eventid) FROM {table}").fetchone())
+                            for table in ("eventdetail", "endedevent"))
+        if fingerprint == last:
+            return last
+        counts = {"location": Counter(), "category": Counter()}
+        for column, counter in counts.items():
+            for table in ("eventdetail", "endedevent"):
+                for row in c.execute(f"SELECT {column} AS value, COUNT(*) AS n FROM {table} GROUP BY {column}").fetchall():
+                    counter[row["value"]] += row["n"]
+        autocomplete.load(counts["location"], counts["category"])
+        print(f"Autocomplete: {len(autocomplete.locations)} locations, {len(autocomplete.categories)} categories "
+              f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return fingerprint
+    except Exception as e:
+        print(f"Autocomplete build failed: {e}")
+        return last
+    finally:
+        close_db(db)
+
+def autocomplete_thread():
+    """
+    The index lives in each worker's memory and add_event() only updates the
+    worker that handled the approval, so every worker reloads it whenever the
+    event tables change.
+    """
+    fingerprint = build_autocomplete()
+    while True:
+        time.sleep(AUTOCOMPLETE_REFRESH)
+        fingerprint = build_autocomplete(fingerprint)
+
+@app.get("/api/autocomplete/{field}")
+async def api_autocomplete(field: str, q: str = "", limit: int = AUTOCOMPLETE_LIMIT):
+    """Add-event form suggestions for `location` or `category`, most used first."""
+    if field not in autocomplete.FIELDS:
+        raise HTTPException(status_code=404, detail="Unknown field")
+    return JSONResponse(content=autocomplete.complete(field, q, limit),
+                        headers={"Cache-Control": SHARED_API_CACHE})
+
+@app.get("/api/search")
+async def api_search(request: Request, q: str = "", page: int = 1, per_page: int = SEARCH_PAGE_SIZE,
+                     lang: Optional[str] = None):
+    """
+    Ranked full-text search over active events, with <mark> highlighting.
+    Also matches the indexed translations for `lang` (default: the session's
+    language); only URLs that name their language are shared-cacheable.
+    """
+    await enforce_rate_limit(request, "search")
+    cache = SHARED_API_CACHE if lang else PRIVATE_REVALIDATE
+    lang = lang or request.session.get("lang", "en")
+    loop = asyncio.get_event_loop()
+    result = await loop.run_in_executor(None, event_search.search, q, page, per_page, lang)
+    return JSONResponse(content=result, headers={"Cache-Control": cache})
+
+@app.get("/api/categories")
+async def api_categories(request: Request):
+    """events.json plus the reverse event-type -> category index."""
+    payload, etag = reference_data.categories_payload()
+    if etag_matches(request, etag):
+        return not_modified(etag, SHARED_REFERENCE_CACHE)
+    return apply_cache_headers(JSONResponse(content=payload), etag, SHARED_REFERENCE_CACHE)
+
+@app.get("/api/quotes")
+async def api_quotes(request: Request, lang: str = "en"):
+    """Home-page quotes in one language (English where a translation is missing)."""
+    quotes, etag = reference_data.quotes_for(lang)
+    if etag_matches(request, etag):
+        return not_modified(etag, SHARED_REFERENCE_CACHE)
+    return apply_cache_headers(JSONResponse(content=quotes), etag, SHARED_REFERENCE_CACHE)
+
+def _leaderboard_response(request: Request, cached: dict):
+    etag = cached["etag"]
+    if etag_matches(request, etag):
+        return not_modified(etag, SHARED_API_CACHE)
+    return apply_cache_headers(JSONResponse(content=cached["data"]), etag, SHARED_API_CACHE)
 
 async def api(request: Request, db: AsyncDB = Depends(get_db)):
     await db.execute("SELECT * FROM eventdetail")
@@ -1288,6 +1708,7 @@ def checkeventloop():
         c.execute("SELECT * FROM eventdetail")
         ch = c.fetchall()
         hour24 = datetime.timedelta(hours=24)
+        ended = set()
 
         for x in ch:
             try:
@@ -1300,6 +1721,7 @@ def checkeventloop():
                 if etime <= datetime.datetime.now(ist):
                     print(f"Deleting event {x['eventid']}")
                     del_event(c, x["eventid"])
+                    ended.add(x["eventid"])
                     details = detailsformat(dict(x))
                     sendmail(x["email"], "Event Ended",
                              f"Hey there your event was ended, so it has been deleted!\n\nEvent Details:\n\n{details}\n\nThank You!")
@@ -1309,6 +1731,9 @@ def checkeventloop():
             except Exception as e:
                 sendlog(f"Date parse error for event {x['eventid']}: {e}")
 
+        # Catch anything the incremental updates missed (other hosts, failed commits)
+        event_search.sync(x for x in ch if x["eventid"] not in ended)
+
         return Response(content="<h1>CHECK EVENT LOOP COMPLETED</h1>", media_type="text/html")
     except Exception as e:
         text = f"Check event loop error: {e}"
@@ -1318,12 +1743,17 @@ def checkeventloop():
         close_db(db)
 
 @app.get("/download_ics/{eventid}")
-async def download_ics(eventid: int, db: AsyncDB = Depends(get_db)):
+async def download_ics(request: Request, eventid: int, db: AsyncDB = Depends(get_db)):
     await db.execute("SELECT * FROM eventdetail WHERE eventid=?", (eventid,))
     event = await db.fetchone()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
 
+    # Same for every viewer, so shared caches may keep it
+    etag = make_etag(dict(event))
+    if etag_matches(request, etag):
+        return not_modified(etag, SHARED_ICS_CACHE)
+
     try:
         start_dt = f"{event['eventstartdate'].replace('-', '')}T{event['starttime'].replace(':', '')}00"
         end_dt = f"{event['enddate'].replace('-', '')}T{event['endtime'].replace(':', '')}00"
@@ -1348,10 +1778,15 @@ END:VCALENDAR"""
     return Response(
         content=ics_content,
         media_type="text/calendar",
-        headers={"Content-Disposition": f"attachment; filename=event_{eventid}.ics"}
+        headers={
+            "Content-Disposition": f"attachment; filename=event_{eventid}.ics",
+            "ETag": etag,
+            "Cache-Control": SHARED_ICS_CACHE,
+        }
     )
 
 @app.get("/export_data")
+@compress_route(gzip_level=1, brotli_quality=1)   # large CSVs: favour CPU over ratio
 async def export_data(request: Request, db: AsyncDB = Depends(get_db)):
     username = request.session.get("username")
     if not username:
@@ -1362,31 +1797,44 @@ async def export_data(request: Request, db: AsyncDB = Depends(get_db)):
     if not ud:
         raise HTTPException(status_code=404, detail="User not found")
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    writer.writerow(["--- USER PROFILE ---"])
-    writer.writerow(["Name", "Username", "Email", "Role", "Events IDs"])
-    writer.writerow([ud["name"], ud["username"], ud["email"], ud["role"], ud["events"]])
-
-    writer.writerow([])
-    writer.writerow(["--- CREATED EVENTS ---"])
-    if ud["events"]:
-        event_ids = ud["events"].split(",")
-        writer.writerow(["Event ID", "Name", "Location", "Category", "Date", "Description"])
-        for eid in event_ids:
-            await db.execute("SELECT * FROM eventdetail WHERE eventid=?", (eid,))
-            ev = await db.fetchone()
-            if ev:
-                writer.writerow([ev["eventid"], ev["eventname"], ev["location"], ev["category"], ev["eventstartdate"], ev["description"]])
-
-    output.seek(0)
+    # Generated row by row in the threadpool; the events come from one IN query per batch
     return StreamingResponse(
-        iter([output.getvalue()]),
+        encode_csv(iter_user_export(export_query, dict(ud))),
         media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=SahyogSutra_data_{username}.csv"}
+        headers={"Content-Disposition": f"attachment; filename=SahyogSutra_data_{username}.csv",
+                 "Cache-Control": "no-store"}
     )
 
+def export_query(sql, params=()):
+    """One page of an export on a briefly borrowed pool connection."""
+    db, c = sync_db()
+    try:
+        return c.execute(sql, params).fetchall()
+    finally:
+        close_db(db)
+
+@app.get("/admin/export/{table}")
+@compress_route(gzip_level=1, brotli_quality=1)
+async def admin_export(request: Request, table: str, format: str = "csv", gzip: bool = False):
+    """
+    Bulk export of eventdetail, endedevent, userdetails (no password hashes)
+    or messages (chat, one row per message) as CSV or JSONL, optionally
+    gzipped. Streams in pages, so memory stays flat at any size.
+    """
+    if request.session.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"table must be one of {', '.join(EXPORT_TABLES)}")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    chunks, media_type, filename = export_table(export_query, table, format, gzip)
+    sendlog(f"#AdminExport {table} ({format}{', gzip' if gzip else ''}) — {request.session.get('username')}")
+    stamp = datetime.datetime.now(ist).strftime("%Y%m%d-%H%M")
+    return StreamingResponse(chunks, media_type=media_type, headers={
+        "Content-Disposition": f"attachment; filename=SahyogSutra_{stamp}_{filename}",
+        "Cache-Control": "no-store",
+    })
+
 # --- SocketIO Events ---
 
 @sio.on("add_grp_msg")
@@ -1461,8 +1909,48 @@ async def add_like(sid, data):
     await sio.emit("update_like", {"eventid": eventid, "likes": new_likes})
 
 
+# --- Metrics ---
+# Gauges are read from existing state at scrape time; see modules/metrics.py.
+
+def _executor_queue_depth():
+    depths = {"translation": _translation_executor._work_queue.qsize()}
+    # Rendered inside the /metrics handler, so the running loop is the app's loop
+    default = getattr(asyncio.get_running_loop(), "_default_executor", None)
+    if default is not None:
+        depths["default"] = default._work_queue.qsize()
+    return depths
+
+metrics.gauge("db_pool_connections", "DB pool connections by state.",
+              lambda: {"idle": _db_idle_queue.qsize(), "in_use": max(_db_open_count - _db_idle_queue.qsize(), 0),
+                       "max": _DB_POOL_MAX}, ("state",))
+metrics.gauge("executor_queue_depth", "Tasks waiting for a worker thread.", _executor_queue_depth, ("executor",))
+metrics.gauge("translation_cache_requests", "Translation store lookups since start.",
+              lambda: {"hit": translation_store.hit_count, "miss": translation_store.miss_count}, ("result",))
+metrics.gauge("translation_cache_hit_ratio", "Share of translation lookups answered from the store.",
+              lambda: translation_store.stats()["hit_rate"])
+metrics.gauge("mail_outbox_messages", "Mail spool rows by status.",
+              lambda: {k: v for k, v in mail_spool.stats().items() if k in ("pending", "sending", "failed_total")},
+              ("status",))
+metrics.gauge("telegram_log_queue", "Telegram log outbox counters.", log_outbox.stats, ("kind",))
+metrics.gauge("ai_description_cache", "AI description cache counters.", ai_service.stats, ("kind",))
+metrics.gauge("startup_phase_seconds", "Duration of each startup phase.", lambda: dict(startup_timings), ("phase",))
+
+@app.get("/metrics")
+async def metrics_endpoint(request: Request):
+    """
+    Prometheus text format, for an admin session or a scraper sending
+    'Authorization: Bearer <METRICS_TOKEN>'. Anyone else gets a 404.
+    """
+    token = os.environ.get("METRICS_TOKEN")
+    scraper = bool(token) and hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {token}")
+    if not scraper and request.session.get("role") != "admin":
+        return Response(status_code=404)
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # --- Final ASGI App: Single SocketIO mount ---
 app = socketio.ASGIApp(sio, app)
+startup_timings["import"] = time.perf_counter() - _import_started
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,328 @@
+"""
+Micro-benchmarks for the functions that run on every request.
+
+    python benchmark.py                  # run everything, compare with benchmark_baseline.json
+    python benchmark.py -k render        # only cases whose name contains "render"
+    python benchmark.py --quick          # smaller sizes, fewer repeats
+    python benchmark.py --save-baseline  # accept this run as the new baseline
+
+Imports app.py with the same offline stand-ins as loadtest.py and times the
+real code paths: translate_text against stores of realistic size,
+check_rate_limit across many IPs (memory and SQLite backends),
+group_campaigns, detailsformat, parse_chat_history, top_organizers,
+event search, autocomplete and campaigns.html rendering for N events in M languages. Each case reports the
+best-of-repeats time per operation. Every run is appended to
+<out>/history.jsonl; cases more than --tolerance slower than the baseline are
+flagged and the exit code is 1. Compare numbers from the same machine only.
+"""
+import os
+import sys
+import json
+import time
+import random
+import timeit
+import argparse
+import datetime
+import platform
+import tempfile
+
+from loadtest import LOCATIONS, WORDS, event_categories, offline_env
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "benchmark_baseline.json")
+RENDER_LANGUAGES = ["en", "hi", "mr", "ta"]
+# A regression has to be this many µs/op as well as --tolerance, so sub-µs cases don't flap
+MIN_REGRESSION_US = 0.5
+
+
+# --- Synthetic Inputs ---
+
+def make_events(n, rnd):
+    categories = event_categories()
+    events = []
+    for i in range(1, n + 1):
+        start = datetime.date(2026, 11, 1) + datetime.timedelta(days=rnd.randint(0, 90))
+        events.append({
+            "eventid": i,
+            "eventname": " ".join(rnd.choice(WORDS).title() for _ in range(rnd.randint(2, 5))),
+            "email": f"user{i % 997}@example.com",
+            "eventstarttime": "09:00", "eventendtime": "17:00",
+            "eventstartdate": start.isoformat(), "eventenddate": start.isoformat(),
+            "location": rnd.choice(LOCATIONS),
+            "category": rnd.choice(categories),
+            "description": " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(20, 120))),
+            "username": f"user{int(rnd.paretovariate(1.1)) % 5000}",
+            "likes": int(rnd.paretovariate(1.3)) - 1,
+        })
+    return events
+
+
+def make_chat(n, rnd):
+    return str([(f"user{rnd.randint(1, 300)}", " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 25))),
+                 f"2026-10-{rnd.randint(1, 28):02d} {rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}:00")
+                for _ in range(n)])
+
+
+def make_users(n, rnd):
+    users = []
+    for i in range(n):
+        count = int(rnd.paretovariate(1.5)) - 1 if rnd.random() < 0.3 else 0
+        users.append({"name": f"User {i}", "username": f"user{i}",
+                      "events": ",".join(str(rnd.randint(1, 100000)) for _ in range(count)) or None})
+    return users
+
+
+# --- Cases ---
+# Each case factory returns (fn, ops): fn() is timed, ops is how many operations one call does.
+
+def case_translate(app, workdir, size, state):
+    from modules.translation_store import TranslationStore
+
+    store = TranslationStore(os.path.join(workdir, f"translations-{size}.db"))
+    rnd = random.Random(size)
+    langs = ["hi", "mr", "bn", "ta", "te"]
+    texts = [" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 8))) + f" {i}" for i in range(size // len(langs))]
+    store.put_many([(t, lang, t.upper()) for t in texts for lang in langs])
+    sample = [(rnd.choice(texts), rnd.choice(langs)) for _ in range(1000)]
+    app.translation_store = store
+
+    if state == "warm":
+        for text, lang in sample:
+            app.translate_text(text, lang)
+
+        def fn():
+            for text, lang in sample:
+                app.translate_text(text, lang)
+    else:
+        def fn():
+            store._hits.clear()   # every lookup goes to SQLite
+            for text, lang in sample:
+                app.translate_text(text, lang)
+    return fn, len(sample)
+
+
+def case_rate_limit(app, workdir, ips, backend):
+    from modules import MemoryRateLimitBackend, SQLiteRateLimitBackend
+
+    if backend == "memory":
+        app.rate_limiter.backend = MemoryRateLimitBackend()
+    else:
+        app.rate_limiter.backend = SQLiteRateLimitBackend(os.path.join(workdir, f"ratelimits-{ips}.db"))
+    addresses = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(ips)]
+    batch = 1000
+    position = [0]
+
+    def fn():
+        start = position[0]
+        for ip in addresses[start:start + batch]:
+            app.check_rate_limit(ip)
+        position[0] = (start + batch) % ips
+    return fn, batch
+
+
+def case_group(app, workdir, n):
+    events = make_events(n, random.Random(n))
+    return (lambda: app.group_campaigns(events)), 1
+
+
+def case_detailsformat(app, workdir):
+    event = make_events(1, random.Random(1))[0]
+    return (lambda: app.detailsformat(event)), 1
+
+
+def case_chat(app, workdir, n):
+    history = make_chat(n, random.Random(n))
+    return (lambda: app.parse_chat_history(history)), 1
+
+
+def case_leaderboard(app, workdir, n):
+    users = make_users(n, random.Random(n))
+    return (lambda: app.top_organizers(users)), 1
+
+
+def case_search(app, workdir, n, lang=None):
+    from modules import EventSearchIndex
+    from synthetic_data import pseudo_translate
+
+    index = EventSearchIndex(os.path.join(workdir, f"search-{n}-{lang}.db"))
+    events = make_events(n, random.Random(n))
+    for i in range(0, n, 10_000):
+        index.upsert(events[i:i + 10_000])
+    queries = ["cleanup", "blood donation", "pune", "health", "tree plant", "vol", "children school mumbai",
+               "awareness drive delhi", "zzzz", "elderly care"]
+    if lang:
+        # Every other event has been translated; half the queries are typed in the translation
+        for e in events[::2]:
+            index.add_translation(e["eventid"], lang, {f: pseudo_translate(e[f], lang)
+                                                       for f in ("eventname", "description", "location")})
+        queries = [pseudo_translate(q, lang) if i % 2 else q for i, q in enumerate(queries)]
+
+    def fn():
+        for q in queries:
+            index.search(q, lang=lang)
+    return fn, len(queries)
+
+
+def case_autocomplete(app, workdir, n):
+    from modules import PrefixIndex
+
+    rnd = random.Random(n)
+    index = PrefixIndex()
+    index.load((f"{rnd.choice(WORDS).title()} {rnd.choice(WORDS).title()} {i}, {rnd.choice(LOCATIONS)}",
+                int(rnd.paretovariate(1.2)), (), {}) for i in range(n))
+    prefixes = ["m", "mu", "mum", "pune", "c", "cl", "clean", "he", "zz", "10", "tree pl"]
+
+    def fn():
+        index._cache.clear()   # short prefixes are cached between changes; time the uncached walk
+        for p in prefixes:
+            index.complete(p)
+    return fn, len(prefixes)
+
+
+def case_render(app, workdir, n, languages):
+    store = app.translation_store = app.get_translation_store(os.path.join(workdir, "render-translations.db"))
+    store.import_json(os.path.join(BASE_DIR, "translations.json"))
+    events = make_events(n, random.Random(n))
+    trending_events, allevents, _, _ = app.group_campaigns(events)
+    template = app.templates.env.get_template("campaigns.html")
+    langs = RENDER_LANGUAGES[:languages]
+
+    def render(lang):
+        def bound_translate(text, save_file=True):
+            return app.translate_text(text.strip(), lang=lang, save_file=save_file)
+        return template.render(allevents=allevents, userdetails={}, viewyourevents=False,
+                               sortby="eventstartdate", isadmin=False, c_user="None", viewuserevent="None",
+                               translate=bound_translate, trending_events=trending_events, user_language=lang)
+
+    # Early passes claim missing strings for the offline translator; time the steady state after
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        misses = store.miss_count
+        for lang in langs:
+            render(lang)
+        if store.miss_count == misses:
+            break
+        time.sleep(0.2)
+
+    def fn():
+        for lang in langs:
+            render(lang)
+    return fn, len(langs)
+
+
+def cases(quick):
+    big = not quick
+    yield "translate_text warm 2.5k", case_translate, (2_500, "warm")
+    yield "translate_text sqlite 2.5k", case_translate, (2_500, "sqlite")
+    if big:
+        yield "translate_text warm 100k", case_translate, (100_000, "warm")
+        yield "translate_text sqlite 100k", case_translate, (100_000, "sqlite")
+    yield "check_rate_limit memory 10k ips", case_rate_limit, (10_000, "memory")
+    yield "check_rate_limit sqlite 10k ips", case_rate_limit, (10_000, "sqlite")
+    if big:
+        yield "check_rate_limit memory 200k ips", case_rate_limit, (200_000, "memory")
+    for n in (200, 2_000) + ((20_000,) if big else ()):
+        yield f"group_campaigns {n} events", case_group, (n,)
+    yield "detailsformat", case_detailsformat, ()
+    for n in (50, 1_000) + ((10_000,) if big else ()):
+        yield f"parse_chat_history {n} messages", case_chat, (n,)
+    for n in (1_000,) + ((100_000,) if big else ()):
+        yield f"top_organizers {n} users", case_leaderboard, (n,)
+    for n in (10_000,) + ((100_000,) if big else ()):
+        yield f"event_search {n} events", case_search, (n,)
+    yield "event_search 10000 events + hi translations", case_search, (10_000, "hi")
+    for n in (1_000,) + ((100_000,) if big else ()):
+        yield f"autocomplete {n} locations", case_autocomplete, (n,)
+    for n, m in ((100, 1), (100, 4)) + (((1_000, 1), (1_000, 4)) if big else ()):
+        yield f"render campaigns.html {n} events x {m} lang", case_render, (n, m)
+
+
+# --- Timing ---
+
+def measure(fn, ops, repeat, min_time):
+    """Best per-operation time in microseconds over `repeat` runs of at least `min_time` seconds."""
+    timer = timeit.Timer(fn)
+    loops, elapsed = timer.autorange()
+    if elapsed < min_time:
+        loops = max(1, int(loops * min_time / max(elapsed, 1e-9)))
+    best = min(timer.repeat(repeat=repeat, number=loops))
+    return best / loops / ops * 1e6
+
+
+def import_app(workdir):
+    os.environ.update(offline_env(workdir, 0, 0))
+    os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+    os.environ.setdefault("SESSION_BACKEND", "memory")
+    sys.path.insert(0, BASE_DIR)
+    import app
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="match", help="only run cases whose name contains this")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    parser.add_argument("--out", default="benchmark-results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    args = parser.parse_args()
+    if args.quick:
+        args.repeat, args.min_time = 3, 0.05
+
+    workdir = tempfile.mkdtemp(prefix="sahyog-bench-")
+    app = import_app(workdir)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    results, regressions = {}, []
+    print(f"{'case':<48}{'µs/op':>12}{'baseline':>12}{'change':>9}")
+    for name, factory, params in cases(args.quick):
+        if args.match and args.match not in name:
+            continue
+        fn, ops = factory(app, workdir, *params)
+        us = measure(fn, ops, args.repeat, args.min_time)
+        results[name] = round(us, 3)
+        before = baseline.get(name)
+        change = ""
+        if before:
+            ratio = us / before - 1
+            change = f"{ratio:+.0%}"
+            if ratio > args.tolerance and us - before >= MIN_REGRESSION_US:
+                regressions.append((name, before, us))
+                change += " ⚠"
+        print(f"{name:<48}{us:>12.2f}{'' if before is None else f'{before:.2f}':>12}{change:>9}")
+
+    run = {
+        "at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "quick": args.quick,
+        "results": results,
+    }
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "history.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+
+    if args.save_baseline:
+        if args.match and os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                run["results"] = {**json.load(f).get("results", {}), **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} case(s) more than {args.tolerance:.0%} slower than the baseline:")
+        for name, before, now in regressions:
+            print(f"  {name}: {before:.2f} → {now:.2f} µs/op")
+    sys.stdout.flush()
+    os._exit(1 if regressions and not args.save_baseline else 0)   # don't wait on the app's background threads
+
+
+if __name__ == "__main__":
+    main()
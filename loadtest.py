@@ -0,0 +1,304 @@
+"""
+Offline end-to-end load test.
+
+    pip install locust
+    python loadtest.py                       # 40 users for 60s, compare with loadtest_baseline.json
+    python loadtest.py -u 100 -t 3m --events 500
+    python loadtest.py --save-baseline       # accept this run as the new baseline
+    python loadtest.py --dataset scale.db    # run against synthetic_data.py output instead
+
+Starts the app under uvicorn against a throwaway local SQLite database
+(LOCAL_DB, see modules/local_db.py) with the offline translator, file mail
+sink, stubbed Telegram and fake AI backend — no network needed — seeds users,
+events and pending requests, runs the journeys in locustfile.py headless and
+writes p50 / p95 / p99 latency and throughput per endpoint to
+<out>/report.json and <out>/report.md. Endpoints whose p95 got more than
+--tolerance slower than the baseline are flagged and the exit code is 1.
+Numbers are only comparable between runs on the same machine with the same
+options.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import datetime
+import tempfile
+import subprocess
+import urllib.request
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "loadtest_baseline.json")
+
+# Shared with locustfile.py
+SEED_PASSWORD = "loadtest-password"
+ADMIN_USERNAME = "loadadmin"
+MEMBER_PREFIX = "loaduser"
+LOCATIONS = ["Pune", "Mumbai", "Delhi", "Bengaluru", "Jaipur", "Kolkata", "Chennai", "Nagpur", "Indore", "Surat"]
+WORDS = ("volunteer community drive clean food blood donation camp awareness workshop children "
+         "support local help plantation river school elderly care village health water").split()
+
+# A p95 regression has to be this many ms as well as --tolerance, so tiny endpoints don't flap
+MIN_REGRESSION_MS = 5
+
+
+# --- Seeding ---
+
+def event_categories():
+    with open(os.path.join(BASE_DIR, "events.json"), encoding="utf-8") as f:
+        return [sub for subs in json.load(f).values() for sub in subs]
+
+
+def _event_row(rnd, categories, username, days_ahead):
+    start = datetime.date.today() + datetime.timedelta(days=days_ahead)
+    end = start + datetime.timedelta(days=rnd.randint(0, 3))
+    return (
+        " ".join(rnd.choice(WORDS).title() for _ in range(rnd.randint(2, 5))),
+        f"{username}@example.com",
+        "09:00", "17:00", start.isoformat(), end.isoformat(),
+        rnd.choice(LOCATIONS), rnd.choice(categories),
+        " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(20, 80))),
+        username,
+    )
+
+
+def seed(path, users, events, pending, seed_value=7):
+    """Fill a fresh local DB: `users` members + one admin, active events and pending requests."""
+    from modules.local_db import connect_local, init_local_db
+
+    init_local_db(path)
+    rnd = random.Random(seed_value)
+    categories = event_categories()
+    columns = "eventname, email, eventstarttime, eventendtime, eventstartdate, eventenddate, location, category, description, username"
+
+    conn = connect_local(path)
+    try:
+        conn.execute("INSERT INTO userdetails(username, password, name, email, role) VALUES(?, ?, ?, ?, 'admin')",
+                     (ADMIN_USERNAME, SEED_PASSWORD, "Load Admin", f"{ADMIN_USERNAME}@example.com"))
+        conn.executemany("INSERT INTO userdetails(username, password, name, email, role) VALUES(?, ?, ?, ?, 'user')",
+                         [(f"{MEMBER_PREFIX}{i}", SEED_PASSWORD, f"Load User {i}", f"{MEMBER_PREFIX}{i}@example.com")
+                          for i in range(users)])
+        owners = [f"{MEMBER_PREFIX}{i}" for i in range(users)]
+        conn.executemany(f"INSERT INTO eventdetail({columns}, likes) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         [_event_row(rnd, categories, rnd.choice(owners), rnd.randint(5, 90)) + (rnd.randint(0, 300),)
+                          for _ in range(events)])
+        conn.executemany(f"INSERT INTO eventreq({columns}) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         [_event_row(rnd, categories, rnd.choice(owners), rnd.randint(5, 90)) for _ in range(pending)])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def use_dataset(dataset, env):
+    """Copy a synthetic_data.py database (and its translation store) into the run; returns (events, members)."""
+    import sqlite3
+
+    for src, dst in ((dataset, env["LOCAL_DB"]),
+                     (os.path.splitext(dataset)[0] + "-translations.db", env["TRANSLATION_DB"])):
+        if os.path.exists(src):
+            shutil.copy2(src, dst)
+    conn = sqlite3.connect(env["LOCAL_DB"])
+    try:
+        first, events = conn.execute("SELECT MIN(eventid), COUNT(*) FROM eventdetail").fetchone()
+        members = conn.execute("SELECT COUNT(*) FROM userdetails WHERE role='user'").fetchone()[0]
+    finally:
+        conn.close()
+    env["LOADTEST_FIRST_EVENT"] = str(first or 1)
+    env["LOADTEST_EVENTS"] = str(events)
+    return events, members
+
+
+# --- Server ---
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def offline_env(workdir, port, events):
+    env = dict(os.environ)
+    for key in ("SQLITECLOUD", "TGBOTTOKEN", "RESEND_API_KEY", "GOOGLE_API_KEY"):
+        env.pop(key, None)
+    translations = os.path.join(workdir, "translations.json")
+    shutil.copy2(os.path.join(BASE_DIR, "translations.json"), translations)
+    env.update({
+        "LOCAL_DB": os.path.join(workdir, "app.db"),
+        "TRANSLATOR_BACKEND": "offline",
+        "TRANSLATION_DB": os.path.join(workdir, "translations.db"),
+        "TRANSLATIONS_FILE": translations,
+        "TRANSLATIONS_BACKUP": os.path.join(workdir, "translations_backup.json"),
+        "MAIL_TRANSPORT": "file",
+        "MAIL_SINK": os.path.join(workdir, "mail_sink.jsonl"),
+        "MAIL_SPOOL_DB": os.path.join(workdir, "mailspool.db"),
+        "TG_TRANSPORT": "stub",
+        "AI_BACKEND": "fake",
+        "RATE_LIMIT_DB": os.path.join(workdir, "ratelimits.db"),
+        "SESSION_DB": os.path.join(workdir, "sessions.db"),
+        "DRAFT_DB": os.path.join(workdir, "drafts.db"),
+        "SEARCH_DB": os.path.join(workdir, "search.db"),
+        "JINJA_CACHE_DIR": os.path.join(workdir, "jinja_cache"),
+        "PORT": str(port),
+        # Read by locustfile.py
+        "LOADTEST_EVENTS": str(events),
+    })
+    return env
+
+
+def wait_until_up(base_url, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"App exited during startup (code {server.returncode})")
+        try:
+            with urllib.request.urlopen(f"{base_url}/api/categories", timeout=2) as r:
+                if r.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.3)
+    raise RuntimeError(f"App did not come up within {timeout}s")
+
+
+# --- Report ---
+
+def read_stats(csv_path):
+    """locust's <prefix>_stats.csv -> {"GET /show_campaigns": {...}, ..., "Aggregated": {...}}"""
+    report = {}
+    with open(csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            name = row["Name"] if row["Name"] == "Aggregated" else f"{row['Type']} {row['Name']}"
+            requests = int(row["Request Count"])
+            if not requests:
+                continue
+            report[name] = {
+                "requests": requests,
+                "failures": int(row["Failure Count"]),
+                "rps": round(float(row["Requests/s"]), 2),
+                "p50": float(row["50%"]),
+                "p95": float(row["95%"]),
+                "p99": float(row["99%"]),
+                "avg": round(float(row["Average Response Time"]), 1),
+            }
+    return report
+
+
+def compare(report, baseline, tolerance):
+    """Endpoints whose p95 regressed beyond `tolerance` (fraction) and MIN_REGRESSION_MS."""
+    regressions = []
+    for name, now in report.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if now["p95"] > before["p95"] * (1 + tolerance) and now["p95"] - before["p95"] >= MIN_REGRESSION_MS:
+            regressions.append((name, before["p95"], now["p95"]))
+    return regressions
+
+
+def render_markdown(meta, report, baseline, regressions):
+    flagged = {name for name, _, _ in regressions}
+    lines = [
+        f"# Load test — {meta['finished_at']}",
+        "",
+        f"{meta['users']} users, spawn rate {meta['spawn_rate']}/s, {meta['duration']}, "
+        f"{meta['events']} events" + (f" from {meta['dataset']}" if meta.get("dataset") else " seeded") + ". Times in ms.",
+        "",
+        "| endpoint | requests | fail | req/s | p50 | p95 | p99 | p95 baseline |",
+        "|---|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for name, s in sorted(report.items(), key=lambda kv: (kv[0] == "Aggregated", kv[0])):
+        base = baseline.get(name, {}).get("p95")
+        mark = " ⚠" if name in flagged else ""
+        lines.append(f"| {name}{mark} | {s['requests']} | {s['failures']} | {s['rps']} | {s['p50']:g} | "
+                     f"{s['p95']:g} | {s['p99']:g} | {'' if base is None else f'{base:g}'} |")
+    if regressions:
+        lines += ["", "## p95 regressions", ""]
+        lines += [f"- {name}: {before:g} → {now:g} ms" for name, before, now in regressions]
+    return "\n".join(lines) + "\n"
+
+
+# --- Main ---
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-u", "--users", type=int, default=40, help="concurrent simulated users")
+    parser.add_argument("-r", "--spawn-rate", type=float, default=10)
+    parser.add_argument("-t", "--duration", default="60s", help="locust run time, e.g. 90s or 5m")
+    parser.add_argument("--events", type=int, default=200, help="active events to seed")
+    parser.add_argument("--members", type=int, default=200, help="member accounts to seed")
+    parser.add_argument("--pending", type=int, default=100, help="pending event requests to seed")
+    parser.add_argument("--dataset", help="database from synthetic_data.py to run against (copied, not modified)")
+    parser.add_argument("--out", default="loadtest-results", help="directory for CSVs and reports")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown (0.2 = 20%%)")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary DB / mail sink directory")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sahyog-loadtest-")
+    os.makedirs(args.out, exist_ok=True)
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = offline_env(workdir, port, args.events)
+    if args.dataset:
+        args.events, args.members = use_dataset(args.dataset, env)
+    else:
+        seed(env["LOCAL_DB"], args.members, args.events, args.pending)
+    env["LOADTEST_MEMBERS"] = str(args.members)
+
+    server_log = open(os.path.join(args.out, "server.log"), "w")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BASE_DIR, env=env, stdout=server_log, stderr=subprocess.STDOUT)
+    try:
+        wait_until_up(base_url, server)
+        print(f"App up on {base_url} (workdir {workdir})")
+        prefix = os.path.join(args.out, "locust")
+        subprocess.run(
+            [sys.executable, "-m", "locust", "-f", os.path.join(BASE_DIR, "locustfile.py"), "--headless",
+             "-u", str(args.users), "-r", str(args.spawn_rate), "-t", args.duration, "--host", base_url,
+             "--csv", prefix, "--only-summary", "--exit-code-on-error", "0"],
+            cwd=BASE_DIR, env=env, check=True)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        server_log.close()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = read_stats(f"{prefix}_stats.csv")
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("endpoints", {})
+    regressions = compare(report, baseline, args.tolerance)
+
+    meta = {"users": args.users, "spawn_rate": args.spawn_rate, "duration": args.duration,
+            "events": args.events, "members": args.members, "dataset": args.dataset,
+            "finished_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+    result = {"meta": meta, "endpoints": report}
+    with open(os.path.join(args.out, "report.json"), "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    markdown = render_markdown(meta, report, baseline, regressions)
+    with open(os.path.join(args.out, "report.md"), "w", encoding="utf-8") as f:
+        f.write(markdown)
+    print(markdown)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} endpoint(s) regressed beyond {args.tolerance:.0%} at p95.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
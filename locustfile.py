@@ -1,12 +1,338 @@
+"""
+Load-test journeys. `python loadtest.py` runs these offline against a seeded
+local database; to aim at a running instance instead:
+
+    locust -f locustfile.py --host http://127.0.0.1:8000
+
+The accounts and event ids below match what loadtest.seed() or
+synthetic_data.py creates (LOADTEST_FIRST_EVENT / LOADTEST_EVENTS /
+LOADTEST_MEMBERS describe the data). Each simulated user sends
+its own X-Forwarded-For so per-IP rate limits apply per user, not to the
+whole test. Socket.IO round-trips (emit -> broadcast received back) are
+reported as "SIO" requests next to the HTTP ones.
+"""
+import os
+import re
+import json
+import time
+import random
+import itertools
+from html.parser import HTMLParser
+
+import gevent
+import gevent.event
+import socketio
 from locust import HttpUser, task, between
 
-class WebsiteUser(HttpUser):
-    wait_time = between(1, 2)
+from loadtest import SEED_PASSWORD, ADMIN_USERNAME, MEMBER_PREFIX, LOCATIONS, WORDS, event_categories
+
+FIRST_EVENT = int(os.environ.get("LOADTEST_FIRST_EVENT", "1"))
+EVENTS = int(os.environ.get("LOADTEST_EVENTS", "200"))
+MEMBERS = int(os.environ.get("LOADTEST_MEMBERS", "200"))
+MAIL_SINK = os.environ.get("MAIL_SINK", "mail_sink.jsonl")
+LANGUAGES = ["hi", "mr", "bn", "ta", "te", "gu", "kn", "ml", "pa"]
+CATEGORIES = event_categories()
+SIO_TIMEOUT = 10
+
+_user_numbers = itertools.count(1)
+_OTP = re.compile(r">\s*(\d{4})\s*</div>")
+
+
+def _event_id():
+    # Popular events get most of the traffic, like the real campaigns page
+    return FIRST_EVENT - 1 + min(int(random.paretovariate(1.2)), EVENTS)
+
+
+def _fire(environment, name, started, exception=None, length=0):
+    environment.events.request.fire(request_type="SIO", name=name,
+                                    response_time=(time.perf_counter() - started) * 1000,
+                                    response_length=length, exception=exception, context={})
+
+
+class _PendingRows(HTMLParser):
+    """Form fields of every row on /show_pending_events, as the approve button would post them."""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self._textarea = None
+        self._select = None
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        if tag == "tr" and a.get("class") == "event-row":
+            self.rows.append({})
+        elif not self.rows:
+            return
+        elif tag == "input" and a.get("name"):
+            self.rows[-1][a["name"]] = a.get("value") or ""
+        elif tag == "textarea":
+            self._textarea = a.get("name")
+            self.rows[-1][self._textarea] = ""
+        elif tag == "select":
+            self._select = a.get("name")
+        elif tag == "option" and self._select and "selected" in a:
+            self.rows[-1][self._select] = a.get("value") or ""
+
+    def handle_endtag(self, tag):
+        if tag == "textarea":
+            self._textarea = None
+        elif tag == "select":
+            self._select = None
+
+    def handle_data(self, data):
+        if self._textarea and self.rows:
+            self.rows[-1][self._textarea] += data
+
+
+class AppUser(HttpUser):
+    abstract = True
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        n = next(_user_numbers)
+        self.client.headers["X-Forwarded-For"] = f"10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}"
+        self.client.headers["Accept-Encoding"] = "br, gzip"
+
+    def set_language(self, lang):
+        self.client.post(f"/setlanguage/{lang}", name="/setlanguage/[lang]")
+
+    def view_event(self, eventid):
+        self.client.get(f"/event/{eventid}", name="/event/[id]")
+
+    def login(self, username):
+        with self.client.post("/login", data={"loginusername": username, "loginpassword": SEED_PASSWORD},
+                              catch_response=True) as r:
+            if "Login Success" not in r.text:
+                r.failure(r.text[:100])
+
+
+class Visitor(AppUser):
+    """Anonymous browsing: home, campaigns, event pages, leaderboard, calendar download."""
+    weight = 6
+
+    def on_start(self):
+        super().on_start()
+        self.set_language("en")
+
+    @task(3)
+    def campaigns(self):
+        self.client.get("/show_campaigns")
+
+    @task(4)
+    def event_page(self):
+        self.view_event(_event_id())
+
+    @task(2)
+    def home(self):
+        self.client.get("/")
+        self.client.get("/api/leaderboard")
+        self.client.get("/api/quotes?lang=en", name="/api/quotes")
+
+    @task(2)
+    def search(self):
+        self.client.get(f"/api/search?q={random.choice(WORDS)}+{random.choice(WORDS)[:3]}&lang=en",
+                        name="/api/search")
+
+    @task(1)
+    def calendar(self):
+        self.client.get(f"/download_ics/{_event_id()}", name="/download_ics/[id]")
+
+    @task(1)
+    def chat_history(self):
+        self.client.get(f"/group-chat/from-event/{_event_id()}", name="/group-chat/from-event/[id]")
+
+
+class MultilingualVisitor(AppUser):
+    """Non-English reader: translated pages plus the on-demand event translation call."""
+    weight = 3
+
+    def on_start(self):
+        super().on_start()
+        self.lang = random.choice(LANGUAGES)
+        self.set_language(self.lang)
+
+    @task(3)
+    def campaigns(self):
+        self.client.get("/show_campaigns")
+
+    @task(2)
+    def event_page(self):
+        self.view_event(_event_id())
+
+    @task(2)
+    def translate_event(self):
+        self.client.post("/translate_event", json={
+            "eventname": " ".join(random.choice(WORDS).title() for _ in range(3)),
+            "location": random.choice(LOCATIONS),
+            "description": " ".join(random.choice(WORDS) for _ in range(40)),
+        })
+
+    @task(1)
+    def search(self):
+        # Session language: matches the original text plus translations indexed so far
+        self.client.get(f"/api/search?q={random.choice(WORDS)}", name="/api/search [session lang]")
+
+    @task(1)
+    def switch_language(self):
+        self.lang = random.choice(LANGUAGES)
+        self.set_language(self.lang)
+        self.client.get(f"/api/quotes?lang={self.lang}", name="/api/quotes")
+
+
+class Member(AppUser):
+    """Logged-in user with a live Socket.IO connection: likes and group chat."""
+    weight = 3
+
+    def on_start(self):
+        super().on_start()
+        self.username = f"{MEMBER_PREFIX}{random.randrange(MEMBERS)}"
+        self.set_language("en")
+        self.login(self.username)
+        self.waiting = {}   # key -> gevent AsyncResult
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on("update_like", lambda data: self._arrived(("like", data.get("eventid")), data))
+        self.sio.on("new_message", lambda data: self._arrived(("chat", data.get("message")), data))
+        started = time.perf_counter()
+        try:
+            self.sio.connect(self.host, transports=["websocket"], wait_timeout=SIO_TIMEOUT)
+            _fire(self.environment, "connect", started)
+        except Exception as e:
+            _fire(self.environment, "connect", started, exception=e)
+
+    def on_stop(self):
+        if self.sio.connected:
+            self.sio.disconnect()
+
+    def _arrived(self, key, data):
+        waiter = self.waiting.pop(key, None)
+        if waiter is not None:
+            waiter.set(data)
+
+    def _round_trip(self, name, key, event, payload):
+        """Emit and wait for our own broadcast to come back."""
+        if not self.sio.connected:
+            return
+        waiter = self.waiting[key] = gevent.event.AsyncResult()
+        started = time.perf_counter()
+        try:
+            self.sio.emit(event, payload)
+            waiter.get(timeout=SIO_TIMEOUT)
+            _fire(self.environment, name, started)
+        except gevent.Timeout as e:
+            self.waiting.pop(key, None)
+            _fire(self.environment, name, started, exception=e)
+
+    @task(3)
+    def browse(self):
+        self.client.get("/show_campaigns")
+        self.view_event(_event_id())
+
+    @task(3)
+    def like(self):
+        eventid = _event_id()
+        self._round_trip("addeventlike", ("like", eventid), "addeventlike",
+                         {"eventid": eventid, "byuser": self.username, "type": random.choice(["add", "remove"])})
+
+    @task(2)
+    def chat(self):
+        eventid = _event_id()
+        self.client.get(f"/group-chat/from-event/{eventid}", name="/group-chat/from-event/[id]")
+        message = f"{self.username} {random.getrandbits(48):x} " + " ".join(random.choice(WORDS) for _ in range(8))
+        self._round_trip("add_grp_msg", ("chat", message), "add_grp_msg",
+                         {"username": self.username, "message": message, "eventid": eventid})
+
+    @task(1)
+    def profile(self):
+        self.client.get(f"/user/{self.username}", name="/user/[username]")
+
+
+class NewUser(AppUser):
+    """Signs up with the OTP from the mail sink, then submits an event request."""
+    weight = 1
+
+    def on_start(self):
+        super().on_start()
+        self.set_language("en")
+        self.signed_up = False
+
+    def _otp_for(self, email, timeout=15):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                with open(MAIL_SINK, encoding="utf-8") as f:
+                    for line in f:
+                        mail = json.loads(line)
+                        if mail["receiver"] == email:
+                            match = _OTP.search(mail["body"])
+                            if match:
+                                return match.group(1)
+            except FileNotFoundError:
+                pass
+            gevent.sleep(0.25)
+        return None
+
+    def signup(self):
+        tag = f"{os.getpid()}x{random.getrandbits(40):x}"
+        username, email = f"new{tag}", f"new{tag}@example.com"
+        self.client.post("/sendsignupotp", data={"email": email})
+        started = time.perf_counter()
+        otp = self._otp_for(email)
+        _fire(self.environment, "signup otp delivered", started,
+              exception=None if otp else RuntimeError("OTP mail not delivered"))
+        if not otp:
+            return
+        with self.client.post("/signup", data={
+            "username": username, "password": SEED_PASSWORD, "cpassword": SEED_PASSWORD,
+            "nameofuser": f"New User {tag}", "email": email, "signupotp": otp,
+        }, catch_response=True) as r:
+            if "Signup Success" in r.text:
+                self.signed_up = True
+            else:
+                r.failure(r.text[:100])
 
     @task
-    def visit_homepage(self):
-        # Step 1: set language via POST
-        self.client.post("/setlanguage/hi")
+    def journey(self):
+        if not self.signed_up:
+            self.signup()
+            return
+        self.client.get("/show_add_form")
+        start = time.strftime("%Y-%m-%d", time.localtime(time.time() + random.randint(5, 60) * 86400))
+        self.client.post("/addeventreq", data={
+            "eventname": " ".join(random.choice(WORDS).title() for _ in range(4)) + f" {random.getrandbits(24):x}",
+            "eventstartdate": start, "eventenddate": start,
+            "eventstarttime": "10:00", "eventendtime": "16:00",
+            "location": random.choice(LOCATIONS), "category": random.choice(CATEGORIES),
+            "description": " ".join(random.choice(WORDS) for _ in range(50)),
+        })
+        self.client.get("/show_campaigns")
+
+
+class Admin(AppUser):
+    """Single moderator working through the pending queue."""
+    fixed_count = 1
+    wait_time = between(2, 5)
+
+    def on_start(self):
+        super().on_start()
+        self.set_language("en")
+        self.login(ADMIN_USERNAME)
+
+    @task(3)
+    def moderate(self):
+        r = self.client.get("/show_pending_events")
+        parser = _PendingRows()
+        parser.feed(r.text)
+        if not parser.rows:
+            return
+        row = random.choice(parser.rows)
+        if random.random() < 0.75:
+            self.client.post("/addevent", data=row, name="/addevent (approve)")
+        else:
+            self.client.get(f"/decline_event/{row['eventid']}/Load test decline",
+                            name="/decline_event/[id]/[reason]")
 
-        # Step 2: request homepage that renders Jinja2 template
+    @task(1)
+    def dashboard(self):
         self.client.get("/")
+        self.client.get("/admin/pool/status")
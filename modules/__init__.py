@@ -1,6 +1,22 @@
-from .mail_model import sendmail, sendmailthread
-from .sendlog_model import sendlog, sendlogthread
+from .mail_model import sendmail, sendmailthread, mail_spool
+from .sendlog_model import sendlog, sendlogthread, log_outbox
 from .delete_event import del_event, delete_eventfromid
 from .detailformat import detailsformat
 from .add_event import addevent, addeventrequest
 from .misc import email_send_message
+from .translator import get_translator, set_translator, translate_one
+from .translation_store import TranslationStore, get_translation_store
+from .rate_limiter import RateLimiter, RatePolicy, RateLimitExceeded, MemoryRateLimitBackend, SQLiteRateLimitBackend
+from .session_store import ServerSessionMiddleware, MemorySessionBackend, SQLiteSessionBackend, LazySession, SESSION_MAX_AGE
+from .drafts import DraftStore, DRAFT_FIELDS
+from .static_assets import AssetStaticFiles, build_assets
+from .http_cache import make_etag, etag_matches, not_modified, apply_cache_headers, PRIVATE_REVALIDATE
+from .compression import CompressionMiddleware, compress_route
+from .reference_registry import ReferenceRegistry, reference_data
+from .metrics import metrics, MetricsMiddleware, DB_POOL_WAIT, instrument_socketio
+from .query_log import query_log, QueryLog, TimedCursor, call_site, fingerprint
+from .profiling import ProfilingMiddleware, StackSampler
+from .local_db import connect_local, init_local_db
+from .event_search import EventSearchIndex, event_search, SEARCH_PAGE_SIZE
+from .autocomplete import PrefixIndex, Autocomplete, autocomplete, AUTOCOMPLETE_LIMIT
+from .data_export import export_table, iter_user_export, encode_csv, EXPORT_TABLES, EXPORT_FORMATS
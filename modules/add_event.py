@@ -1,4 +1,6 @@
 from . import sendlog, sendmail, detailsformat
+from .event_search import event_search
+from .autocomplete import autocomplete
 
 def addevent(c, form_data: dict, owner_username: str):
     field = ["eventname", "email", "eventstarttime", "eventendtime", "eventstartdate", "eventenddate", "location", "category", "description", "username"]
@@ -40,6 +42,8 @@ def addevent(c, form_data: dict, owner_username: str):
         # Fetch details for email
         eventdetails = c.execute("SELECT * FROM eventdetail WHERE eventid=?", (lastid["eventid"],)).fetchone()
         details = detailsformat(eventdetails)
+        event_search.upsert([eventdetails])
+        autocomplete.add_event(eventdetails)
 
         sendmail(event_values[1], "Event Approved", f'Congragulations\n\nYour Event is approved and now visible on Campaigns Page.\n\nEvent Details:\n\n{details}\n\nThank You!')
 
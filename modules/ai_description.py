@@ -0,0 +1,289 @@
+import os
+import re
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+
+
+# --- AI Event Descriptions ---
+#
+# One streamed model call writes all four tones, each under a "### descN"
+# heading; a description is handed on as soon as the next heading (or the
+# end of the stream) shows it is complete, so the first one can be shown
+# while the others are still being written. Calls share one semaphore
+# (AI_MAX_CONCURRENCY) so a burst of users cannot open unbounded upstream
+# requests, and the stream is closed when the client goes away.
+# Set AI_BACKEND=fake to run without network access.
+
+AI_MODEL = "gemini-3-flash-preview"
+AI_FIELDS = ["eventname", "eventstarttime", "eventendtime", "eventstartdate", "eventenddate", "location", "category"]
+AI_TONES = {
+    "desc1": "Formal",
+    "desc2": "Informal",
+    "desc3": "Promotional",
+    "desc4": "Entertaining/Fun",
+}
+
+_semaphore = None
+
+
+def _limit():
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(int(os.environ.get("AI_MAX_CONCURRENCY", "8")))
+    return _semaphore
+
+
+def event_values(form_data):
+    """[[field, value], ...] for the filled-in fields, in a stable order."""
+    return [[x, form_data.get(x)] for x in AI_FIELDS if form_data.get(x)]
+
+
+_HEADING = re.compile(r"^[ \t]*#{1,4}[ \t]*(desc\d)\b[^\n]*\n", re.MULTILINE)
+
+
+def build_prompt(values):
+    tones = "\n".join(f"    ### {key}\n    (a description in a {tone} tone)" for key, tone in AI_TONES.items())
+    return f"""Generate descriptions based on following details in pure english language.
+    Context:
+    Details of event: {values}
+    Write one description (max 500 words, include hashtags) for each tone below, in this order,
+    each starting with its heading line exactly as shown:
+{tones}
+    Reply with the headings and description text only — no JSON, no markdown code fences."""
+
+
+async def split_tones(chunks):
+    """
+    Async generator: (key, text) for each "### descN" section of a streamed
+    reply, yielded once the following heading or the end of the stream arrives.
+    """
+    buffer, done = "", set()
+
+    def complete(final):
+        headings = list(_HEADING.finditer(buffer))
+        ends = [h.start() for h in headings[1:]] + ([len(buffer)] if final else [])
+        for heading, end in zip(headings, ends):
+            key = heading.group(1)
+            if key in AI_TONES and key not in done:
+                done.add(key)
+                yield key, _clean(buffer[heading.end():end])
+
+    async for chunk in chunks:
+        buffer += chunk or ""
+        for item in complete(False):
+            yield item
+    for item in complete(True):
+        yield item
+    if not done:
+        raise ValueError("AI reply contained no description headings")
+
+
+def _clean(text):
+    text = (text or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text.split("\n", 1)[1] if "\n" in text else text
+    return text.strip()
+
+
+def lazy_gemini_client(api_key):
+    """
+    Client factory that imports google.genai and builds the client on first
+    use — the SDK import alone costs a few hundred ms of cold start. It blocks,
+    so call it off the event loop (GeminiDescriptionBackend.warm / to_thread).
+    """
+    client = None
+    lock = threading.Lock()
+
+    def factory():
+        nonlocal client
+        if client is None:
+            with lock:
+                if client is None:
+                    from google import genai
+                    client = genai.Client(api_key=api_key)
+        return client
+    return factory
+
+
+class GeminiDescriptionBackend:
+    """Uses the async (client.aio) Gemini API so the event loop never blocks."""
+
+    def __init__(self, client_factory):
+        self._client_factory = client_factory
+        self._client = None
+
+    def warm(self):
+        """Import the SDK and build the client now (run in a background thread after startup)."""
+        try:
+            self._client = self._client_factory()
+        except Exception as e:
+            print(f"Gemini client warm-up failed, retrying on first request: {e}")
+
+    async def stream(self, prompt):
+        """Yield the reply text chunk by chunk as the model writes it."""
+        if self._client is None:
+            # Not warmed yet — keep the SDK import off the event loop
+            self._client = await asyncio.to_thread(self._client_factory)
+        response = await self._client.aio.models.generate_content_stream(model=AI_MODEL, contents=prompt)
+        async for chunk in response:
+            yield chunk.text or ""
+
+
+class FakeDescriptionBackend:
+    """Offline stand-in: streams a canned description per tone, one every `delay` seconds."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+
+    def warm(self):
+        pass
+
+    async def stream(self, prompt):
+        self.calls += 1
+        for key, tone in AI_TONES.items():
+            await asyncio.sleep(self.delay)
+            yield f"### {key}\nA {tone.lower()} description "
+            yield "for this event. #SahyogSutra #Community\n\n"
+
+
+async def generate_tones(backend, values):
+    """Async generator yielding (key, text) as each tone finishes. Closes the model stream if closed early."""
+    async with _limit():
+        chunks = backend.stream(build_prompt(values))
+        try:
+            async for item in split_tones(chunks):
+                yield item
+        finally:
+            await chunks.aclose()
+
+
+# --- Result Cache + Single-Flight ---
+#
+# Description sets are cached on the normalised form fields (LRU, bounded by
+# size and TTL). Identical requests that arrive while a generation is running
+# subscribe to that same generation instead of starting another; it is only
+# cancelled once every subscriber has disconnected.
+
+
+def normalize_key(values):
+    fields = {k: " ".join(str(v).lower().split()) for k, v in values}
+    return tuple(fields.get(x, "") for x in AI_FIELDS)
+
+
+class _Flight:
+    def __init__(self):
+        self.results = {}
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self.changed = asyncio.Event()
+
+    def notify(self):
+        old, self.changed = self.changed, asyncio.Event()
+        old.set()
+
+
+class DescriptionService:
+    def __init__(self, backend, maxsize=256, ttl=900):
+        self.backend = backend
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._cache: OrderedDict = OrderedDict()   # key -> (expires_at, {desc: text})
+        self._flights: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.joined = 0
+
+    def cached(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.time():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry[1]
+
+    def is_known(self, values):
+        """True if a request for these values would not trigger a new model call."""
+        key = normalize_key(values)
+        return key in self._flights or self.cached(key) is not None
+
+    def _store(self, key, results):
+        self._cache[key] = (time.time() + self.ttl, results)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def _forget(self, key, flight):
+        """Drop `flight` from the table — unless a newer flight has since taken its key."""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def _run(self, key, values, flight):
+        try:
+            async for desc, text in generate_tones(self.backend, values):
+                flight.results[desc] = text
+                flight.notify()
+            self._store(key, {k: flight.results[k] for k in AI_TONES if k in flight.results})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            self._forget(key, flight)
+            flight.notify()
+
+    async def stream(self, values):
+        """Yield (key, text) pairs — from cache, a shared in-flight run, or a new one."""
+        key = normalize_key(values)
+        hit = self.cached(key)
+        if hit is not None:
+            self.hits += 1
+            for item in hit.items():
+                yield item
+            return
+
+        flight = self._flights.get(key)
+        if flight is None:
+            self.misses += 1
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.create_task(self._run(key, values, flight))
+        else:
+            self.joined += 1
+
+        flight.subscribers += 1
+        sent = set()
+        try:
+            while True:
+                changed = flight.changed
+                for desc, text in list(flight.results.items()):
+                    if desc not in sent:
+                        sent.add(desc)
+                        yield desc, text
+                if flight.done:
+                    break
+                await changed.wait()
+            if flight.error is not None and not sent:
+                raise flight.error
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    async def generate(self, values):
+        results = {}
+        async for desc, text in self.stream(values):
+            results[desc] = text
+        return {k: results[k] for k in AI_TONES if k in results}
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "joined": self.joined,
+                "size": len(self._cache), "in_flight": len(self._flights)}
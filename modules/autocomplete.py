@@ -0,0 +1,200 @@
+import heapq
+import bisect
+import threading
+from collections import Counter
+
+from .event_search import _TOKEN, _fold
+from .reference_registry import reference_data
+
+
+# --- Autocomplete (prefix index) ---
+#
+# In-memory suggestions for the add-event form, per worker:
+#   • locations  — every distinct eventdetail/endedevent location, weighted by
+#                  how many events used it; spellings that differ only in case,
+#                  accents or punctuation share one entry shown in its most
+#                  common form;
+#   • categories — the event types from events.json, weighted by use, also
+#                  found through their parent category's name.
+# Each entry is stored under every word start ("Juhu Beach, Mumbai" under
+# "juhu beach mumbai", "beach mumbai" and "mumbai") in one sorted list, so a
+# lookup is two bisects plus a top-k over the matching run. Results for
+# prefixes with large runs are cached; counts only ever go up, so
+# an add or bump merges the changed entry into the cached lists it matches
+# instead of invalidating them.
+# build_autocomplete() in app.py loads the counts at startup; approvals then
+# add to them through add_event() in the worker that handled them, and every
+# worker reloads when the event tables change (autocomplete_thread).
+
+AUTOCOMPLETE_LIMIT = 8
+AUTOCOMPLETE_MAX_LIMIT = 20
+MAX_PREFIX_LENGTH = 64
+CACHE_MIN_RUN = 500
+_RUN_END = chr(0x10FFFF)
+
+
+def normalise(text):
+    return " ".join(_fold(t) for t in _TOKEN.findall(text or ""))
+
+
+def _word_starts(key):
+    return [0] + [i + 1 for i, ch in enumerate(key) if ch == " "]
+
+
+def _rank(entry):
+    return -entry["count"], len(entry["value"]), entry["value"]
+
+
+def _public(entry):
+    return {k: v for k, v in entry.items() if k != "spellings"}
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []      # sorted (suffix starting at a word, entry key)
+        self._entries = {}   # entry key -> {"value", "count", "spellings", **extra}
+        self._suffixes = {}  # entry key -> the suffixes it is indexed under
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _new_entry(extra):
+        return {"value": "", "count": 0, "spellings": Counter(), **extra}
+
+    @staticmethod
+    def _index_keys(key, also):
+        keys = {(key[i:], key) for i in _word_starts(key)}
+        for alias in also:
+            alias = normalise(alias)
+            keys.update((alias[i:], key) for i in _word_starts(alias) if alias)
+        return keys
+
+    @staticmethod
+    def _count(entry, text, count):
+        entry["count"] += count
+        entry["spellings"][text.strip()] += count
+        entry["value"] = entry["spellings"].most_common(1)[0][0]
+
+    def load(self, items):
+        """Replace everything with (text, count, also, extra) tuples in one swap."""
+        entries, keys, suffixes = {}, [], {}
+        for text, count, also, extra in items:
+            key = normalise(text)
+            if not key:
+                continue
+            entry = entries.get(key)
+            if entry is None:
+                entry = entries[key] = self._new_entry(extra)
+                index_keys = self._index_keys(key, also)
+                keys.extend(index_keys)
+                suffixes[key] = [s for s, _ in index_keys]
+            self._count(entry, text, count)
+        keys.sort()
+        with self._lock:
+            self._entries, self._keys, self._suffixes, self._cache = entries, keys, suffixes, {}
+
+    def add(self, text, count=1, also=(), **extra):
+        key = normalise(text)
+        if not key:
+            return False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = self._new_entry(extra)
+                index_keys = self._index_keys(key, also)
+                for k in index_keys:
+                    bisect.insort(self._keys, k)
+                self._suffixes[key] = [s for s, _ in index_keys]
+            self._count(entry, text, count)
+            self._refresh_cache(key)
+        return True
+
+    def bump(self, text, count=1):
+        """Count another use of an existing entry; unknown text is ignored."""
+        key = normalise(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            self._count(entry, text, count)
+            self._refresh_cache(key)
+        return True
+
+    def _refresh_cache(self, key):
+        """Merge entry `key` (new or more used) into every cached result it belongs in."""
+        entry, suffixes = self._entries[key], self._suffixes[key]
+        for (prefix, limit), cached in self._cache.items():
+            if not any(s.startswith(prefix) for s in suffixes):
+                continue
+            others = [e for e in cached if normalise(e["value"]) != key]
+            top = sorted(others + [_public(entry)], key=_rank)[:limit]
+            self._cache[(prefix, limit)] = top
+
+    def complete(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """Top `limit` entries with a word starting with `prefix`, most used first."""
+        p = normalise((prefix or "")[:MAX_PREFIX_LENGTH])
+        if not p:
+            return []
+        with self._lock:
+            cache_key = (p, limit)
+            if cache_key in self._cache:
+                return self._cache[cache_key]
+            lo = bisect.bisect_left(self._keys, (p,))
+            hi = bisect.bisect_left(self._keys, (p + _RUN_END,))
+            matched = {k for _, k in self._keys[lo:hi]}
+            top = heapq.nsmallest(limit, map(self._entries.__getitem__, matched), key=_rank)
+            result = [_public(e) for e in top]
+            if hi - lo >= CACHE_MIN_RUN:
+                self._cache[cache_key] = result
+            return result
+
+
+class Autocomplete:
+    FIELDS = ("location", "category")
+
+    def __init__(self):
+        self.locations = PrefixIndex()
+        self.categories = PrefixIndex()
+        self._category_counts = Counter()
+        self._events_etag = None
+        self._lock = threading.Lock()
+
+    def load(self, location_counts, category_counts):
+        """Full rebuild from {location: events} and {category: events}."""
+        self.locations.load((loc, n, (), {}) for loc, n in location_counts.items() if loc)
+        with self._lock:
+            self._category_counts = Counter({c: n for c, n in category_counts.items() if c})
+        self._load_categories()
+
+    def _load_categories(self):
+        data = reference_data.categories()
+        with self._lock:
+            counts = Counter(self._category_counts)
+            self._events_etag = reference_data.events.etag
+        self.categories.load((sub, counts.get(sub, 0), (parent,), {"category": parent})
+                             for parent, subs in data.items() for sub in subs)
+
+    def add_event(self, event):
+        """Count a newly approved event's location and category."""
+        if event["location"]:
+            self.locations.add(event["location"])
+        if event["category"]:
+            with self._lock:
+                self._category_counts[event["category"]] += 1
+            self.categories.bump(event["category"])
+
+    def complete(self, field, prefix, limit=AUTOCOMPLETE_LIMIT):
+        limit = max(1, min(int(limit), AUTOCOMPLETE_MAX_LIMIT))
+        if field == "location":
+            return self.locations.complete(prefix, limit)
+        reference_data.categories()   # picks up an edited events.json
+        if reference_data.events.etag != self._events_etag:
+            self._load_categories()
+        return self.categories.complete(prefix, limit)
+
+
+autocomplete = Autocomplete()
+autocomplete.load({}, {})
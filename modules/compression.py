@@ -0,0 +1,223 @@
+import os
+import sys
+import time
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from .static_assets import _accepted
+
+try:
+    import brotli
+except ImportError:   # optional — gzip only without it
+    brotli = None
+
+
+# --- Response Compression ---
+#
+# CompressionMiddleware negotiates br / gzip from Accept-Encoding and
+# compresses text responses on the way out:
+#   • bodies under minimum_size, non-text media types and responses that
+#     already carry a Content-Encoding (pre-compressed static assets) are
+#     passed through untouched;
+#   • streamed responses (SSE, CSV exports) are compressed chunk by chunk and
+#     flushed after every chunk, so clients still see each event immediately;
+#   • every compressible response gets "Vary: Accept-Encoding", compressed or
+#     not, so shared caches keep the variants apart.
+# Settings can be overridden per endpoint with @compress_route(...).
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml",
+                      "image/svg+xml", "application/manifest+json", "application/x-ndjson")
+
+
+def compress_route(enabled=True, minimum_size=None, gzip_level=None, brotli_quality=None):
+    """Per-endpoint override, read by CompressionMiddleware after routing."""
+    options = {"enabled": enabled, "minimum_size": minimum_size,
+               "gzip_level": gzip_level, "brotli_quality": brotli_quality}
+
+    def decorator(fn):
+        fn.__compression__ = {k: v for k, v in options.items() if v is not None}
+        return fn
+    return decorator
+
+
+def choose_encoding(accept_encoding):
+    accepted = _accepted(accept_encoding or "")
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compressible(headers):
+    if "content-encoding" in headers:
+        return False
+    media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _add_vary(headers, value="Accept-Encoding"):
+    current = headers.get("vary")
+    if not current:
+        headers["Vary"] = value
+    elif value.lower() not in [v.strip().lower() for v in current.split(",")] and current.strip() != "*":
+        headers["Vary"] = f"{current}, {value}"
+
+
+class _Encoder:
+    def __init__(self, coding, gzip_level, brotli_quality):
+        self.coding = coding
+        if coding == "br":
+            self._c = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._c = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)   # 31 = gzip container
+
+    def chunk(self, data):
+        """Compress and flush, so the bytes so far are decodable right away."""
+        if self.coding == "br":
+            return self._c.process(data) + self._c.flush()
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data=b""):
+        if self.coding == "br":
+            return self._c.process(data) + self._c.finish()
+        return self._c.compress(data) + self._c.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=1024, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.defaults = {"enabled": True, "minimum_size": minimum_size,
+                         "gzip_level": gzip_level, "brotli_quality": brotli_quality}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        coding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        start = None
+        encoder = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start = message   # held back until the first body chunk decides
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+
+            if encoder is None:
+                headers = MutableHeaders(scope=start)
+                options = {**self.defaults, **getattr(scope.get("endpoint"), "__compression__", {})}
+                if not _compressible(headers):
+                    if start["status"] == 304:
+                        _add_vary(headers)   # must match the 200 it revalidates
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                _add_vary(headers)
+                if (not options["enabled"] or coding is None or start["status"] in (204, 206, 304)
+                        or (not more and len(body) < options["minimum_size"])):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                encoder = _Encoder(coding, options["gzip_level"], options["brotli_quality"])
+                headers["Content-Encoding"] = coding
+                if not more:
+                    body = encoder.finish(body)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                del headers["Content-Length"]
+                await send(start)
+
+            data = encoder.chunk(body) if more else encoder.finish(body)
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# --- Benchmark ---
+#
+#   python -m modules.compression [page.html ...] [--events N]
+#
+# With no files, renders templates/campaigns.html with N synthetic events
+# (default 300) and reports wire bytes and CPU time per encoding / level.
+
+
+def _synthetic_campaigns(n):
+    import random
+    from jinja2 import Environment, FileSystemLoader
+
+    rnd = random.Random(42)
+    categories = ["Health", "Education", "Environment", "Animal Welfare", "Disaster Relief", "Community"]
+    places = ["Pune", "Mumbai", "Delhi", "Bengaluru", "Jaipur", "Kolkata", "Chennai"]
+    words = ("volunteer community drive clean food blood donation camp awareness workshop "
+             "children support local help plantation river school elderly care").split()
+    events = []
+    for i in range(1, n + 1):
+        events.append({
+            "eventid": i,
+            "eventname": " ".join(rnd.choice(words).title() for _ in range(4)),
+            "eventstartdate": "2026-11-%02d" % rnd.randint(1, 28),
+            "eventenddate": "2026-12-%02d" % rnd.randint(1, 28),
+            "eventstarttime": "09:00", "eventendtime": "17:00",
+            "location": rnd.choice(places),
+            "category": rnd.choice(categories),
+            "description": " ".join(rnd.choice(words) for _ in range(rnd.randint(30, 120))),
+            "likes": rnd.randint(0, 500),
+            "username": f"user{rnd.randint(1, 50)}",
+        })
+    allevents = {}
+    for e in events:
+        allevents.setdefault(e["category"], []).append(e)
+
+    env = Environment(loader=FileSystemLoader("templates"), autoescape=True)
+    env.filters["datetimeformat"] = lambda v: v
+    env.globals["asset_url"] = lambda name: f"/static/{name}"
+    return env.get_template("campaigns.html").render(
+        allevents=allevents, userdetails={}, viewyourevents=False, sortby="eventstartdate",
+        isadmin=False, c_user="None", viewuserevent="None", translate=lambda t, save_file=True: t,
+        trending_events=sorted(events, key=lambda x: x["likes"], reverse=True)[:4], user_language="en",
+    ).encode("utf-8")
+
+
+def _bench(name, raw, repeat=20):
+    variants = [("gzip", lvl) for lvl in (1, 6, 9)]
+    if brotli is not None:
+        variants += [("br", q) for q in (1, 4, 6, 11)]
+    print(f"\n{name}: {len(raw):,} bytes uncompressed")
+    print(f"  {'encoding':<10}{'bytes':>10}{'ratio':>8}{'cpu ms':>10}")
+    for coding, level in variants:
+        rounds = 3 if (coding == "br" and level == 11) else repeat
+        t0 = time.process_time()
+        for _ in range(rounds):
+            out = _Encoder(coding, level, level).finish(raw)
+        ms = (time.process_time() - t0) * 1000 / rounds
+        print(f"  {coding + '-' + str(level):<10}{len(out):>10,}{len(raw) / len(out):>8.1f}{ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    n = 300
+    if "--events" in args:
+        i = args.index("--events")
+        n = int(args[i + 1])
+        del args[i:i + 2]
+    if args:
+        for path in args:
+            with open(path, "rb") as f:
+                _bench(os.path.basename(path), f.read())
+    else:
+        _bench(f"campaigns.html ({n} events)", _synthetic_campaigns(n))
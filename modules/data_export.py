@@ -0,0 +1,134 @@
+import io
+import os
+import csv
+import ast
+import json
+import zlib
+
+
+# --- Data Export ---
+#
+# Exports are generators from the database to the socket, so memory stays
+# flat however large the table:
+#   • rows are read in keyset pages (WHERE rowid > last ORDER BY rowid LIMIT n),
+#     each page on a briefly borrowed connection — a slow download never pins
+#     a pooled connection, and no page is re-scanned the way OFFSET would;
+#   • encode_csv / encode_jsonl turn rows into bytes a few hundred rows at a
+#     time, and gzip_stream can compress those chunks as they go.
+# `query(sql, params)` is supplied by the app and returns a list of rows.
+# userdetails is exported without the password hash; chat histories (one
+# messages2 row per event) are flattened to one row per message.
+
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", "2000"))
+EXPORT_CHAT_CHUNK = 50      # messages2 rows hold whole histories
+EXPORT_IN_BATCH = 500       # ids per IN (...) — below SQLite's variable limit
+FLUSH_ROWS = 500
+
+EVENT_COLUMNS = ("eventid", "eventname", "email", "eventstarttime", "eventendtime", "eventstartdate",
+                 "eventenddate", "location", "category", "description", "username", "likes")
+EXPORT_TABLES = {
+    "eventdetail": EVENT_COLUMNS,
+    "endedevent": EVENT_COLUMNS,
+    "userdetails": ("username", "name", "email", "role", "events", "likes"),
+    "messages": ("eventid", "username", "message", "time"),
+}
+EXPORT_FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+def iter_table(query, table, chunk=EXPORT_CHUNK_ROWS):
+    """Every row of an EXPORT_TABLES table as a list of values, in rowid order."""
+    if table == "messages":
+        yield from _iter_chat(query)
+        return
+    columns = EXPORT_TABLES[table]
+    last = -(2 ** 63)
+    while True:
+        rows = query(f"SELECT rowid AS export_rowid, {', '.join(columns)} FROM {table} "
+                     f"WHERE rowid > ? ORDER BY rowid LIMIT ?", (last, chunk))
+        for row in rows:
+            yield [row[c] for c in columns]
+        if len(rows) < chunk:
+            return
+        last = rows[-1]["export_rowid"]
+
+
+def _iter_chat(query):
+    last = -(2 ** 63)
+    while True:
+        rows = query("SELECT eventid, msgs FROM messages2 WHERE eventid > ? ORDER BY eventid LIMIT ?",
+                     (last, EXPORT_CHAT_CHUNK))
+        for row in rows:
+            try:
+                history = ast.literal_eval(row["msgs"]) if row["msgs"] else []
+            except (ValueError, SyntaxError) as e:
+                print(f"Export: unreadable chat history for event {row['eventid']}: {e}")
+                continue
+            for x in history:
+                yield [row["eventid"], x[0], x[1], x[2]]
+        if len(rows) < EXPORT_CHAT_CHUNK:
+            return
+        last = rows[-1]["eventid"]
+
+
+def iter_user_export(query, user):
+    """The /export_data sheet: profile section, then the user's events from one IN query per batch."""
+    yield ["--- USER PROFILE ---"]
+    yield ["Name", "Username", "Email", "Role", "Events IDs"]
+    yield [user["name"], user["username"], user["email"], user["role"], user["events"]]
+    yield []
+    yield ["--- CREATED EVENTS ---"]
+    if not user["events"]:
+        return
+    ids = [int(i) for i in user["events"].split(",") if i.strip().isdigit()]
+    yield ["Event ID", "Name", "Location", "Category", "Date", "Description"]
+    for i in range(0, len(ids), EXPORT_IN_BATCH):
+        batch = ids[i:i + EXPORT_IN_BATCH]
+        rows = query(f"SELECT eventid, eventname, location, category, eventstartdate, description FROM eventdetail "
+                     f"WHERE eventid IN ({', '.join(['?'] * len(batch))}) ORDER BY eventid", tuple(batch))
+        for ev in rows:
+            yield [ev["eventid"], ev["eventname"], ev["location"], ev["category"], ev["eventstartdate"],
+                   ev["description"]]
+
+
+def encode_csv(rows, header=None):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(header)
+    for n, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if n % FLUSH_ROWS == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+def encode_jsonl(rows, header):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(header, row)), ensure_ascii=False, default=str))
+        if len(lines) == FLUSH_ROWS:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def gzip_stream(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def export_table(query, table, fmt="csv", gzip=False):
+    """(byte chunks, media type, file name) for a bulk export of `table`."""
+    header = EXPORT_TABLES[table]
+    encode = encode_csv if fmt == "csv" else encode_jsonl
+    chunks = encode(iter_table(query, table), header)
+    if gzip:
+        return gzip_stream(chunks), "application/gzip", f"{table}.{fmt}.gz"
+    return chunks, EXPORT_FORMATS[fmt], f"{table}.{fmt}"
@@ -1,5 +1,6 @@
 from . import sendlog, sendmail
 from .detailformat import detailsformat
+from .event_search import event_search
 
 def del_event(c, eventid):
     try:
@@ -15,6 +16,7 @@ def del_event(c, eventid):
 
         c.execute("DELETE FROM eventdetail where eventid=?", (eventid,))
         c.execute("DELETE FROM messages where eventid=?", (eventid,))
+        event_search.remove([eventid])
 
         if details and details["events"]:
             events = details["events"].split(",")
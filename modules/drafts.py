@@ -0,0 +1,104 @@
+import json
+import time
+import sqlite3
+import threading
+
+
+# --- Add-Event Drafts ---
+#
+# The whole add-event form is saved as one JSON document per owner (username,
+# or an anonymous draft id kept in the session) with a version number. The
+# client sends the full form after a debounce; an unchanged payload is
+# recognised server-side and neither rewritten nor re-versioned.
+# Anonymous drafts live only as long as the session that owns them could, so
+# purge_anonymous() drops those left untouched for longer than that.
+
+DRAFT_FIELDS = ["eventname", "eventstarttime", "eventendtime", "eventstartdate", "eventenddate", "location", "category", "description"]
+DRAFT_MAX_VALUE = 10000
+DRAFT_TOUCH_AFTER = 86400   # refresh updated_at on an unchanged save at most daily
+
+
+def clean_fields(fields):
+    """Keep only known form fields, stripped and length-capped; drop empty ones."""
+    out = {}
+    for f in DRAFT_FIELDS:
+        value = fields.get(f)
+        if value is None:
+            continue
+        value = str(value).strip()[:DRAFT_MAX_VALUE]
+        if value:
+            out[f] = value
+    return out
+
+
+class DraftStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._conn().execute("""CREATE TABLE IF NOT EXISTS drafts (
+            owner TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        ) WITHOUT ROWID""")
+        self._conn().execute("CREATE INDEX IF NOT EXISTS drafts_updated ON drafts(updated_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, owner):
+        """Returns (fields, version); ({}, 0) when there is no draft."""
+        row = self._conn().execute("SELECT data, version FROM drafts WHERE owner=?", (owner,)).fetchone()
+        if row is None:
+            return {}, 0
+        return json.loads(row[0]), row[1]
+
+    def save(self, owner, fields, merge=False):
+        """
+        Store the draft. Returns (version, changed). With merge=True only the
+        given fields are updated (used by the legacy one-field endpoint).
+        """
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = conn.execute("SELECT data, version, updated_at FROM drafts WHERE owner=?", (owner,)).fetchone()
+                current, version, updated_at = (json.loads(row[0]), row[1], row[2]) if row else ({}, 0, now)
+                new = {**current, **clean_fields(fields)} if merge else clean_fields(fields)
+                if new == current:
+                    if row and now - updated_at > DRAFT_TOUCH_AFTER:
+                        # Still in use — keep it clear of purge_anonymous()
+                        conn.execute("UPDATE drafts SET updated_at=? WHERE owner=?", (now, owner))
+                    conn.execute("COMMIT")
+                    return version, False
+                version += 1
+                conn.execute(
+                    """INSERT INTO drafts(owner, data, version, updated_at) VALUES (?, ?, ?, ?)
+                       ON CONFLICT(owner) DO UPDATE SET data=excluded.data, version=excluded.version,
+                       updated_at=excluded.updated_at""",
+                    (owner, json.dumps(new, ensure_ascii=False), version, now),
+                )
+                conn.execute("COMMIT")
+                return version, True
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, owner):
+        self._conn().execute("DELETE FROM drafts WHERE owner=?", (owner,))
+
+    def purge_anonymous(self, max_age):
+        """Delete anonymous drafts not saved for `max_age` seconds. Returns the number removed."""
+        with self._write_lock:
+            cur = self._conn().execute("DELETE FROM drafts WHERE owner LIKE 'anon:%' AND updated_at < ?",
+                                       (time.time() - max_age,))
+        return cur.rowcount
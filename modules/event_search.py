@@ -0,0 +1,366 @@
+import os
+import re
+import html
+import time
+import sqlite3
+import threading
+import unicodedata
+from functools import lru_cache
+
+from .reference_registry import reference_data
+
+
+# --- Event Search (SQLite FTS5) ---
+#
+# A local FTS5 index over the active events' name, description, location and
+# category (plus the category's parent from events.json, so "health" finds
+# every Health & Wellness event type). It lives in its own file (SEARCH_DB),
+# shared by all workers on the host, and is kept current incrementally:
+#   • addevent (direct add and approval) upserts the new row;
+#   • del_event (delete and archive to endedevent) removes it;
+#   • sync() reconciles against eventdetail at startup and on every
+#     checkeventloop pass, which also picks up changes made by other hosts.
+# Queries are tokenised server-side and every term is quoted, so user input
+# can never be parsed as FTS syntax; the last term matches as a prefix once it
+# has PREFIX_MIN_CHARS characters. Prefixes of 2–6 characters are indexed
+# (PREFIX_INDEX), so a typical last word reads one doclist instead of merging
+# every word that starts with it; an index built with other settings is
+# dropped at startup and rebuilt by sync().
+# The bm25 column weights are stored as each table's rank function, and
+# only rowid and rank go through the sort. Scoring is what costs time on a
+# broad query, so only the newest SEARCH_RANK_WINDOW matches are ranked (all
+# of them when fewer match — the usual case for a specific query). The
+# page's rows are then fetched by rowid and highlighted here (FTS5's
+# highlight() re-merges prefix doclists per row). There is no total count:
+# one extra row is fetched to tell whether a next page exists.
+#
+# Translations: whenever /translate_event translates an indexed event, the
+# result is stored per (event, language) in event_fts_tr. A search with a
+# lang matches the original and that language's translation (best score per
+# event wins) and never calls the translator itself. Re-indexing or removing
+# an event drops its translations, so they can't go stale.
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
+MAX_QUERY_TERMS = 8
+PREFIX_MIN_CHARS = 2
+SEARCH_RANK_WINDOW = int(os.environ.get("SEARCH_RANK_WINDOW", "1000"))
+SNIPPET_TOKENS = 24
+# bm25 column weights: name, description, location, category
+RANK_WEIGHTS = (10.0, 1.0, 4.0, 3.0)
+SOURCE_LANGUAGE = "en"
+TRANSLATED_FIELDS = ("eventname", "description", "location")
+PREFIX_INDEX = "2 3 4 5 6"
+# Marks (M*) are word characters, otherwise Indic vowel signs split words in two
+TOKENIZE = "unicode61 remove_diacritics 2 categories 'L* N* Co M*'"
+
+_TOKEN = re.compile(r"(?:[^\W_]|[\u0300-\u036f\u0900-\u0dff])+")
+
+
+@lru_cache(maxsize=65536)   # highlighting folds every word of every result
+def _fold(word):
+    """Case and Latin-diacritic folding, as the unicode61 tokenizer does it."""
+    decomposed = unicodedata.normalize("NFD", word.lower())
+    return unicodedata.normalize("NFC", "".join(ch for ch in decomposed if not "\u0300" <= ch <= "\u036f"))
+
+
+def query_terms(text):
+    return [_fold(t) for t in _TOKEN.findall(text or "")][:MAX_QUERY_TERMS]
+
+
+def fts_query(text):
+    """User text -> safe FTS5 expression: '"a" "bc"*' (all terms, a last one of 2+ chars as a prefix)."""
+    terms = query_terms(text)
+    if not terms:
+        return None
+    quoted = [f'"{t}"' for t in terms]
+    if len(terms[-1]) >= PREFIX_MIN_CHARS:
+        quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _is_hit(word, terms):
+    word = _fold(word)
+    return word in terms or (len(terms[-1]) >= PREFIX_MIN_CHARS and word.startswith(terms[-1]))
+
+
+def _highlight(text, terms):
+    """HTML-escaped text with every matching word wrapped in <mark>."""
+    out, last = [], 0
+    for m in _TOKEN.finditer(text or ""):
+        if _is_hit(m.group(), terms):
+            out.append(html.escape(text[last:m.start()]))
+            out.append(f"<mark>{html.escape(m.group())}</mark>")
+            last = m.end()
+    out.append(html.escape((text or "")[last:]))
+    return "".join(out)
+
+
+def _snippet(text, terms, size=SNIPPET_TOKENS):
+    """About `size` words of text around the first match, highlighted."""
+    tokens = list(_TOKEN.finditer(text or ""))
+    if len(tokens) <= size:
+        return _highlight(text, terms)
+    first = next((i for i, m in enumerate(tokens) if _is_hit(m.group(), terms)), 0)
+    start = max(0, min(first - 3, len(tokens) - size))
+    end = start + size
+    body = _highlight(text[tokens[start].start():tokens[end - 1].end()], terms)
+    return ("…" if start else "") + body + ("…" if end < len(tokens) else "")
+
+
+def _category_text(category):
+    parent = reference_data.parent_of(category) if category else None
+    return f"{category} {parent}" if parent else (category or "")
+
+
+class EventSearchIndex:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._drop_outdated()
+        self._conn().execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS event_fts USING fts5(
+            eventname, description, location, category_text,
+            category UNINDEXED, eventstartdate UNINDEXED, eventenddate UNINDEXED,
+            tokenize = "{TOKENIZE}",
+            prefix = '{PREFIX_INDEX}'
+        )""")
+        self._conn().execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS event_fts_tr USING fts5(
+            eventname, description, location,
+            tokenize = "{TOKENIZE}",
+            prefix = '{PREFIX_INDEX}'
+        )""")
+        with self._write_lock:
+            for table, weights in (("event_fts", RANK_WEIGHTS), ("event_fts_tr", RANK_WEIGHTS[:3])):
+                self._conn().execute(f"INSERT INTO {table}({table}, rank) VALUES ('rank', ?)",
+                                     (f"bm25({', '.join(map(str, weights))})",))
+        # event_fts_tr rowid -> (event, language)
+        self._conn().execute("""CREATE TABLE IF NOT EXISTS event_tr (
+            id INTEGER PRIMARY KEY,
+            eventid INTEGER NOT NULL,
+            lang TEXT NOT NULL,
+            UNIQUE (eventid, lang)
+        )""")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _drop_outdated(self):
+        """Drop an index created with different prefix settings; sync() refills it."""
+        row = self._conn().execute("SELECT sql FROM sqlite_master WHERE name='event_fts'").fetchone()
+        if row is None or f"prefix = '{PREFIX_INDEX}'" in row[0]:
+            return
+        print("Search index schema changed, rebuilding (indexed translations are dropped)")
+        with self._write_lock:
+            for table in ("event_fts", "event_fts_tr", "event_tr"):
+                self._conn().execute(f"DROP TABLE IF EXISTS {table}")
+
+    def _write(self, fn):
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn)
+                conn.execute("COMMIT")
+                return result
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _drop_translations(conn, ids):
+        conn.executemany("DELETE FROM event_fts_tr WHERE rowid IN (SELECT id FROM event_tr WHERE eventid=?)", ids)
+        conn.executemany("DELETE FROM event_tr WHERE eventid=?", ids)
+
+    def upsert(self, events):
+        """Index (or re-index) eventdetail rows — dicts or sqlite Rows."""
+        rows = [(e["eventid"], e["eventname"] or "", e["description"] or "", e["location"] or "",
+                 _category_text(e["category"]), e["category"], e["eventstartdate"], e["eventenddate"])
+                for e in events]
+        if not rows:
+            return 0
+
+        def _do(conn):
+            ids = [(r[0],) for r in rows]
+            conn.executemany("DELETE FROM event_fts WHERE rowid=?", ids)
+            self._drop_translations(conn, ids)
+            conn.executemany("""INSERT INTO event_fts(rowid, eventname, description, location, category_text,
+                                category, eventstartdate, eventenddate) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+            return len(rows)
+        return self._write(_do)
+
+    def remove(self, eventids):
+        ids = [(int(i),) for i in eventids]
+        if ids:
+            def _do(conn):
+                conn.executemany("DELETE FROM event_fts WHERE rowid=?", ids)
+                self._drop_translations(conn, ids)
+            self._write(_do)
+        return len(ids)
+
+    def original(self, eventid):
+        """Indexed name/description/location of an active event, or None."""
+        row = self._conn().execute("SELECT eventname, description, location FROM event_fts WHERE rowid=?",
+                                   (eventid,)).fetchone()
+        return dict(zip(TRANSLATED_FIELDS, row)) if row else None
+
+    def has_translation(self, eventid, lang):
+        return self._conn().execute("SELECT 1 FROM event_tr WHERE eventid=? AND lang=?",
+                                    (eventid, lang)).fetchone() is not None
+
+    def add_translation(self, eventid, lang, fields):
+        """Index one event's translated name/description/location for `lang`."""
+        values = tuple(fields.get(f) or "" for f in TRANSLATED_FIELDS)
+
+        def _do(conn):
+            old = conn.execute("SELECT id FROM event_tr WHERE eventid=? AND lang=?", (eventid, lang)).fetchone()
+            if old:
+                conn.execute("DELETE FROM event_fts_tr WHERE rowid=?", old)
+                conn.execute("DELETE FROM event_tr WHERE id=?", old)
+            rowid = conn.execute("INSERT INTO event_tr(eventid, lang) VALUES (?, ?)", (eventid, lang)).lastrowid
+            conn.execute("INSERT INTO event_fts_tr(rowid, eventname, description, location) VALUES (?, ?, ?, ?)",
+                         (rowid, *values))
+        self._write(_do)
+
+    def index_translation(self, eventid, lang, original, translated):
+        """
+        /translate_event hook: index `translated` if `original` is what this
+        event currently says (the client sends both, so anything else is
+        ignored). Returns True when something new was indexed.
+        """
+        if not lang or lang == SOURCE_LANGUAGE:
+            return False
+        current = self.original(eventid)
+        if current is None or self.has_translation(eventid, lang):
+            return False
+        if any((original.get(f) or "").strip() != (current[f] or "").strip() for f in TRANSLATED_FIELDS):
+            return False
+        self.add_translation(eventid, lang, translated)
+        return True
+
+    def translation_count(self, lang=None):
+        if lang:
+            return self._conn().execute("SELECT COUNT(*) FROM event_tr WHERE lang=?", (lang,)).fetchone()[0]
+        return self._conn().execute("SELECT COUNT(*) FROM event_tr").fetchone()[0]
+
+    def ids(self):
+        return {r[0] for r in self._conn().execute("SELECT rowid FROM event_fts")}
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM event_fts").fetchone()[0]
+
+    def diff(self, current_ids):
+        """(ids missing from the index, indexed ids no longer active)."""
+        indexed = self.ids()
+        current = set(current_ids)
+        return current - indexed, indexed - current
+
+    def sync(self, events):
+        """Reconcile with the full list of active events. Returns (added, removed)."""
+        events = list(events)
+        missing, extra = self.diff(e["eventid"] for e in events)
+        self.remove(extra)
+        added = self.upsert([e for e in events if e["eventid"] in missing])
+        return added, len(extra)
+
+    @staticmethod
+    def _window_start(conn, matches, params):
+        """Lowest rowid among the newest `window` matches (0 when fewer match)."""
+        row = conn.execute(f"SELECT rowid FROM ({matches}) ORDER BY rowid DESC LIMIT 1 OFFSET :last",
+                           params).fetchone()
+        return row[0] if row else 0
+
+    def search(self, text, page=1, per_page=SEARCH_PAGE_SIZE, lang=None):
+        """
+        Ranked, paginated matches with <mark>-highlighted name, location and
+        description snippet. With a `lang` other than English, translations
+        indexed for that language are searched too, and results that have one
+        carry it under "translated".
+        """
+        started = time.perf_counter()
+        page = max(1, int(page))
+        per_page = max(1, min(int(per_page), SEARCH_MAX_PAGE_SIZE))
+        if lang == SOURCE_LANGUAGE:
+            lang = None
+        result = {"query": text or "", "lang": lang or SOURCE_LANGUAGE, "page": page, "per_page": per_page,
+                  "has_more": False, "results": [], "took_ms": 0.0}
+        terms = query_terms(text)
+        if not terms:
+            return result
+        match = fts_query(text)
+        offset = (page - 1) * per_page
+        # Enough candidates to tell whether this page has a successor
+        window = max(SEARCH_RANK_WINDOW, offset + per_page + 1)
+        params = {"match": match, "lang": lang, "limit": per_page + 1, "offset": offset, "last": window - 1}
+
+        conn = self._conn()
+        try:
+            params["cut"] = self._window_start(conn, "SELECT rowid FROM event_fts WHERE event_fts MATCH :match",
+                                               params)
+            hits = "SELECT rowid AS eventid, rank AS score FROM event_fts WHERE event_fts MATCH :match " \
+                   "AND rowid >= :cut"
+            if lang:
+                params["cut_tr"] = self._window_start(conn, """
+                    SELECT event_fts_tr.rowid FROM event_fts_tr JOIN event_tr ON event_tr.id = event_fts_tr.rowid
+                    WHERE event_fts_tr MATCH :match AND event_tr.lang = :lang""", params)
+                hits += """
+                    UNION ALL
+                    SELECT event_tr.eventid, event_fts_tr.rank
+                    FROM event_fts_tr JOIN event_tr ON event_tr.id = event_fts_tr.rowid
+                    WHERE event_fts_tr MATCH :match AND event_fts_tr.rowid >= :cut_tr AND event_tr.lang = :lang"""
+                hits = f"SELECT eventid, MIN(score) AS score FROM ({hits}) GROUP BY eventid"
+            ranked = conn.execute(f"SELECT eventid, score FROM ({hits}) ORDER BY score LIMIT :limit OFFSET :offset",
+                                  params).fetchall()
+            result["has_more"] = len(ranked) > per_page
+            ranked = ranked[:per_page]
+            page_ids = [r[0] for r in ranked]
+            marks = ", ".join("?" * len(page_ids))
+            rows = {r[0]: r for r in conn.execute(f"""
+                SELECT rowid, eventname, description, location, category, eventstartdate, eventenddate
+                FROM event_fts WHERE rowid IN ({marks})""", page_ids)}
+            translations = {}
+            if lang and page_ids:
+                translations = {r[0]: r for r in conn.execute(f"""
+                    SELECT event_tr.eventid, event_fts_tr.eventname, event_fts_tr.description, event_fts_tr.location
+                    FROM event_tr JOIN event_fts_tr ON event_fts_tr.rowid = event_tr.id
+                    WHERE event_tr.lang = ? AND event_tr.eventid IN ({marks})""", [lang, *page_ids])}
+        except sqlite3.OperationalError as e:
+            print(f"Search error for {match!r}: {e}")
+            return result
+
+        for eventid, score in ranked:
+            r = rows[eventid]
+            item = {
+                "eventid": eventid,
+                "eventname": r[1],
+                "location": r[3],
+                "category": r[4],
+                "eventstartdate": r[5],
+                "eventenddate": r[6],
+                "eventname_html": _highlight(r[1], terms),
+                "location_html": _highlight(r[3], terms),
+                "snippet_html": _snippet(r[2], terms),
+                "score": round(-score, 4),
+            }
+            t = translations.get(eventid)
+            if t:
+                item["translated"] = {
+                    "eventname": t[1],
+                    "location": t[3],
+                    "eventname_html": _highlight(t[1], terms),
+                    "location_html": _highlight(t[3], terms),
+                    "snippet_html": _snippet(t[2], terms),
+                }
+            result["results"].append(item)
+        result["took_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+
+event_search = EventSearchIndex(os.environ.get("SEARCH_DB", "search.db"))
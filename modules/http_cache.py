@@ -0,0 +1,49 @@
+import json
+import hashlib
+
+from starlette.responses import Response
+
+
+# --- Conditional GET helpers ---
+#
+# ETags are weak (W/"...") hashes of whatever the response is built from —
+# the DB row(s), the viewer's language and the session fields the template
+# reads — so a match can be answered with a 304 before any rendering.
+
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts):
+    raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return f'W/"{hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24]}"'
+
+
+def _opaque(tag):
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request, etag):
+    """Weak comparison against If-None-Match (RFC 9110 §13.1.2)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = _opaque(etag)
+    return any(_opaque(t) == wanted for t in header.split(","))
+
+
+def not_modified(etag, cache_control, vary=None):
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if vary:
+        headers["Vary"] = vary
+    return Response(status_code=304, headers=headers)
+
+
+def apply_cache_headers(response, etag, cache_control, vary=None):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    if vary:
+        response.headers["Vary"] = vary
+    return response
@@ -0,0 +1,97 @@
+import sqlite3
+
+
+# --- Local SQLite Backend ---
+#
+# Set LOCAL_DB=path/to/app.db to run the whole app against a local SQLite
+# file instead of SQLite Cloud (load tests, offline development). The schema
+# mirrors the tables the app uses; AUTOINCREMENT keeps sqlite_sequence, which
+# decline_event relies on. Connections are handed to the same pool as cloud
+# ones, so every query path behaves the same.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS userdetails (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    name TEXT,
+    email TEXT UNIQUE,
+    role TEXT DEFAULT 'user',
+    events TEXT,
+    likes TEXT
+);
+
+CREATE TABLE IF NOT EXISTS eventdetail (
+    eventid INTEGER PRIMARY KEY AUTOINCREMENT,
+    eventname TEXT,
+    email TEXT,
+    eventstarttime TEXT,
+    eventendtime TEXT,
+    eventstartdate TEXT,
+    eventenddate TEXT,
+    location TEXT,
+    category TEXT,
+    description TEXT,
+    username TEXT,
+    likes INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS eventdetail_name ON eventdetail(eventname);
+
+CREATE TABLE IF NOT EXISTS eventreq (
+    eventid INTEGER PRIMARY KEY AUTOINCREMENT,
+    eventname TEXT,
+    email TEXT,
+    eventstarttime TEXT,
+    eventendtime TEXT,
+    eventstartdate TEXT,
+    eventenddate TEXT,
+    location TEXT,
+    category TEXT,
+    description TEXT,
+    username TEXT
+);
+CREATE INDEX IF NOT EXISTS eventreq_name ON eventreq(eventname);
+
+CREATE TABLE IF NOT EXISTS endedevent (
+    eventid INTEGER,
+    eventname TEXT,
+    email TEXT,
+    eventstarttime TEXT,
+    eventendtime TEXT,
+    eventstartdate TEXT,
+    eventenddate TEXT,
+    location TEXT,
+    category TEXT,
+    description TEXT,
+    username TEXT,
+    likes INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS messages (
+    eventid INTEGER PRIMARY KEY,
+    msgs TEXT
+);
+
+CREATE TABLE IF NOT EXISTS messages2 (
+    eventid INTEGER PRIMARY KEY,
+    msgs TEXT
+);
+"""
+
+
+def connect_local(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def init_local_db(path):
+    """Create any missing tables. Safe to call from every worker."""
+    conn = connect_local(path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.commit()
+    finally:
+        conn.close()
@@ -1,6 +1,11 @@
 import os
 # import smtplib
 # import ssl
+import json
+import time
+import uuid
+import hashlib
+import sqlite3
 import threading
 
 import resend
@@ -10,6 +15,9 @@ import resend
 from .sendlog_model import sendlog
 
 
+MAIL_FROM = "SahyogSutra Support <support@sahyogsutra.run.place>"
+
+
 # def sendmailthread(receiver, subject, message):
 #     sender = "dipanshuashokagarwal@gmail.com"
 #     password = os.environ.get("MAIL_APP_PASS")
@@ -26,17 +34,337 @@ from .sendlog_model import sendlog
 #         sendlog(f"Email sent to {receiver}")
 
 def sendmailthread(receiver, subject, message, type="text"):
-
+    """Blocking single send straight to Resend — prefer sendmail(), which spools."""
     resend.api_key = os.environ.get("RESEND_API_KEY")
 
     r = resend.Emails.send({
-      "from": "SahyogSutra Support <support@sahyogsutra.run.place>",
+      "from": MAIL_FROM,
       "to": str(receiver),
       "subject": str(subject),
       type: f"{message}"
     })
 
 
-def sendmail(receiver, subject, message):
-    thread = threading.Thread(target=sendmailthread, args=(receiver, subject, message))
-    thread.start()
+# --- Durable Mail Spool ---
+#
+# Handlers only INSERT a row into a local SQLite outbox (mailspool.db) and
+# return. A small worker pool claims pending rows in batches and sends them
+# with Resend's batch endpoint (up to 100 per call). Failed rows are retried
+# with exponential backoff; rows survive restarts; an identical notification
+# that is still waiting to go out is not queued twice.
+#
+# Nothing is sent twice:
+#   • every request carries an idempotency key stored on its rows
+#     (batch_key). When the outcome is unknown (timeout, 5xx, crash), the same
+#     rows are retried together under the same key, so a batch the provider
+#     already accepted is not delivered again;
+#   • batches use permissive validation, so a bad address is reported for its
+#     own row while the rest go out. A batch refused outright (MailRejected —
+#     nothing was sent) is split and retried row by row, within half the
+#     stale-claim window; rows not reached are released untouched;
+#   • claims are done with one UPDATE, and every status change checks the
+#     claim token, so a worker whose claim went stale cannot overwrite the
+#     rows another worker has since claimed.
+
+MAIL_BATCH_MAX = 100           # Resend batch limit
+MAIL_MAX_ATTEMPTS = 6
+MAIL_STALE_CLAIM = 300         # seconds before a crashed worker's claim is released
+MAIL_SPLIT_PROBE = 3           # consecutive single-row failures that mean "provider down"
+
+
+class MailRejected(Exception):
+    """The provider refused the whole request — nothing was sent."""
+
+
+class ResendTransport:
+    """
+    send_batch(emails, idempotency_key) -> {index: error} for emails the
+    provider refused; raises MailRejected or, when the outcome is unknown,
+    any other exception.
+    """
+
+    def send_batch(self, emails, idempotency_key):
+        resend.api_key = os.environ.get("RESEND_API_KEY")
+        params = [{"from": MAIL_FROM, "to": e["receiver"], "subject": e["subject"], e["type"]: e["body"]} for e in emails]
+        try:
+            if len(params) == 1:
+                resend.Emails.send(params[0], {"idempotency_key": idempotency_key})
+                return {}
+            response = resend.Batch.send(params, {"idempotency_key": idempotency_key,
+                                                  "batch_validation": "permissive"})
+        except (resend.exceptions.ValidationError, resend.exceptions.MissingRequiredFieldsError) as e:
+            raise MailRejected(str(e)) from e
+        return {err["index"]: err["message"] for err in response.get("errors") or []}
+
+
+class FileSinkTransport:
+    """Local stand-in: appends every email as one JSON line to `path` (once per idempotency key)."""
+
+    def __init__(self, path="mail_sink.jsonl"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._keys = set()
+
+    def send_batch(self, emails, idempotency_key):
+        with self._lock:
+            if idempotency_key in self._keys:
+                return {}
+            with open(self.path, "a", encoding="utf-8") as f:
+                for e in emails:
+                    f.write(json.dumps({k: e[k] for k in ("receiver", "subject", "type", "body")},
+                                       ensure_ascii=False) + "\n")
+            self._keys.add(idempotency_key)
+        return {}
+
+
+class MailSpool:
+    def __init__(self, path, transport, workers=2, poll_interval=2.0, linger=0.25):
+        self.path = path
+        self.transport = transport
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.linger = linger
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self._init_schema()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        c = self._conn()
+        c.execute("""CREATE TABLE IF NOT EXISTS mail_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dedupe_key TEXT NOT NULL,
+            receiver TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            type TEXT NOT NULL DEFAULT 'text',
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            claim TEXT,
+            claimed_at REAL,
+            created_at REAL NOT NULL,
+            last_error TEXT,
+            batch_key TEXT
+        )""")
+        columns = {row[1] for row in c.execute("PRAGMA table_info(mail_outbox)")}
+        if "batch_key" not in columns:
+            c.execute("ALTER TABLE mail_outbox ADD COLUMN batch_key TEXT")
+        c.execute("""CREATE UNIQUE INDEX IF NOT EXISTS mail_outbox_dedupe
+                     ON mail_outbox(dedupe_key) WHERE status IN ('pending', 'sending')""")
+        c.execute("CREATE INDEX IF NOT EXISTS mail_outbox_due ON mail_outbox(status, next_attempt_at)")
+        c.execute("CREATE INDEX IF NOT EXISTS mail_outbox_claim ON mail_outbox(claim) WHERE claim IS NOT NULL")
+        c.execute("CREATE INDEX IF NOT EXISTS mail_outbox_batch ON mail_outbox(batch_key) WHERE batch_key IS NOT NULL")
+
+    # --- producer side ---
+
+    def enqueue(self, receiver, subject, message, type="text"):
+        """Queue one email. Returns False if an identical one is already waiting."""
+        receiver, subject, body = str(receiver), str(subject), f"{message}"
+        key = hashlib.sha1(f"{receiver}\0{subject}\0{type}\0{body}".encode("utf-8")).hexdigest()
+        now = time.time()
+        cur = self._conn().execute(
+            """INSERT OR IGNORE INTO mail_outbox(dedupe_key, receiver, subject, body, type, next_attempt_at, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (key, receiver, subject, body, type, now, now),
+        )
+        self.start()
+        self._wakeup.set()
+        return cur.rowcount == 1
+
+    # --- consumer side ---
+
+    def start(self):
+        if self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for i in range(self.workers):
+                t = threading.Thread(target=self._run, daemon=True, name=f"MailSpoolWorker-{i}")
+                t.start()
+                self._threads.append(t)
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        next_purge = 0.0
+        while not self._stop.is_set():
+            try:
+                if time.time() >= next_purge:
+                    next_purge = time.time() + 3600
+                    self.purge_sent()
+                if self.drain_once():
+                    continue
+            except Exception as e:
+                print(f"Mail spool error: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            # Let bursts (approval / expiry loops) land in the same batch
+            time.sleep(self.linger)
+
+    def _claim(self):
+        """Returns (token, rows) — an unfinished batch first, else up to MAIL_BATCH_MAX fresh rows."""
+        c = self._conn()
+        now = time.time()
+        token = uuid.uuid4().hex
+        c.execute(
+            "UPDATE mail_outbox SET status='pending', claim=NULL WHERE status='sending' AND claimed_at < ?",
+            (now - MAIL_STALE_CLAIM,),
+        )
+        # A batch whose outcome is unknown goes out again as-is, under the same key
+        cur = c.execute(
+            """UPDATE mail_outbox SET status='sending', claim=?, claimed_at=?
+               WHERE status='pending' AND batch_key = (
+                   SELECT batch_key FROM mail_outbox WHERE status='pending' AND batch_key IS NOT NULL
+                   AND next_attempt_at <= ? ORDER BY id LIMIT 1)""",
+            (token, now, now),
+        )
+        if cur.rowcount == 0:
+            c.execute(
+                """UPDATE mail_outbox SET status='sending', claim=?, claimed_at=?, batch_key=?
+                   WHERE id IN (SELECT id FROM mail_outbox WHERE status='pending' AND batch_key IS NULL
+                                AND next_attempt_at <= ? ORDER BY id LIMIT ?)""",
+                (token, now, f"batch-{token}", now, MAIL_BATCH_MAX),
+            )
+        return token, [dict(r) for r in c.execute("SELECT * FROM mail_outbox WHERE claim=? ORDER BY id", (token,))]
+
+    def _failed(self, rows, error, token, keep_key=False):
+        """
+        Back off `rows` (one shared attempt count, so a batch kept together for
+        its idempotency key also gives up together). keep_key=True when the
+        provider may have accepted them.
+        """
+        c = self._conn()
+        ids = [r["id"] for r in rows]
+        marks = ",".join("?" * len(ids))
+        attempts = max(r["attempts"] for r in rows) + 1
+        batch_key = "batch_key" if keep_key else "NULL"
+        if attempts >= MAIL_MAX_ATTEMPTS:
+            cur = c.execute(f"""UPDATE mail_outbox SET status='failed', attempts=?, last_error=?, claim=NULL,
+                                batch_key=NULL WHERE claim=? AND id IN ({marks})""",
+                            (attempts, str(error), token, *ids))
+            self.failed += cur.rowcount
+            for r in rows:
+                sendlog(f"#MailFailed \nGave up sending '{r['subject']}' to {r['receiver']}: {error}")
+        else:
+            c.execute(f"""UPDATE mail_outbox SET status='pending', attempts=?, last_error=?, claim=NULL,
+                          batch_key={batch_key}, next_attempt_at=? WHERE claim=? AND id IN ({marks})""",
+                      (attempts, str(error), time.time() + min(10 * 2 ** attempts, 3600), token, *ids))
+
+    def _sent(self, rows, token):
+        ids = [e["id"] for e in rows]
+        cur = self._conn().execute(
+            f"""UPDATE mail_outbox SET status='sent', claim=NULL, batch_key=NULL
+                WHERE claim=? AND id IN ({','.join('?' * len(ids))})""", (token, *ids))
+        self.sent += cur.rowcount
+
+    def _release(self, rows, token):
+        """Hand rows back untouched (never sent, not their fault)."""
+        ids = [e["id"] for e in rows]
+        self._conn().execute(
+            f"""UPDATE mail_outbox SET status='pending', claim=NULL, batch_key=NULL
+                WHERE claim=? AND id IN ({','.join('?' * len(ids))})""", (token, *ids))
+
+    def _send(self, rows, key):
+        """One provider request. Returns (rejected {row index: error}, None) or (None, exception)."""
+        try:
+            return self.transport.send_batch(rows, key), None
+        except Exception as e:
+            return None, e
+
+    def drain_once(self):
+        """Claim and send one batch. Returns the number of rows processed."""
+        token, batch = self._claim()
+        if not batch:
+            return 0
+        started = time.monotonic()
+        rejected, error = self._send(batch, batch[0]["batch_key"])
+        if error is None:
+            self._settle(batch, rejected, token)
+        elif not isinstance(error, MailRejected):
+            print(f"Mail batch of {len(batch)} failed, will retry with the same key: {error}")
+            self._failed(batch, error, token, keep_key=True)
+        elif len(batch) == 1:
+            self._failed(batch, error, token)
+        else:
+            print(f"Mail batch of {len(batch)} rejected, sending row by row: {error}")
+            self._send_one_by_one(batch, token, started)
+        return len(batch)
+
+    def _settle(self, rows, rejected, token):
+        """Request accepted: rows the provider refused back off, the rest are sent."""
+        for i, error in rejected.items():
+            self._failed([rows[i]], error, token)
+        accepted = [row for i, row in enumerate(rows) if i not in rejected]
+        if accepted:
+            self._sent(accepted, token)
+
+    def _send_one_by_one(self, batch, token, started):
+        """After the provider refused a whole batch (nothing sent): isolate the bad rows."""
+        streak = 0
+        for n, row in enumerate(batch):
+            if time.monotonic() - started > MAIL_STALE_CLAIM / 2:
+                # Finish well before another worker may take over this claim
+                self._release(batch[n:], token)
+                return
+            if streak >= MAIL_SPLIT_PROBE and streak == n:
+                # Every row tried so far failed on its own — the provider is down, not the rows
+                self._failed(batch[n:], error, token)
+                return
+            key = f"row-{row['id']}-{token}"
+            self._conn().execute("UPDATE mail_outbox SET batch_key=? WHERE id=? AND claim=?", (key, row["id"], token))
+            rejected, error = self._send([row], key)
+            if error is None:
+                self._settle([row], rejected, token)
+            else:
+                streak += 1
+                self._failed([row], error, token, keep_key=not isinstance(error, MailRejected))
+
+    def purge_sent(self, older_than=7 * 86400):
+        self._conn().execute("DELETE FROM mail_outbox WHERE status='sent' AND created_at < ?", (time.time() - older_than,))
+
+    def stats(self):
+        counts = {r["status"]: r["n"] for r in self._conn().execute(
+            "SELECT status, COUNT(*) AS n FROM mail_outbox GROUP BY status")}
+        return {"pending": counts.get("pending", 0), "sending": counts.get("sending", 0),
+                "failed_total": counts.get("failed", 0), "sent": self.sent, "failed": self.failed}
+
+
+def _default_transport():
+    if os.environ.get("MAIL_TRANSPORT") == "file":
+        return FileSinkTransport(os.environ.get("MAIL_SINK", "mail_sink.jsonl"))
+    return ResendTransport()
+
+
+mail_spool = MailSpool(
+    os.environ.get("MAIL_SPOOL_DB", "mailspool.db"),
+    _default_transport(),
+    workers=int(os.environ.get("MAIL_WORKERS", "2")),
+)
+
+
+def sendmail(receiver, subject, message, type="text"):
+    """Spool an email for background delivery — never blocks on the provider."""
+    mail_spool.enqueue(receiver, subject, message, type=type)
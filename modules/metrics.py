@@ -0,0 +1,189 @@
+import time
+import threading
+from bisect import bisect_left
+
+
+# --- Metrics (Prometheus text format) ---
+#
+# A deliberately small registry — no extra dependency — rendered by GET
+# /metrics in the Prometheus text exposition format. Hot paths only do a dict
+# lookup and a few integer adds under a short lock; everything that can be
+# read from existing state (pool sizes, queue depths, cache stats) is
+# collected by callbacks at scrape time instead of being tracked per request.
+# Each worker process reports its own numbers.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    esc = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, esc)) + "}"
+
+
+def _num(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _labels(self.labelnames, k), v) for k, v in items]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values: dict = {}   # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[i] += 1
+            row[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        out = []
+        for labels, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), row[:-1]):
+                cumulative += count
+                out.append((f"{self.name}_bucket",
+                            _labels(self.labelnames + ("le",), labels + (_num(bound),)), cumulative))
+            out.append((f"{self.name}_count", _labels(self.labelnames, labels), cumulative))
+            out.append((f"{self.name}_sum", _labels(self.labelnames, labels), round(row[-1], 6)))
+        return out
+
+
+class GaugeCallback:
+    """Gauge read at scrape time. fn() returns a number or {label_tuple: number}."""
+    kind = "gauge"
+
+    def __init__(self, name, help, fn, labelnames=()):
+        self.name, self.help, self.fn, self.labelnames = name, help, fn, tuple(labelnames)
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception as e:
+            print(f"Metric {self.name} failed: {e}")
+            return []
+        if isinstance(value, dict):
+            return [(self.name, _labels(self.labelnames, k if isinstance(k, tuple) else (k,)), v)
+                    for k, v in value.items()]
+        return [(self.name, "", value)]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name, help, fn, labelnames=()):
+        return self._add(GaugeCallback(name, help, fn, labelnames))
+
+    def render(self):
+        lines = []
+        for m in self._metrics:
+            samples = m.samples()
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{labels} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+HTTP_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "Time to the end of the response body, per route.",
+    ("method", "route", "status"))
+DB_POOL_WAIT = metrics.histogram(
+    "db_pool_acquire_seconds", "Time spent borrowing a DB connection from the pool.")
+SIO_EMITS = metrics.counter(
+    "socketio_emits_total", "Socket.IO emits, per event.", ("event",))
+SIO_FANOUT = metrics.counter(
+    "socketio_fanout_messages_total", "Socket.IO messages delivered (one per recipient), per event.", ("event",))
+
+
+class MetricsMiddleware:
+    """Per-route latency. Routes are labelled by their template (/event/{eventid}), never the raw path."""
+
+    def __init__(self, app, histogram=HTTP_LATENCY):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                label = getattr(route, "path", "<unknown>")
+            else:
+                label = scope.get("root_path") or "<unmatched>"   # mounts (/static) or 404s
+            self.histogram.observe(time.perf_counter() - started, scope["method"], label, str(status))
+
+
+def instrument_socketio(sio, namespace="/"):
+    """Count emits and their fan-out, and expose the live connection count."""
+    emit = sio.emit
+
+    async def counted_emit(event, data=None, to=None, room=None, skip_sid=None, namespace=None, **kwargs):
+        ns = namespace or "/"
+        recipients = len(sio.manager.rooms.get(ns, {}).get(to or room, ()))
+        SIO_EMITS.inc(event)
+        SIO_FANOUT.inc(event, amount=recipients)
+        return await emit(event, data, to=to, room=room, skip_sid=skip_sid, namespace=namespace, **kwargs)
+
+    sio.emit = counted_emit
+    metrics.gauge("socketio_connections", "Connected Socket.IO clients.",
+                  lambda: len(sio.manager.rooms.get(namespace, {}).get(None, ())))
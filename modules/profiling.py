@@ -0,0 +1,208 @@
+import io
+import re
+import sys
+import time
+import pstats
+import marshal
+import cProfile
+import threading
+from collections import Counter
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+
+# --- On-Demand Profiling ---
+#
+# Admins can profile a single request by sending "X-Profile: <mode>" or
+# adding "?_profile=<mode>"; the page itself is discarded and the profile is
+# returned as a download instead:
+#   cprofile   pstats file (open with `python -m pstats` or snakeviz)
+#   text       top functions by cumulative time, plain text
+#   collapsed  sampled stacks of every thread, one "a;b;c count" line per
+#              stack — feed to flamegraph.pl / speedscope
+# cProfile only sees the event-loop thread, so DB calls show up as awaits;
+# the sampler also covers executor threads (DB round-trips, translations).
+# Only one profile runs at a time — others are served normally.
+# cProfile records everything the shared event loop runs while it is on, not
+# just this request's coroutines, and the collapsed sampler labels stacks by
+# thread name only, so every mode refuses (409) while any other HTTP request
+# is in flight, and X-Profile-Overlapping says how many started while it ran
+# (0 = clean). Socket.IO traffic is not counted.
+#
+# StackSampler can also run on its own for a fixed window (see the
+# /admin/profile/sampler endpoints) to catch problems that don't reproduce
+# on demand.
+
+PROFILE_MODES = ("cprofile", "text", "collapsed")
+REQUEST_SAMPLE_INTERVAL = 0.002
+_THREAD_SUFFIX = re.compile(r"[_-]\d+$")
+
+
+def _frame_label(code):
+    module = code.co_filename.rsplit("/", 1)[-1].rsplit("\\", 1)[-1]
+    return f"{code.co_name} ({module}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples sys._current_frames() every `interval` seconds into collapsed stacks."""
+
+    def __init__(self, interval=0.01, max_stacks=20000):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+        self.deadline = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration=None):
+        self._stop.clear()
+        self.started_at = time.time()
+        self.stopped_at = None
+        self.deadline = time.monotonic() + duration if duration else None
+        self._thread = threading.Thread(target=self._run, name="StackSampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        if self.stopped_at is None:
+            self.stopped_at = time.time()
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:   # sample first, so even a very short request gets one
+            names = {t.ident: _THREAD_SUFFIX.sub("", t.name) for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                parts = []
+                while frame is not None:
+                    parts.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                parts.append(names.get(ident, "thread"))
+                key = ";".join(reversed(parts))
+                if key in self.stacks or len(self.stacks) < self.max_stacks:
+                    self.stacks[key] += 1
+            self.samples += 1
+            if self._stop.wait(self.interval):
+                break
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                break
+        self.stopped_at = time.time()
+
+    def collapsed(self):
+        stacks = dict(self.stacks)   # the sampler thread may still be adding
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items(), key=lambda kv: -kv[1]))
+
+    def status(self):
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "distinct_stacks": len(self.stacks),
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+        }
+
+
+def _requested_mode(scope):
+    mode = Headers(scope=scope).get("x-profile")
+    if not mode and scope.get("query_string"):
+        mode = parse_qs(scope["query_string"].decode("latin-1")).get("_profile", [None])[0]
+    return mode.lower() if mode else None
+
+
+class ProfilingMiddleware:
+    """Must sit inside the session middleware — it checks request.session['role']."""
+
+    def __init__(self, app, admin_role="admin"):
+        self.app = app
+        self.admin_role = admin_role
+        self._busy = threading.Lock()
+        self.in_flight = 0   # HTTP requests currently inside this middleware
+        self.started = 0     # HTTP requests ever started, to spot overlap with a profile
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        self.in_flight += 1
+        self.started += 1
+        try:
+            await self._handle(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def _handle(self, scope, receive, send):
+        mode = _requested_mode(scope)
+        if mode not in PROFILE_MODES or scope.get("session", {}).get("role") != self.admin_role:
+            await self.app(scope, receive, send)
+            return
+        if self.in_flight > 1:
+            others = self.in_flight - 1
+            response = Response(f"{others} other request(s) in flight; their work would be mixed "
+                                f"into this profile. Retry when idle.\n",
+                                status_code=409, media_type="text/plain", headers={"Cache-Control": "no-store"})
+            await response(scope, receive, send)
+            return
+        if not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        status = 0
+
+        async def discard(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        profiler = sampler = None
+        started = time.perf_counter()
+        first_other = self.started + 1
+        try:
+            if mode == "collapsed":
+                sampler = StackSampler(interval=REQUEST_SAMPLE_INTERVAL).start()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                if sampler is not None:
+                    sampler.stop()
+        finally:
+            self._busy.release()
+        wall_ms = (time.perf_counter() - started) * 1000
+        overlapping = self.started - first_other + 1
+
+        slug = scope["path"].strip("/").replace("/", "_") or "home"
+        headers = {"X-Profile-Wall-Ms": f"{wall_ms:.1f}", "X-Profile-Status": str(status),
+                   "X-Profile-Overlapping": str(overlapping), "Cache-Control": "no-store"}
+        if mode == "cprofile":
+            profiler.create_stats()
+            headers["Content-Disposition"] = f'attachment; filename="{slug}.prof"'
+            response = Response(marshal.dumps(profiler.stats), media_type="application/octet-stream", headers=headers)
+        elif mode == "text":
+            out = io.StringIO()
+            if overlapping:
+                out.write(f"WARNING: {overlapping} other request(s) ran during this profile; "
+                          f"their coroutines are included below.\n\n")
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(60)
+            response = Response(out.getvalue(), media_type="text/plain", headers=headers)
+        else:
+            headers["Content-Disposition"] = f'attachment; filename="{slug}.collapsed.txt"'
+            response = Response(sampler.collapsed(), media_type="text/plain", headers=headers)
+        await response(scope, receive, send)
@@ -0,0 +1,167 @@
+import os
+import re
+import sys
+import time
+import threading
+from collections import deque
+from functools import lru_cache
+
+
+# --- Query Timing & Slow-Query Log ---
+#
+# Every cursor handed out by the pool is wrapped in a TimedCursor, so
+# run_query, AsyncDB, @sqldb and the raw cursors passed to modules/add_event.py
+# and modules/delete_event.py are all measured in one place. Per statement
+# fingerprint (literals replaced by ?) we keep call count, total / max time,
+# rows and the busiest call sites; statements slower than SLOW_QUERY_MS also
+# go to a bounded ring buffer (SLOW_QUERY_LOG_SIZE entries).
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG_SIZE = int(os.environ.get("SLOW_QUERY_LOG_SIZE", "200"))
+_MAX_FINGERPRINTS = 2000
+_MAX_SITES = 5
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """Normalised statement text: literals -> ?, IN lists collapsed, whitespace squashed."""
+    fp = _STRING.sub("?", sql)
+    fp = _NUMBER.sub("?", fp)
+    fp = _IN_LIST.sub("(?+)", fp)
+    return _SPACES.sub(" ", fp).strip()[:300]
+
+
+def call_site(depth=2):
+    """'file.py:line function' for the frame `depth` levels above this call."""
+    try:
+        f = sys._getframe(depth)
+    except ValueError:
+        return "?"
+    return f"{os.path.basename(f.f_code.co_filename)}:{f.f_lineno} {f.f_code.co_name}"
+
+
+class QueryLog:
+    def __init__(self, slow_ms=SLOW_QUERY_MS, slow_size=SLOW_QUERY_LOG_SIZE):
+        self.slow_ms = slow_ms
+        self.slow = deque(maxlen=slow_size)
+        self._stats: dict = {}   # fingerprint -> [calls, total_s, max_s, rows, {site: calls}]
+        self._lock = threading.Lock()
+
+    def record(self, sql, seconds, rows, site):
+        fp = fingerprint(sql)
+        with self._lock:
+            entry = self._stats.get(fp)
+            if entry is None:
+                if len(self._stats) >= _MAX_FINGERPRINTS:
+                    return   # runaway dynamic SQL — keep the existing picture
+                entry = self._stats[fp] = [0, 0.0, 0.0, 0, {}]
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+            if rows and rows > 0:
+                entry[3] += rows
+            sites = entry[4]
+            if site in sites or len(sites) < _MAX_SITES:
+                sites[site] = sites.get(site, 0) + 1
+        if seconds * 1000 >= self.slow_ms:
+            self.slow.append({"at": time.time(), "ms": round(seconds * 1000, 2),
+                              "rows": rows if rows is not None and rows >= 0 else None,
+                              "site": site, "sql": fp})
+
+    def add_rows(self, sql, rows):
+        with self._lock:
+            entry = self._stats.get(fingerprint(sql))
+            if entry is not None:
+                entry[3] += rows
+
+    def top(self, n=20, by="total"):
+        index = {"total": 1, "calls": 0, "max": 2, "rows": 3}[by]
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda kv: kv[1][index], reverse=True)[:n]
+            return [{
+                "sql": fp,
+                "calls": e[0],
+                "total_ms": round(e[1] * 1000, 2),
+                "avg_ms": round(e[1] * 1000 / e[0], 2),
+                "max_ms": round(e[2] * 1000, 2),
+                "rows": e[3],
+                "sites": dict(sorted(e[4].items(), key=lambda kv: kv[1], reverse=True)),
+            } for fp, e in items]
+
+    def slowest(self, n=50):
+        return list(self.slow)[-n:][::-1]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.slow.clear()
+
+
+query_log = QueryLog()
+
+
+class TimedCursor:
+    """
+    Transparent cursor proxy. execute()/executemany() are timed; `site` lets
+    async wrappers pass the real caller, since the statement itself runs on
+    an executor thread whose stack no longer shows it.
+    """
+
+    def __init__(self, cursor, log=query_log):
+        self._cursor = cursor
+        self._log = log
+        self._last_sql = None
+        self._count_fetched = False
+
+    def execute(self, sql, parameters=(), site=None):
+        started = time.perf_counter()
+        try:
+            self._cursor.execute(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - started
+            rows = getattr(self._cursor, "rowcount", -1)
+            # Local sqlite3 reports -1 for SELECT until rows are fetched; count them on fetch
+            self._count_fetched = rows is None or rows < 0
+            self._last_sql = sql
+            self._log.record(sql, elapsed, rows, site or call_site())
+        return self
+
+    def executemany(self, sql, seq_of_parameters, site=None):
+        started = time.perf_counter()
+        try:
+            self._cursor.executemany(sql, seq_of_parameters)
+        finally:
+            self._count_fetched = False
+            self._log.record(sql, time.perf_counter() - started,
+                             getattr(self._cursor, "rowcount", -1), site or call_site())
+        return self
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if self._count_fetched and row is not None:
+            self._log.add_rows(self._last_sql, 1)
+        return row
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        if self._count_fetched and rows:
+            self._log.add_rows(self._last_sql, len(rows))
+        return rows
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        if self._count_fetched and rows:
+            self._log.add_rows(self._last_sql, len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
@@ -0,0 +1,195 @@
+import math
+import time
+import sqlite3
+import threading
+from dataclasses import dataclass
+
+
+# --- Rate Limiter ---
+#
+# Token buckets keyed by "<policy>:<identity>", one policy per route:
+#   • hit() is O(1) — one dict lookup and a little arithmetic.
+#   • Idle buckets are expired through a timing wheel: every check advances
+#     the wheel by the ticks elapsed since the last one and only looks at the
+#     keys due in those slots, so there is never a full scan of the store.
+#   • A single short lock makes it safe from executor threads and the event
+#     loop alike (the critical section never awaits).
+#
+# The storage is pluggable: MemoryRateLimitBackend for a single process,
+# SQLiteRateLimitBackend when every worker on the host (and the next restart)
+# must see the same buckets. Anything with hit(key, policy, now) works.
+
+
+@dataclass(frozen=True)
+class RatePolicy:
+    name: str
+    limit: int                 # requests allowed per window (bucket capacity)
+    window: float              # seconds to refill a full bucket
+    identity: str = "ip"       # "ip" or "user" (session username, falls back to ip)
+    message: str = "Please wait {wait} seconds before trying again."
+    json: bool = False         # reply {"wait": n} instead of plain text
+
+    @property
+    def rate(self):
+        return self.limit / self.window
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, policy: RatePolicy, retry_after: int):
+        super().__init__(policy.message.format(wait=retry_after))
+        self.policy = policy
+        self.retry_after = retry_after
+
+
+class TimingWheel:
+    """Hashed timing wheel: `slots` buckets of `tick` seconds each."""
+
+    def __init__(self, slots=512, tick=1.0):
+        self._slots = [set() for _ in range(slots)]
+        self._tick = tick
+        self._current = None
+
+    def schedule(self, key, when):
+        self._slots[int(when // self._tick) % len(self._slots)].add(key)
+
+    def advance(self, now):
+        """Return every key scheduled in the ticks that fully elapsed since the last call."""
+        t_now = int(now // self._tick)
+        if self._current is None:
+            self._current = t_now
+            return []
+        due = []
+        steps = min(t_now - self._current, len(self._slots))
+        for i in range(steps):
+            slot = self._slots[(self._current + i) % len(self._slots)]
+            if slot:
+                due.extend(slot)
+                slot.clear()
+        self._current = max(self._current, t_now)
+        return due
+
+
+class MemoryRateLimitBackend:
+    """In-process token buckets: {key: [tokens, last_refill, full_at]}."""
+
+    def __init__(self):
+        self._buckets: dict = {}
+        self._wheel = TimingWheel()
+        self._lock = threading.Lock()
+
+    def hit(self, key, policy: RatePolicy, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._expire(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = float(policy.limit)
+            else:
+                tokens = min(policy.limit, bucket[0] + (now - bucket[1]) * policy.rate)
+
+            if tokens < 1:
+                self._buckets[key] = [tokens, now, bucket[2]]
+                return False, max(1, math.ceil((1 - tokens) / policy.rate))
+
+            tokens -= 1
+            full_at = now + (policy.limit - tokens) / policy.rate
+            self._buckets[key] = [tokens, now, full_at]
+            self._wheel.schedule(key, full_at)
+            return True, 0
+
+    def _expire(self, now):
+        for key in self._wheel.advance(now):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                continue
+            if bucket[2] <= now:
+                del self._buckets[key]
+            else:
+                self._wheel.schedule(key, bucket[2])
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteRateLimitBackend:
+    """
+    Token buckets in a WAL-mode SQLite file shared by all local workers.
+    Each hit is one BEGIN IMMEDIATE read-modify-write, so concurrent workers
+    can never both spend the last token. Expired rows are swept in bulk every
+    `sweep_every` seconds instead of on each request.
+    """
+
+    def __init__(self, path, sweep_every=60):
+        self.path = path
+        self._local = threading.local()
+        self._sweep_every = sweep_every
+        self._next_sweep = 0.0
+        self._conn().execute("""CREATE TABLE IF NOT EXISTS rate_limits (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            ts REAL NOT NULL,
+            full_at REAL NOT NULL
+        ) WITHOUT ROWID""")
+        self._conn().execute("CREATE INDEX IF NOT EXISTS rate_limits_full_at ON rate_limits(full_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key, policy: RatePolicy, now=None):
+        now = time.time() if now is None else now
+        conn = self._conn()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self._sweep_every
+            conn.execute("DELETE FROM rate_limits WHERE full_at <= ?", (now,))
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, ts, full_at FROM rate_limits WHERE key=?", (key,)).fetchone()
+            if row is None:
+                tokens = float(policy.limit)
+            else:
+                tokens = min(policy.limit, row[0] + (now - row[1]) * policy.rate)
+
+            if tokens < 1:
+                conn.execute("UPDATE rate_limits SET tokens=?, ts=? WHERE key=?", (tokens, now, key))
+                conn.execute("COMMIT")
+                return False, max(1, math.ceil((1 - tokens) / policy.rate))
+
+            tokens -= 1
+            full_at = now + (policy.limit - tokens) / policy.rate
+            conn.execute(
+                """INSERT INTO rate_limits(key, tokens, ts, full_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(key) DO UPDATE SET tokens=excluded.tokens, ts=excluded.ts, full_at=excluded.full_at""",
+                (key, tokens, now, full_at),
+            )
+            conn.execute("COMMIT")
+            return True, 0
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+
+class RateLimiter:
+    def __init__(self, policies, backend=None):
+        self.policies = {p.name: p for p in policies}
+        self.backend = backend if backend is not None else MemoryRateLimitBackend()
+
+    def check(self, policy_name, identity):
+        """Returns (is_allowed, retry_after_seconds) and records the hit if allowed."""
+        policy = self.policies[policy_name]
+        return self.backend.hit(f"{policy.name}:{identity}", policy)
+
+    def enforce(self, policy_name, identity):
+        allowed, wait = self.check(policy_name, identity)
+        if not allowed:
+            raise RateLimitExceeded(self.policies[policy_name], wait)
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import threading
+
+from .http_cache import make_etag
+
+
+# --- Reference Data Registry ---
+#
+# events.json (category -> event types) and quotes.json are read once and
+# re-parsed only when the file's mtime or size changes (checked at most once
+# per CHECK_INTERVAL). Derived lookups are rebuilt together with the data, so
+# readers always see a consistent snapshot:
+#   • categories          {category: [subcategory, ...]}
+#   • parent_of           {subcategory: category}  (what an event's "category" column holds)
+#   • order               {subcategory: position}  for grouping in events.json order
+#   • quotes per language {quote_key: text}, falling back to English
+
+CHECK_INTERVAL = 1.0
+
+
+class ReferenceFile:
+    """One JSON file plus whatever `build(data)` derives from it."""
+
+    def __init__(self, path, build=None):
+        self.path = path
+        self._build = build or (lambda data: {})
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._next_check = 0.0
+        self.data = None
+        self.derived = {}
+        self.etag = None
+        self.loads = 0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self.data is not None and now < self._next_check:
+            return
+        with self._lock:
+            if self.data is not None and now < self._next_check:
+                return
+            try:
+                st = os.stat(self.path)
+                stamp = (st.st_mtime_ns, st.st_size)
+            except OSError as e:
+                print(f"Reference file {self.path} unavailable: {e}")
+                stamp = None
+            if stamp != self._stamp or self.data is None:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    derived = self._build(data)
+                except (OSError, ValueError) as e:
+                    # Keep serving the last good copy (or empty data on first load)
+                    print(f"Reference file {self.path} reload failed: {e}")
+                    if self.data is None:
+                        self.data, self.derived, self.etag = {}, self._build({}), make_etag(self.path, None)
+                else:
+                    self.data, self.derived = data, derived
+                    self.etag = make_etag(self.path, stamp)
+                    self.loads += 1
+                self._stamp = stamp
+            self._next_check = now + CHECK_INTERVAL
+
+    def get(self):
+        self._refresh()
+        return self.data
+
+
+def _index_categories(data):
+    parent_of, order = {}, {}
+    for category, subs in data.items():
+        for sub in subs:
+            parent_of.setdefault(sub, category)
+            order.setdefault(sub, len(order))
+    return {"parent_of": parent_of, "order": order}
+
+
+def _index_quotes(data):
+    langs = {lang for texts in data.values() for lang in texts}
+    by_lang = {
+        lang: {key: texts.get(lang) or texts.get("en", "") for key, texts in data.items()}
+        for lang in langs | {"en"}
+    }
+    return {"by_lang": by_lang}
+
+
+class ReferenceRegistry:
+    def __init__(self, events_path="events.json", quotes_path="static/quotes.json"):
+        self.events = ReferenceFile(events_path, _index_categories)
+        self.quotes = ReferenceFile(quotes_path, _index_quotes)
+
+    def categories(self):
+        return self.events.get()
+
+    def parent_of(self, subcategory):
+        self.events.get()
+        return self.events.derived["parent_of"].get(subcategory)
+
+    def category_sort_key(self, subcategory):
+        """Sort key that groups event types under their category, in events.json order."""
+        self.events.get()
+        order = self.events.derived["order"]
+        return (order.get(subcategory, len(order)), subcategory)
+
+    def categories_payload(self):
+        """(payload, etag) for /api/categories."""
+        data = self.events.get()
+        return {"categories": data, "subcategory_to_category": self.events.derived["parent_of"]}, self.events.etag
+
+    def quotes_for(self, lang):
+        """(quotes in `lang`, etag) — unknown languages get the English set."""
+        self.quotes.get()
+        by_lang = self.quotes.derived["by_lang"]
+        if lang not in by_lang:
+            lang = "en"
+        return by_lang[lang], make_etag(self.quotes.etag, lang)
+
+
+reference_data = ReferenceRegistry()
@@ -1,18 +1,171 @@
 import zoneinfo
 import threading
-import requests
 import datetime
+import queue
+import time
 import os
+from collections import deque
+
+import httpx
 
 
 ist = zoneinfo.ZoneInfo("Asia/Kolkata")
 
+# --- Telegram Log Outbox ---
+#
+# sendlog() never does network I/O: it drops the line into a bounded queue
+# and returns. One daemon worker drains the queue, coalesces every line that
+# arrived within TG_LOG_INTERVAL seconds into a single Telegram message and
+# sends it over one pooled HTTP client, retrying with backoff (and honouring
+# Telegram's retry_after on 429). When the queue is full new lines are
+# dropped and counted instead of piling up threads.
+
+TG_CHAT_ID = "-1002945250812"
+TG_MAX_MESSAGE = 4000          # Telegram hard limit is 4096 chars
+LOG_QUEUE_MAX = int(os.environ.get("TG_LOG_QUEUE_MAX", "1000"))
+LOG_INTERVAL = float(os.environ.get("TG_LOG_INTERVAL", "2"))
+LOG_RETRIES = 4
+STUB_KEEP = int(os.environ.get("TG_STUB_KEEP", "200"))
+SEPARATOR = "\nㅤㅤㅤ\n"
+
+
+class TelegramTransport:
+    """Sends one message with a shared, keep-alive httpx client."""
+
+    def __init__(self, token):
+        self._link = f"https://api.telegram.org/bot{token}/sendMessage"
+        self._client = httpx.Client(timeout=10.0)
+
+    def send(self, text):
+        """Returns None on success or the number of seconds to wait before retrying."""
+        r = self._client.post(self._link, data={"chat_id": TG_CHAT_ID, "text": text})
+        if r.status_code == 429:
+            try:
+                return float(r.json().get("parameters", {}).get("retry_after", 5))
+            except Exception:
+                return 5.0
+        r.raise_for_status()
+        return None
+
+
+class StubTransport:
+    """Local stand-in: keeps the last `keep` messages in memory (used when TGBOTTOKEN is unset and in tests)."""
+
+    def __init__(self, keep=STUB_KEEP):
+        self.sent = deque(maxlen=keep)
+
+    def send(self, text):
+        self.sent.append(text)
+        return None
+
+
+class LogOutbox:
+    def __init__(self, transport, maxsize=LOG_QUEUE_MAX, interval=LOG_INTERVAL):
+        self.transport = transport
+        self.interval = interval
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+
+    def put(self, line):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {"queued": self.qsize(), "dropped": self.dropped, "sent": self.sent, "failed": self.failed}
+
+    def flush(self, timeout=5.0):
+        """Block until the queue has been drained (used on shutdown)."""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True, name="TelegramLogOutbox")
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Coalesce everything that arrives within the interval into one message
+            deadline = time.time() + self.interval
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                for text in _chunk(batch):
+                    self._send_with_retry(text)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _send_with_retry(self, text):
+        delay = 1.0
+        for attempt in range(LOG_RETRIES):
+            try:
+                wait = self.transport.send(text)
+                if wait is None:
+                    self.sent += 1
+                    return
+                delay = max(delay, wait)
+            except Exception as e:
+                print(f"Telegram log error (attempt {attempt + 1}): {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, 30)
+        self.failed += 1
+
+
+def _chunk(lines):
+    """Join lines into as few messages as fit under Telegram's size limit."""
+    chunks, current = [], ""
+    for line in lines:
+        line = line[:TG_MAX_MESSAGE]
+        candidate = f"{current}{SEPARATOR}{line}" if current else line
+        if len(candidate) > TG_MAX_MESSAGE:
+            chunks.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return [f"ㅤㅤㅤ\n{c}\nㅤㅤㅤ" for c in chunks]
+
+
+def _format(message):
+    return f'🗓️ {datetime.datetime.now(ist).strftime("%Y-%m-%d %H:%M:%S")}\n{message}'
+
+
+def _default_transport():
+    token = os.environ.get("TGBOTTOKEN")
+    if not token or os.environ.get("TG_TRANSPORT") == "stub":
+        return StubTransport()
+    return TelegramTransport(token)
+
+
+log_outbox = LogOutbox(_default_transport())
+
 
 def sendlogthread(message):
-    link = f"https://api.telegram.org/bot{os.environ.get('TGBOTTOKEN')}/sendMessage"
-    parameters = {"chat_id": "-1002945250812", "text": f'ㅤㅤㅤ\n🗓️ {datetime.datetime.now(ist).strftime("%Y-%m-%d %H:%M:%S")}\n{message}\nㅤㅤㅤ'}
-    requests.get(link, params=parameters)
+    """Send one log line immediately (blocking) — bypasses the outbox."""
+    log_outbox.transport.send(f"ㅤㅤㅤ\n{_format(message)}\nㅤㅤㅤ")
 
 def sendlog(message):
-    thread = threading.Thread(target=sendlogthread, args=(message,))
-    thread.start()
+    log_outbox.put(_format(message))
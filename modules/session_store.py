@@ -0,0 +1,226 @@
+import json
+import time
+import secrets
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+
+from itsdangerous import Signer, BadSignature
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+
+
+# --- Server-Side Sessions ---
+#
+# The browser only holds a short signed session ID ("sid" cookie). The data
+# lives in a backend (in-memory for a single process, a local SQLite file when
+# several workers must share it / survive restarts). request.session keeps
+# working as before, but:
+#   • nothing is loaded until a handler actually touches request.session
+#     (static files and most API calls never do),
+#   • the backend is written — and Set-Cookie sent — only when the session
+#     changed, or once it is halfway to expiry.
+# Handlers call request.session.regenerate() whenever the user or role
+# changes (login, signup, logout, role refresh), so an ID handed out to an
+# anonymous visitor can never be ridden into their logged-in session.
+
+SESSION_MAX_AGE = 14 * 24 * 3600
+
+
+class MemorySessionBackend:
+    def __init__(self):
+        self._data: dict = {}
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def load(self, sid):
+        entry = self._data.get(sid)
+        if entry is None or entry[0] < time.time():
+            return None
+        return dict(entry[1]), entry[0]
+
+    def save(self, sid, data, max_age):
+        now = time.time()
+        with self._lock:
+            self._data[sid] = (now + max_age, dict(data))
+            if now >= self._next_sweep:
+                self._next_sweep = now + 600
+                for k in [k for k, v in self._data.items() if v[0] < now]:
+                    del self._data[k]
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteSessionBackend:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._next_sweep = 0.0
+        self._conn().execute("""CREATE TABLE IF NOT EXISTS sessions (
+            sid TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID""")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid):
+        row = self._conn().execute(
+            "SELECT data, expires_at FROM sessions WHERE sid=? AND expires_at > ?", (sid, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def save(self, sid, data, max_age):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            """INSERT INTO sessions(sid, data, expires_at) VALUES (?, ?, ?)
+               ON CONFLICT(sid) DO UPDATE SET data=excluded.data, expires_at=excluded.expires_at""",
+            (sid, json.dumps(data, ensure_ascii=False), now + max_age),
+        )
+        if now >= self._next_sweep:
+            self._next_sweep = now + 600
+            conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now,))
+
+    def delete(self, sid):
+        self._conn().execute("DELETE FROM sessions WHERE sid=?", (sid,))
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+class LazySession(MutableMapping):
+    """dict-like view of one session, loaded from the backend on first access."""
+
+    def __init__(self, backend, signer, raw_cookie):
+        self._backend = backend
+        self._signer = signer
+        self._raw = raw_cookie
+        self._data = None
+        self.sid = None
+        self.expires_at = 0.0
+        self.modified = False
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    def _load(self):
+        if self._data is None:
+            self._data = {}
+            if self._raw:
+                try:
+                    sid = self._signer.unsign(self._raw).decode("utf-8")
+                except BadSignature:
+                    sid = None
+                found = self._backend.load(sid) if sid else None
+                if found is not None:
+                    self._data, self.expires_at = found
+                    self.sid = sid
+        return self._data
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __setitem__(self, key, value):
+        data = self._load()
+        if key not in data or data[key] != value:
+            data[key] = value
+            self.modified = True
+
+    def __delitem__(self, key):
+        del self._load()[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __contains__(self, key):
+        return key in self._load()
+
+    def __repr__(self):
+        return repr(self._load())
+
+    def regenerate(self):
+        """Move the data to a fresh session ID and drop the old one (call on privilege changes)."""
+        self._load()
+        if self.sid:
+            self._backend.delete(self.sid)
+        self.sid = secrets.token_urlsafe(24)
+        self.expires_at = 0.0   # forces a Set-Cookie for the new ID
+        self.modified = True
+
+
+class ServerSessionMiddleware:
+    def __init__(self, app, secret_key, backend, session_cookie="sid", max_age=SESSION_MAX_AGE,
+                 path="/", same_site="lax", https_only=False):
+        self.app = app
+        self.backend = backend
+        self.signer = Signer(str(secret_key), salt="sahyog-session")
+        self.session_cookie = session_cookie
+        self.max_age = max_age
+        self.path = path
+        self.security_flags = f"httponly; samesite={same_site}" + ("; secure" if https_only else "")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        raw = HTTPConnection(scope).cookies.get(self.session_cookie)
+        session = LazySession(self.backend, self.signer, raw)
+        scope["session"] = session
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                header = self._commit(session)
+                if header:
+                    MutableHeaders(scope=message).append("Set-Cookie", header)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _cookie(self, value, max_age):
+        return f"{self.session_cookie}={value}; path={self.path}; Max-Age={max_age}; {self.security_flags}"
+
+    def _commit(self, session):
+        """Persist the session if needed; returns a Set-Cookie value or None."""
+        if not session.loaded:
+            return None
+
+        if not session.modified:
+            # Slide the expiry, but at most once per half lifetime
+            if session.sid and session.expires_at - time.time() < self.max_age / 2:
+                self.backend.save(session.sid, session._data, self.max_age)
+                return self._cookie(self.signer.sign(session.sid).decode("utf-8"), self.max_age)
+            return None
+
+        if not session._data:
+            if session.sid:
+                self.backend.delete(session.sid)
+                return self._cookie("null", 0)
+            return None
+
+        sid = session.sid or secrets.token_urlsafe(24)
+        self.backend.save(sid, session._data, self.max_age)
+        if session.sid == sid and session.expires_at - time.time() >= self.max_age / 2:
+            return None   # existing cookie is still good for long enough
+        return self._cookie(self.signer.sign(sid).decode("utf-8"), self.max_age)
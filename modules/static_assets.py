@@ -0,0 +1,138 @@
+import os
+import gzip
+import json
+import hashlib
+import mimetypes
+
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import FileResponse
+
+try:
+    import brotli
+except ImportError:   # optional — gzip only without it
+    brotli = None
+
+
+# --- Fingerprinted Static Assets ---
+#
+# build_assets() copies every file in static/ to static_build/ as
+# name.<content-hash>.ext and, for text assets, writes .gz / .br siblings.
+# Every file is written under a temporary name and renamed into place, and
+# each one is checked on its own, so workers building at the same time or a
+# build interrupted half-way never leave a truncated or missing variant
+# behind — the next build fills in whatever is absent. AssetStaticFiles serves
+# hashed names with a one-year immutable Cache-Control and the best
+# pre-compressed variant the client accepts; original names still work but
+# are revalidated on every use. Templates call asset_url("script.js").
+
+COMPRESSIBLE = {".js", ".css", ".json", ".svg", ".html", ".txt"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+MANIFEST_NAME = "manifest.json"
+
+
+def _write_atomic(path, data):
+    """Write `data` to a per-process temp file, then rename it over `path`."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def build_assets(source_dir="static", build_dir="static_build"):
+    """Fingerprint + pre-compress everything in source_dir. Returns {name: hashed_name}."""
+    os.makedirs(build_dir, exist_ok=True)
+    manifest = {}
+    for root, _, files in os.walk(source_dir):
+        for fname in files:
+            src = os.path.join(root, fname)
+            rel = os.path.relpath(src, source_dir).replace(os.sep, "/")
+            stem, ext = os.path.splitext(rel)
+            with open(src, "rb") as f:
+                raw = f.read()
+            hashed = f"{stem}.{hashlib.sha256(raw).hexdigest()[:12]}{ext}"
+            dest = os.path.join(build_dir, hashed)
+            manifest[rel] = hashed
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            variants = {dest: lambda: raw}
+            if ext.lower() in COMPRESSIBLE:
+                variants[dest + ".gz"] = lambda: gzip.compress(raw, compresslevel=9, mtime=0)
+                if brotli is not None:
+                    variants[dest + ".br"] = lambda: brotli.compress(raw, quality=11)
+            for path, make in variants.items():
+                if not os.path.exists(path):
+                    _write_atomic(path, make())
+    _write_atomic(os.path.join(build_dir, MANIFEST_NAME), json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
+
+
+def _accepted(accept_encoding):
+    """Parse Accept-Encoding into {coding: q}, dropping q=0."""
+    out = {}
+    for part in accept_encoding.split(","):
+        bits = part.strip().split(";")
+        coding = bits[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for b in bits[1:]:
+            b = b.strip()
+            if b.startswith("q="):
+                try:
+                    q = float(b[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            out[coding] = q
+    return out
+
+
+class AssetStaticFiles(StaticFiles):
+    """StaticFiles that also serves fingerprinted, pre-compressed builds."""
+
+    def __init__(self, *, directory, build_dir, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.build_dir = build_dir
+        self.manifest = {}
+        self._hashed = set()
+        self.version = ""
+
+    def load(self, manifest):
+        self.manifest = dict(manifest)
+        self._hashed = set(self.manifest.values())
+        # Changes whenever any asset does — pages embedding asset URLs key on it
+        self.version = hashlib.sha256(json.dumps(self.manifest, sort_keys=True).encode()).hexdigest()[:12]
+
+    def url(self, name):
+        return f"/static/{self.manifest.get(name, name)}"
+
+    async def get_response(self, path, scope):
+        if path in self._hashed:
+            return self._hashed_response(path, scope)
+        response = await super().get_response(path, scope)
+        response.headers.setdefault("Cache-Control", "no-cache")
+        return response
+
+    def _hashed_response(self, path, scope):
+        full = os.path.join(self.build_dir, path)
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        headers = {"Cache-Control": IMMUTABLE, "Vary": "Accept-Encoding"}
+        accept = ""
+        for k, v in scope.get("headers", []):
+            if k == b"accept-encoding":
+                accept = v.decode("latin-1")
+                break
+        accepted = _accepted(accept)
+        for coding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if coding in accepted and os.path.exists(full + suffix):
+                headers["Content-Encoding"] = coding
+                return FileResponse(full + suffix, media_type=media_type, headers=headers)
+        return FileResponse(full, media_type=media_type, headers=headers)
+
+
+if __name__ == "__main__":
+    built = build_assets()
+    print(f"Built {len(built)} assets into static_build/")
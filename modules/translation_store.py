@@ -0,0 +1,268 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+
+
+# --- Shared Translation Store ---
+#
+# One SQLite file (WAL mode) shared by every uvicorn worker on the host:
+#   • Readers never block each other or the writer (WAL).
+#   • Writers are serialised by SQLite's own file lock, so N workers can
+#     safely add rows at the same time without losing entries.
+#   • A worker "claims" a missing (text, lang) row before translating it, so
+#     the same string is translated once per host, not once per worker.
+#   • translations.json is exported from the full table, never from a
+#     worker's partial in-memory view.
+#
+# Each thread gets its own connection; a small per-process dict caches hits
+# (translations never change once written) so template renders stay in memory.
+# Misses are remembered for _MISS_TTL and claims for CLAIM_TIMEOUT per process,
+# so a page full of untranslated strings costs at most one write per string
+# per claim window instead of one per render.
+# Rows stored with persist=0 (event content, user names) never reach
+# translations.json and are purged EPHEMERAL_TTL after they were translated.
+# persist only ever goes up: once a string is also used with persist=True
+# (say, a template string that first appeared in event content), its row is
+# promoted and kept.
+
+CLAIM_TIMEOUT = 60  # seconds before an unfinished claim can be retaken
+EPHEMERAL_TTL = int(os.environ.get("TRANSLATION_EPHEMERAL_TTL", str(24 * 3600)))
+_LOCAL_CACHE_MAX = 50000
+_VERSION_TTL = 2.0  # seconds a per-language version() result is reused
+_MISS_TTL = 1.0     # seconds a miss is answered from memory
+
+
+class TranslationStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._hits: dict = {}
+        self._misses: dict = {}     # (text, lang) -> monotonic time to look again
+        self._inflight: dict = {}   # (text, lang) -> monotonic end of our claim window
+        self._ephemeral: set = set()  # cached hits whose row has persist=0
+        self._write_lock = threading.Lock()
+        self._last_export_version = None
+        self._versions: dict = {}
+        self.hit_count = 0
+        self.miss_count = 0
+        self._init_schema()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        self._conn().execute("""CREATE TABLE IF NOT EXISTS translations (
+            text TEXT NOT NULL,
+            lang TEXT NOT NULL,
+            value TEXT,
+            persist INTEGER NOT NULL DEFAULT 1,
+            claimed_at REAL,
+            translated_at REAL,
+            PRIMARY KEY (text, lang)
+        ) WITHOUT ROWID""")
+        columns = {row[1] for row in self._conn().execute("PRAGMA table_info(translations)")}
+        if "translated_at" not in columns:
+            self._conn().execute("ALTER TABLE translations ADD COLUMN translated_at REAL")
+
+    @staticmethod
+    def _remember(table, key, until):
+        if len(table) >= _LOCAL_CACHE_MAX:
+            now = time.monotonic()
+            for k in [k for k, t in table.items() if t <= now]:
+                table.pop(k, None)
+            if len(table) >= _LOCAL_CACHE_MAX:
+                table.clear()
+        table[key] = until
+
+    def get(self, text, lang, persist=False):
+        """
+        Return the translation or None if it is missing / still in flight.
+        With persist=True an ephemeral row that is found is promoted.
+        """
+        key = (text, lang)
+        value = self._hits.get(key)
+        if value is not None:
+            if persist and key in self._ephemeral:
+                self._promote(key)
+            self.hit_count += 1
+            return value
+        now = time.monotonic()
+        if self._misses.get(key, 0) > now:
+            self.miss_count += 1
+            return None
+        row = self._conn().execute(
+            "SELECT value, persist FROM translations WHERE text=? AND lang=?", key
+        ).fetchone()
+        if row and row[0] is not None:
+            if len(self._hits) >= _LOCAL_CACHE_MAX:
+                self._hits.clear()
+                self._ephemeral.clear()
+            self._hits[key] = row[0]
+            if not row[1]:
+                if persist:
+                    self._promote(key)
+                else:
+                    self._ephemeral.add(key)
+            self.hit_count += 1
+            return row[0]
+        self._remember(self._misses, key, now + _MISS_TTL)
+        self.miss_count += 1
+        return None
+
+    def _promote(self, key):
+        with self._write_lock:
+            self._conn().execute("UPDATE translations SET persist=1 WHERE text=? AND lang=? AND persist=0", key)
+        self._ephemeral.discard(key)
+
+    def claim(self, text, lang, persist=True):
+        """
+        Try to reserve (text, lang) for translation. Returns True only for the
+        one caller (across all workers) that should do the translation.
+        Within this process each pair reaches the database at most once per
+        CLAIM_TIMEOUT, won or lost.
+        """
+        key = (text, lang)
+        if self._inflight.get(key, 0) > time.monotonic():
+            return False
+        self._remember(self._inflight, key, time.monotonic() + CLAIM_TIMEOUT)
+        now = time.time()
+        with self._write_lock:
+            cur = self._conn().execute(
+                """INSERT INTO translations(text, lang, value, persist, claimed_at)
+                   VALUES (?, ?, NULL, ?, ?)
+                   ON CONFLICT(text, lang) DO UPDATE SET claimed_at=excluded.claimed_at
+                   WHERE translations.value IS NULL AND translations.claimed_at < ?""",
+                (text, lang, int(bool(persist)), now, now - CLAIM_TIMEOUT),
+            )
+            won = cur.rowcount == 1
+        if not won and persist:
+            self._promote(key)   # someone else's (possibly ephemeral) row is now needed for good
+        return won
+
+    def put(self, text, lang, value, persist=True):
+        with self._write_lock:
+            self._conn().execute(
+                """INSERT INTO translations(text, lang, value, persist, claimed_at, translated_at)
+                   VALUES (?, ?, ?, ?, NULL, ?)
+                   ON CONFLICT(text, lang) DO UPDATE SET value=excluded.value, claimed_at=NULL,
+                       translated_at=excluded.translated_at,
+                       persist=MAX(translations.persist, excluded.persist)""",
+                (text, lang, value, int(bool(persist)), time.time()),
+            )
+        key = (text, lang)
+        self._hits[key] = value
+        self._misses.pop(key, None)
+        self._inflight.pop(key, None)
+        if persist:
+            self._ephemeral.discard(key)
+        else:
+            self._ephemeral.add(key)   # may already be persisted; promoting again is harmless
+
+    def put_many(self, rows, persist=True, overwrite=False):
+        """Bulk insert [(text, lang, value)]. Existing values are kept unless overwrite=True."""
+        conflict = "value=excluded.value" if overwrite else "value=COALESCE(translations.value, excluded.value)"
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    f"""INSERT INTO translations(text, lang, value, persist, claimed_at, translated_at)
+                        VALUES (?, ?, ?, {int(bool(persist))}, NULL, {time.time()!r})
+                        ON CONFLICT(text, lang) DO UPDATE SET {conflict}, claimed_at=NULL,
+                            persist=MAX(translations.persist, excluded.persist)""",
+                    rows,
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def purge_ephemeral(self, max_age=EPHEMERAL_TTL):
+        """Drop persist=0 rows translated (or abandoned) more than max_age seconds ago."""
+        with self._write_lock:
+            cur = self._conn().execute(
+                "DELETE FROM translations WHERE persist=0 AND COALESCE(translated_at, claimed_at, 0) < ?",
+                (time.time() - max_age,),
+            )
+        return cur.rowcount
+
+    def import_json(self, path):
+        """Seed the store from a translations.json-shaped file. Safe to run from every worker."""
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        rows = [(text, lang, value) for text, langs in data.items() for lang, value in langs.items()]
+        self.put_many(rows)
+        return len(rows)
+
+    def as_dict(self, persist_only=True):
+        query = "SELECT text, lang, value FROM translations WHERE value IS NOT NULL"
+        if persist_only:
+            query += " AND persist=1"
+        out = {}
+        for text, lang, value in self._conn().execute(query):
+            out.setdefault(text, {})[lang] = value
+        return out
+
+    def export_json(self, path, force=False):
+        """
+        Write every persisted translation to `path` atomically. Skips the write
+        when nothing changed since this process last exported.
+        Returns True if the file was written.
+        """
+        version = self._conn().execute(
+            "SELECT COUNT(*), COUNT(value) FROM translations WHERE persist=1"
+        ).fetchone()
+        if not force and version == self._last_export_version:
+            return False
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=4, ensure_ascii=False)
+        os.replace(tmp, path)
+        self._last_export_version = version
+        return True
+
+    def version(self, lang):
+        """
+        Number of finished translations for `lang` — grows whenever a pending
+        string gets translated, so it can be folded into HTTP ETags.
+        """
+        now = time.monotonic()
+        cached = self._versions.get(lang)
+        if cached and cached[0] > now:
+            return cached[1]
+        count = self._conn().execute(
+            "SELECT COUNT(value) FROM translations WHERE lang=?", (lang,)
+        ).fetchone()[0]
+        self._versions[lang] = (now + _VERSION_TTL, count)
+        return count
+
+    def stats(self):
+        total = self.hit_count + self.miss_count
+        return {
+            "hits": self.hit_count,
+            "misses": self.miss_count,
+            "hit_rate": (self.hit_count / total) if total else 0.0,
+            "local_cache_size": len(self._hits),
+        }
+
+
+_store = None
+
+
+def get_translation_store(path=None):
+    """Process-wide store, opened lazily at TRANSLATION_DB (default translations.db)."""
+    global _store
+    if _store is None:
+        _store = TranslationStore(path or os.environ.get("TRANSLATION_DB", "translations.db"))
+    return _store
@@ -0,0 +1,94 @@
+import os
+import asyncio
+
+
+# --- Translator Backends ---
+#
+# Every translation in the app goes through one backend object exposing
+#   translate_batch(texts: list[str], lang: str) -> list[str]
+# The default talks to Google Translate (googletrans); the offline backend
+# never touches the network and is used by tools, tests and load runs.
+# Pick one with TRANSLATOR_BACKEND=google|offline.
+
+BATCH_SIZE = 50
+
+
+class GoogleTranslatorBackend:
+    """Batched googletrans backend — one HTTP session per batch."""
+    name = "google"
+
+    def translate_batch(self, texts, lang):
+        texts = list(texts)
+        if not texts:
+            return []
+
+        from googletrans import Translator
+
+        async def _do():
+            out = []
+            async with Translator() as t:
+                for i in range(0, len(texts), BATCH_SIZE):
+                    chunk = texts[i:i + BATCH_SIZE]
+                    results = await t.translate(chunk, dest=lang)
+                    out.extend(r.text for r in results)
+            return out
+
+        return asyncio.run(_do())
+
+
+class OfflineTranslatorBackend:
+    """
+    Network-free stand-in. Looks text up in an optional {text: {lang: value}}
+    table, otherwise returns the source text (optionally tagged with the
+    language so untranslated strings are easy to spot).
+    """
+    name = "offline"
+
+    def __init__(self, table=None, tag=False):
+        self.table = table or {}
+        self.tag = tag
+
+    def translate_batch(self, texts, lang):
+        out = []
+        for text in texts:
+            known = self.table.get(text, {}).get(lang)
+            if known:
+                out.append(known)
+            elif self.tag:
+                out.append(f"[{lang}] {text}")
+            else:
+                out.append(text)
+        return out
+
+
+_backends = {
+    "google": GoogleTranslatorBackend,
+    "offline": OfflineTranslatorBackend,
+}
+
+_active_backend = None
+
+
+def get_translator(name=None):
+    """Return the configured backend (cached unless a name is given explicitly)."""
+    global _active_backend
+    if name:
+        return _backends[name]()
+    if _active_backend is None:
+        _active_backend = _backends[os.environ.get("TRANSLATOR_BACKEND", "google")]()
+    return _active_backend
+
+
+def set_translator(backend):
+    """Swap the process-wide backend (e.g. an OfflineTranslatorBackend in tests)."""
+    global _active_backend
+    _active_backend = backend
+
+
+def translate_one(text, lang):
+    """Translate a single string, falling back to the source text on error."""
+    try:
+        return get_translator().translate_batch([text], lang)[0]
+    except Exception as e:
+        print(f"Translation error: {e}")
+        return text
@@ -120,34 +120,53 @@ async function generateDescription() {
     const resultsContainer = $('#aiResults');
     btn.disabled = true;
     btn.innerHTML = `✨ ${SAHYOG_CONFIG.trans.generating}`;
+    const labels = {
+        'desc1': SAHYOG_CONFIG.trans.formal,
+        'desc2': SAHYOG_CONFIG.trans.informal,
+        'desc3': SAHYOG_CONFIG.trans.promotional,
+        'desc4': SAHYOG_CONFIG.trans.entertaining
+    };
+    const addCard = (key, text) => {
+        const card = document.createElement('div');
+        card.className = `ai-option-card ai-card-${key}`;
+        card.innerHTML += `<h5>${labels[key] || key}</h5><p>${text}</p>`;
+        card.onclick = () => {
+            $('#descriptionField').value = text;
+            showAlert(SAHYOG_CONFIG.trans.descUpdated, 'success');
+            $('#descriptionField').scrollIntoView({ behavior: 'smooth', block: 'center' });
+        };
+        resultsContainer.appendChild(card);
+        $('#aiInstruction').style.display = 'block';
+        resultsContainer.classList.add('show');
+    };
     try {
-        const response = await fetch('/generate_ai_description', { method: 'POST', body: formData });
+        // Each tone is streamed as a Server-Sent Event the moment it is ready
+        const response = await fetch('/generate_ai_description/stream', { method: 'POST', body: formData });
         if (response.status === 429) {
             const data = await response.json();
             showAlert(`${SAHYOG_CONFIG.trans.aiFailed} Please wait ${data.wait}s.`, 'warning');
             return;
         }
-        if (!response.ok) throw new Error('Generation failed');
-        const data = await response.json();
-        const labels = {
-            'desc1': SAHYOG_CONFIG.trans.formal,
-            'desc2': SAHYOG_CONFIG.trans.informal,
-            'desc3': SAHYOG_CONFIG.trans.promotional,
-            'desc4': SAHYOG_CONFIG.trans.entertaining
-        };
-        Object.keys(data).forEach(key => {
-            const card = document.createElement('div');
-            card.className = `ai-option-card ai-card-${key}`;
-            card.innerHTML += `<h5>${labels[key] || key}</h5><p>${data[key]}</p>`;
-            card.onclick = () => {
-                $('#descriptionField').value = data[key];
-                showAlert(SAHYOG_CONFIG.trans.descUpdated, 'success');
-                $('#descriptionField').scrollIntoView({ behavior: 'smooth', block: 'center' });
-            };
-            resultsContainer.appendChild(card);
-        });
-        $('#aiInstruction').style.display = 'block';
-        resultsContainer.classList.add('show');
+        if (!response.ok || !response.body) throw new Error('Generation failed');
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let received = 0;
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let sep;
+            while ((sep = buffer.indexOf('\n\n')) !== -1) {
+                const raw = buffer.slice(0, sep);
+                buffer = buffer.slice(sep + 2);
+                const event = (raw.match(/^event: (.*)$/m) || [])[1];
+                const data = JSON.parse((raw.match(/^data: (.*)$/m) || [])[1] || '{}');
+                if (event === 'tone') { addCard(data.key, data.text); received++; }
+                if (event === 'error') throw new Error(data.detail);
+            }
+        }
+        if (!received) throw new Error('Generation failed');
     } catch (error) {
         console.error('AI Error:', error);
         showAlert(SAHYOG_CONFIG.trans.aiFailed, 'warning');
@@ -244,12 +263,31 @@ function initializeAddFormListeners() {
             if (text.includes('Registered')) setTimeout(() => location.reload(), 4000);
         });
     });
-    form.addEventListener('change', e => {
-        const fd = new FormData();
-        fd.append('field', e.target.name);
-        fd.append('value', e.target.value);
-        fetch('/save_draft', { method: 'POST', body: fd });
+    // Drafts: the whole form is saved in one request, debounced, and only when it changed.
+    // keepalive lets the last save on page unload finish after the page is gone.
+    let draftTimer = null;
+    let lastDraft = JSON.stringify(Object.fromEntries(new FormData(form)));
+    const saveDraft = () => {
+        const payload = JSON.stringify(Object.fromEntries(new FormData(form)));
+        if (payload === lastDraft) return;
+        lastDraft = payload;
+        fetch('/api/draft', {
+            method: 'PUT',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ fields: JSON.parse(payload) }),
+            keepalive: true
+        }).then(r => { if (!r.ok) lastDraft = null; })
+          .catch(() => { lastDraft = null; });
+    };
+    const scheduleDraft = () => { clearTimeout(draftTimer); draftTimer = setTimeout(saveDraft, 800); };
+    form.addEventListener('input', scheduleDraft);
+    form.addEventListener('change', scheduleDraft);
+    form.addEventListener('reset', () => {
+        clearTimeout(draftTimer);
+        lastDraft = null;
+        fetch('/api/draft', { method: 'DELETE' });
     });
+    window.addEventListener('beforeunload', () => { clearTimeout(draftTimer); saveDraft(); });
 }
 
 function initializePendingListeners() {
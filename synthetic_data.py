@@ -0,0 +1,300 @@
+"""
+Synthetic dataset generator for scale testing.
+
+    python synthetic_data.py scale.db                          # defaults below
+    python synthetic_data.py scale.db --users 1000000 --events 100000 --ended 500000 --chats 50000
+    LOCAL_DB=scale.db TRANSLATION_DB=scale-translations.db uvicorn app:app
+    python loadtest.py --dataset scale.db
+
+Fills a local SQLite backend (the LOCAL_DB schema in modules/local_db.py)
+plus a translation store with realistic shapes rather than uniform noise:
+  • event types come from events.json, cities follow a Zipf curve;
+  • a small pool of organisers owns most events (Zipf over organisers), and
+    userdetails.events lists exactly the active events each one owns;
+  • likes are heavy-tailed (a few events collect most of them) and the users'
+    own like lists point at popular events;
+  • chat histories in messages2 are mostly short with a long tail up to
+    --max-chat messages, in the same str(list of tuples) form the app writes;
+  • endedevent holds an archive of past events with lower ids than the
+    active ones, as if del_event had moved them there;
+  • event names, locations and descriptions of the most popular events get
+    pseudo-translations (consistent per word, in each language's script) in
+    the translation store.
+Everything derives from --seed, so the same arguments give the same data.
+Rows are generated lazily and written in --batch sized transactions, so
+memory stays flat and millions of rows take minutes.
+
+Seeded accounts use loadtest.py's names and password (loadadmin /
+loaduser<N>), so the load test can log in against a generated dataset.
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import datetime
+import itertools
+from functools import lru_cache
+
+from loadtest import SEED_PASSWORD, ADMIN_USERNAME, MEMBER_PREFIX, event_categories
+from modules.local_db import connect_local, init_local_db
+from modules.translation_store import TranslationStore
+
+REQUEST_COLUMNS = ("eventid, eventname, email, eventstarttime, eventendtime, eventstartdate, eventenddate, "
+                   "location, category, description, username")
+EVENT_COLUMNS = REQUEST_COLUMNS + ", likes"
+LIKED_POOL = 1000   # likes in userdetails point at this many most-liked events
+CITIES = ["Mumbai", "Delhi", "Bengaluru", "Pune", "Hyderabad", "Chennai", "Kolkata", "Ahmedabad", "Jaipur",
+          "Lucknow", "Nagpur", "Indore", "Bhopal", "Surat", "Patna", "Chandigarh", "Kochi", "Coimbatore",
+          "Visakhapatnam", "Nashik", "Vadodara", "Guwahati", "Bhubaneswar", "Dehradun", "Mysuru", "Ranchi",
+          "Raipur", "Amritsar", "Varanasi", "Madurai", "Thiruvananthapuram", "Udaipur", "Shimla", "Goa"]
+AREAS = ["Central Park", "Community Hall", "Government School", "Riverside", "Civil Hospital", "Old City",
+         "Railway Colony", "Municipal Ground", "Lake Front", "Village Panchayat", "Public Library", "Market Square"]
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Arjun", "Sai", "Reyansh", "Krishna", "Ishaan", "Rohan", "Kabir",
+               "Ananya", "Diya", "Aadhya", "Saanvi", "Priya", "Kavya", "Meera", "Nisha", "Pooja", "Riya",
+               "Farhan", "Imran", "Zoya", "Sana", "Harpreet", "Gurpreet", "Joseph", "Maria", "Lakshmi", "Suresh"]
+LAST_NAMES = ["Sharma", "Verma", "Patel", "Reddy", "Iyer", "Nair", "Das", "Bose", "Khan", "Singh", "Gupta",
+              "Joshi", "Kulkarni", "Deshpande", "Mehta", "Shah", "Rao", "Menon", "Chatterjee", "Fernandes"]
+DESCRIPTION_WORDS = ("join us volunteers community together help support local families children elderly "
+                     "students women youth awareness drive camp workshop session training free open all "
+                     "bring water gloves food clothes books donate register early limited seats morning "
+                     "evening weekend city village school hospital park river lake beach neighbourhood "
+                     "health education environment safety hygiene nutrition plantation cleanup recycling "
+                     "kindness service change future together everyone welcome").split()
+CHAT_WORDS = ("hi hello thanks see you there what time should we bring anything count me in great idea "
+              "i will come with friends is parking available where exactly meet at the gate running late "
+              "photos from today awesome work everyone next event when yes no maybe ok sure").split()
+
+# Unicode blocks used for pseudo-translations: (first letter, number of letters to draw from)
+SCRIPTS = {
+    "hi": (0x0915, 36), "mr": (0x0915, 36), "bn": (0x0995, 35), "ta": (0x0B95, 30), "te": (0x0C15, 36),
+    "gu": (0x0A95, 35), "kn": (0x0C95, 36), "ml": (0x0D15, 36), "pa": (0x0A15, 35),
+}
+
+
+# --- Distributions ---
+
+def zipf_weights(n, s=1.1):
+    """Cumulative Zipf weights over ranks 0..n-1, for random.choices(cum_weights=...)."""
+    return list(itertools.accumulate(1.0 / (rank + 1) ** s for rank in range(n)))
+
+
+def heavy_tail(rnd, scale, alpha, cap):
+    """0, 1, 2 ... with a Pareto tail: most values small, a few near `cap`."""
+    return min(int((rnd.paretovariate(alpha) - 1) * scale), cap)
+
+
+_WORD = re.compile(r"[A-Za-z]+")
+
+
+@lru_cache(maxsize=65536)
+def pseudo_word(word, lang):
+    """Deterministic stand-in for `word` in `lang`'s script — same word, same output."""
+    first, span = SCRIPTS[lang]
+    h = random.Random(f"{lang}:{word}")
+    return "".join(chr(first + h.randrange(span)) for _ in range(max(2, len(word) * 2 // 3)))
+
+
+def pseudo_translate(text, lang):
+    return _WORD.sub(lambda m: pseudo_word(m.group(0).lower(), lang), text)
+
+
+# --- Row Generators ---
+
+class Dataset:
+    def __init__(self, args):
+        self.args = args
+        self.rnd = random.Random(args.seed)
+        self.categories = event_categories()
+        self.category_weights = zipf_weights(len(self.categories), 0.6)
+        self.city_weights = zipf_weights(len(CITIES), 1.0)
+        organisers = max(1, int(args.users * args.organiser_share))
+        self.organisers = self.rnd.sample(range(args.users), organisers) if args.users else []
+        self.organiser_weights = zipf_weights(organisers, args.organiser_skew)
+        self.first_active = args.ended + 1
+        self.owned = {}          # user index -> [active event ids]
+        self.popular = []        # (likes, eventid, name, location, description) of the most liked active events
+        self.today = datetime.date.today()
+
+    def _organiser(self):
+        return self.rnd.choices(self.organisers, cum_weights=self.organiser_weights)[0]
+
+    def _event(self, eventid, day_offset):
+        rnd = self.rnd
+        category = rnd.choices(self.categories, cum_weights=self.category_weights)[0]
+        city = rnd.choices(CITIES, cum_weights=self.city_weights)[0]
+        owner = self._organiser()
+        start = self.today + datetime.timedelta(days=day_offset)
+        end = start + datetime.timedelta(days=heavy_tail(rnd, 1, 2.5, 14))
+        hour = rnd.randint(6, 18)
+        words = max(12, min(int(rnd.lognormvariate(3.8, 0.6)), 500))
+        description = " ".join(rnd.choice(DESCRIPTION_WORDS) for _ in range(words)).capitalize() + "."
+        likes = heavy_tail(rnd, 3, 1.2, 100000)
+        return owner, (
+            eventid, f"{category} - {city}", f"{MEMBER_PREFIX}{owner}@example.com",
+            f"{hour:02d}:00", f"{min(hour + rnd.randint(1, 6), 23):02d}:00",
+            start.isoformat(), end.isoformat(),
+            f"{rnd.choice(AREAS)}, {city}", category, description, f"{MEMBER_PREFIX}{owner}", likes,
+        )
+
+    def ended_events(self):
+        for eventid in range(1, self.args.ended + 1):
+            yield self._event(eventid, -self.rnd.randint(1, 3 * 365))[1]
+
+    def active_events(self):
+        keep = max(self.args.translated_events, LIKED_POOL)
+        for eventid in range(self.first_active, self.first_active + self.args.events):
+            owner, row = self._event(eventid, self.rnd.randint(1, 180))
+            self.owned.setdefault(owner, []).append(eventid)
+            self.popular.append((row[-1], eventid, row[1], row[7], row[9]))
+            if len(self.popular) > 4 * keep:
+                self.popular = sorted(self.popular, reverse=True)[:keep]
+            yield row
+        self.popular = sorted(self.popular, reverse=True)[:keep]
+
+    def pending_events(self):
+        # The app keeps eventreq ids in step with eventdetail's sequence (see decline_event)
+        first = self.first_active + self.args.events
+        for eventid in range(first, first + self.args.pending):
+            yield self._event(eventid, self.rnd.randint(3, 60))[1][:-1]
+
+    def users(self):
+        rnd = self.rnd
+        liked_pool = [eventid for _, eventid, *_ in self.popular[:LIKED_POOL]]
+        like_weights = zipf_weights(len(liked_pool), 1.0)
+        yield (ADMIN_USERNAME, SEED_PASSWORD, "Load Admin", f"{ADMIN_USERNAME}@example.com", "admin", None, None)
+        for i in range(self.args.users):
+            events = self.owned.get(i)
+            likes = None
+            if liked_pool and rnd.random() < 0.25:
+                count = min(heavy_tail(rnd, 2, 1.5, 200) + 1, len(liked_pool))
+                likes = ",".join(str(e) for e in sorted(set(rnd.choices(liked_pool, cum_weights=like_weights, k=count))))
+            yield (f"{MEMBER_PREFIX}{i}", SEED_PASSWORD,
+                   f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}", f"{MEMBER_PREFIX}{i}@example.com",
+                   "user", ",".join(map(str, events)) if events else None, likes)
+
+    def chats(self):
+        rnd = self.rnd
+        args = self.args
+        active = range(self.first_active, self.first_active + args.events)
+        pool = active if len(active) else range(1, args.ended + 1)
+        if not len(pool) or not args.users:
+            return
+        for eventid in sorted(rnd.sample(pool, min(args.chats, len(pool)))):
+            length = heavy_tail(rnd, 4, 0.9, args.max_chat) + 1
+            members = [f"{MEMBER_PREFIX}{rnd.randrange(args.users)}" for _ in range(min(length, 3 + length // 10))]
+            at = datetime.datetime.combine(self.today, datetime.time(9)) - datetime.timedelta(days=rnd.randint(0, 60))
+            msgs = []
+            for _ in range(length):
+                at += datetime.timedelta(seconds=int(rnd.expovariate(1 / 900)))
+                msgs.append((rnd.choice(members),
+                             " ".join(rnd.choice(CHAT_WORDS) for _ in range(heavy_tail(rnd, 3, 1.5, 60) + 1)),
+                             at.strftime("%Y-%m-%d %H:%M:%S")))
+            yield eventid, str(msgs)
+
+    def translations(self):
+        for _, _, name, location, description in self.popular[:self.args.translated_events]:
+            for text in (name, location, description):
+                for lang in self.args.languages:
+                    yield text, lang, pseudo_translate(text, lang)
+
+
+# --- Writing ---
+
+def write(conn, sql, rows, batch, label):
+    """executemany in `batch`-sized transactions, pulling rows lazily."""
+    started = time.perf_counter()
+    total = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, batch))
+        if not chunk:
+            break
+        conn.execute("BEGIN")
+        conn.executemany(sql, chunk)
+        conn.execute("COMMIT")
+        total += len(chunk)
+        rate = total / max(time.perf_counter() - started, 1e-9)
+        print(f"\r  {label}: {total:,} rows ({rate:,.0f}/s)", end="", flush=True)
+    print(f"\r  {label}: {total:,} rows in {time.perf_counter() - started:.1f}s" + " " * 20)
+    return total
+
+
+def remove_db(path):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def generate(args):
+    if os.path.exists(args.output) and not args.overwrite:
+        sys.exit(f"{args.output} exists — pass --overwrite to replace it")
+    remove_db(args.output)
+    init_local_db(args.output)
+    conn = connect_local(args.output)
+    conn.isolation_level = None          # explicit BEGIN/COMMIT per batch
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-200000")
+
+    data = Dataset(args)
+    started = time.perf_counter()
+    print(f"Generating into {args.output} (seed {args.seed})")
+    marks = ", ".join(["?"] * 12)
+    write(conn, f"INSERT INTO endedevent({EVENT_COLUMNS}) VALUES ({marks})", data.ended_events(), args.batch, "endedevent")
+    write(conn, f"INSERT INTO eventdetail({EVENT_COLUMNS}) VALUES ({marks})", data.active_events(), args.batch, "eventdetail")
+    write(conn, f"INSERT INTO eventreq({REQUEST_COLUMNS}) VALUES ({marks[3:]})", data.pending_events(), args.batch, "eventreq")
+    write(conn, "INSERT INTO userdetails(username, password, name, email, role, events, likes) VALUES (?, ?, ?, ?, ?, ?, ?)",
+          data.users(), args.batch, "userdetails")
+    write(conn, "INSERT INTO messages2(eventid, msgs) VALUES (?, ?)", data.chats(), max(1, args.batch // 50), "messages2")
+    conn.execute("ANALYZE")
+    conn.close()
+
+    if args.languages and args.translated_events and data.popular:
+        remove_db(args.translations_db)
+        store = TranslationStore(args.translations_db)
+        rows = data.translations()
+        t0 = time.perf_counter()
+        total = 0
+        while True:
+            chunk = list(itertools.islice(rows, args.batch))
+            if not chunk:
+                break
+            store.put_many(chunk)
+            total += len(chunk)
+        print(f"  translations: {total:,} rows in {time.perf_counter() - t0:.1f}s -> {args.translations_db}")
+
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="SQLite file to create (use as LOCAL_DB)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--events", type=int, default=10_000, help="active events (eventdetail)")
+    parser.add_argument("--ended", type=int, default=50_000, help="archived events (endedevent)")
+    parser.add_argument("--pending", type=int, default=200, help="pending requests (eventreq)")
+    parser.add_argument("--chats", type=int, default=5_000, help="events with a chat history")
+    parser.add_argument("--max-chat", type=int, default=5_000, help="longest chat history, in messages")
+    parser.add_argument("--organiser-share", type=float, default=0.05, help="share of users who organise events")
+    parser.add_argument("--organiser-skew", type=float, default=1.1, help="Zipf exponent over organisers")
+    parser.add_argument("--languages", default="hi,mr,bn,ta,te",
+                        help=f"comma-separated, from {','.join(SCRIPTS)} (empty for none)")
+    parser.add_argument("--translated-events", type=int, default=2_000, help="most-liked events to translate")
+    parser.add_argument("--translations-db", help="translation store to create (default <output>-translations.db)")
+    parser.add_argument("--batch", type=int, default=20_000, help="rows per transaction")
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    args.languages = [lang for lang in args.languages.split(",") if lang]
+    unknown = [lang for lang in args.languages if lang not in SCRIPTS]
+    if unknown:
+        parser.error(f"no script for {', '.join(unknown)}")
+    if not args.translations_db:
+        args.translations_db = os.path.splitext(args.output)[0] + "-translations.db"
+    generate(args)
+
+
+if __name__ == "__main__":
+    main()
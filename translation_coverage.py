@@ -0,0 +1,160 @@
+"""
+Translation coverage report and offline pre-warm.
+
+Scans templates/*.html and static/script.js for translate("...") calls plus
+the category / subcategory names in events.json, diffs them against
+translations.json for every language offered on selectlanguage.html and
+optionally fills the gaps in bulk so a fresh deploy starts fully warm.
+
+    python translation_coverage.py                    # report only
+    python translation_coverage.py --fill             # fill gaps via Google
+    python translation_coverage.py --fill --backend offline
+"""
+import os
+import re
+import json
+import glob
+import argparse
+
+from modules.translator import get_translator
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TRANSLATIONS_FILE = os.path.join(BASE_DIR, "translations.json")
+
+_translate_call = re.compile(r"""translate\(\s*(["'])(.+?)(?<!\\)\1""", re.DOTALL)
+_lang_attr = re.compile(r'data-lang="([a-zA-Z-]+)"')
+
+
+def normalize(text):
+    """Same normalisation translate_text() applies before a lookup."""
+    text = text.strip().replace("\n", "")
+    return " ".join(text.split())
+
+
+def extract_strings(base_dir=BASE_DIR):
+    """Return {normalized string: set(source files)} for everything translatable."""
+    found = {}
+
+    sources = sorted(glob.glob(os.path.join(base_dir, "templates", "*.html")))
+    sources.append(os.path.join(base_dir, "static", "script.js"))
+    for path in sources:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        for match in _translate_call.finditer(content):
+            text = normalize(match.group(2))
+            if text:
+                found.setdefault(text, set()).add(os.path.relpath(path, base_dir))
+
+    events_path = os.path.join(base_dir, "events.json")
+    with open(events_path, "r", encoding="utf-8") as f:
+        categories = json.load(f)
+    for category, subcategories in categories.items():
+        for text in [category, *subcategories]:
+            text = normalize(text)
+            if text:
+                found.setdefault(text, set()).add("events.json")
+
+    return found
+
+
+def supported_languages(base_dir=BASE_DIR):
+    """Language codes offered on the language picker, minus English."""
+    with open(os.path.join(base_dir, "templates", "selectlanguage.html"), "r", encoding="utf-8") as f:
+        codes = _lang_attr.findall(f.read())
+    return [c for c in dict.fromkeys(codes) if c != "en"]
+
+
+def load_table(path=TRANSLATIONS_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_table(table, path=TRANSLATIONS_FILE):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(table, f, indent=4, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def coverage_gaps(strings, table, langs):
+    """Return {lang: [missing strings]} — a string is missing if it has no entry for that lang."""
+    gaps = {}
+    for lang in langs:
+        missing = [s for s in sorted(strings) if not table.get(s, {}).get(lang)]
+        if missing:
+            gaps[lang] = missing
+    return gaps
+
+
+def fill_gaps(gaps, table, backend):
+    """
+    Translate every gap in one batched call per language and merge into table.
+    A result equal to the source text is not stored — it is what the offline
+    backend returns for anything it doesn't know, and storing it would mark
+    the gap as covered while readers keep getting English.
+    """
+    filled = 0
+    for lang, missing in gaps.items():
+        try:
+            translated = backend.translate_batch(missing, lang)
+        except Exception as e:
+            print(f"[{lang}] batch failed: {e}")
+            continue
+        count = 0
+        for text, value in zip(missing, translated):
+            if not value or value == text:
+                continue
+            table.setdefault(text, {})[lang] = value
+            count += 1
+        filled += count
+        print(f"[{lang}] filled {count} of {len(missing)} strings")
+    return filled
+
+
+def print_report(strings, gaps, langs):
+    total = len(strings)
+    print(f"Translatable strings: {total}")
+    print(f"Languages: {', '.join(langs)}")
+    for lang in langs:
+        missing = len(gaps.get(lang, []))
+        pct = 100.0 * (total - missing) / total if total else 100.0
+        print(f"  {lang}: {total - missing}/{total} ({pct:.1f}%) — {missing} missing")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report and fill translation coverage gaps.")
+    parser.add_argument("--fill", action="store_true", help="translate missing strings and update translations.json")
+    parser.add_argument("--backend", choices=["google", "offline"], default=None, help="translator backend (default: TRANSLATOR_BACKEND or google)")
+    parser.add_argument("--langs", default=None, help="comma separated language codes (default: from selectlanguage.html)")
+    parser.add_argument("--verbose", action="store_true", help="list every missing string")
+    parser.add_argument("--json", action="store_true", help="print the gaps as JSON")
+    args = parser.parse_args(argv)
+
+    strings = extract_strings()
+    langs = args.langs.split(",") if args.langs else supported_languages()
+    table = load_table()
+    gaps = coverage_gaps(strings, table, langs)
+
+    if args.json:
+        print(json.dumps(gaps, indent=2, ensure_ascii=False))
+    else:
+        print_report(strings, gaps, langs)
+        if args.verbose:
+            for lang, missing in gaps.items():
+                for text in missing:
+                    print(f"  [{lang}] {text}  ({', '.join(sorted(strings[text]))})")
+
+    if args.fill and gaps:
+        filled = fill_gaps(gaps, table, get_translator(args.backend))
+        save_table(table)
+        print(f"Filled {filled} translations into {os.path.basename(TRANSLATIONS_FILE)}")
+
+    return 1 if gaps and not args.fill else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())